@@ -12,30 +12,44 @@ Input data is in textproto format using the proto definitions found in
 analysis/page_view_sequence.proto
 """
 
+import array
 import collections
+import itertools
 import logging
 from multiprocessing import Pool
+import multiprocessing.util
 import os
+import pickle
+import queue
 import sys
 import json
+import tempfile
+import uuid
+import zlib
 
 from google.protobuf import text_format
 from absl import app
 from absl import flags
 from analysis import cost
-from analysis import distribution
+from analysis import delimited_io
 from analysis import languages
 from analysis import network_models
+from analysis import persistent_cache
 from analysis import page_view_sequence_pb2
 from analysis import result_pb2
+from analysis import result_protos
 from analysis import simulation
 from analysis.pfe_methods import combined_patch_subset_method
 from analysis.pfe_methods import logged_pfe_method
 from analysis.pfe_methods import optimal_one_font_method
 from analysis.pfe_methods import optimal_pfe_method
 from analysis.pfe_methods import range_request_pfe_method
+from analysis.pfe_methods import range_size_oracle
+from analysis.pfe_methods import subset_sizer
 from analysis.pfe_methods import unicode_range_pfe_method
 from analysis.pfe_methods import whole_font_pfe_method
+from analysis.pfe_methods.unicode_range_data import slicing_strategy_loader
+from patch_subset.py import patch_subset_method
 
 LOG = logging.getLogger("analyzer")
 
@@ -49,9 +63,58 @@ flags.DEFINE_string(
     "Directory which contains all fonts to be used in the analysis.")
 flags.mark_flag_as_required("font_directory")
 
-flags.DEFINE_string("input_form", None, "Can either be text, binary, or json.")
+flags.DEFINE_string(
+    "input_form", None, "Can either be text, binary, json, or delimited. "
+    "delimited is a stream of varint length prefixed PageViewSequenceProto's "
+    "which is read lazily, it does not support logged methods.")
 flags.mark_flag_as_required("input_form")
 
+flags.DEFINE_integer(
+    "chunk_size", 100,
+    "When using --input_form=delimited, the number of sequences to send to "
+    "a worker process at a time.")
+
+flags.DEFINE_bool(
+    "mmap_sequences", False,
+    "If true, sequences are handed to the worker processes via a memory "
+    "mapped file of length delimited records. Workers are only sent the "
+    "indices of the sequences to simulate. A delimited input file is mapped "
+    "directly, other inputs are first written to a temporary file.")
+
+flags.DEFINE_string(
+    "checkpoint_dir", None,
+    "If set, the results of each completed chunk of sequences are saved to "
+    "this directory as they finish. A restarted run with the same input and "
+    "checkpoint_dir only simulates the sequences which are not yet done.")
+
+flags.DEFINE_bool(
+    "retry_failed", False,
+    "When resuming from --checkpoint_dir, simulate the sequences which "
+    "failed in the earlier run again.")
+
+flags.DEFINE_integer(
+    "num_shards", None,
+    "If set, the input data is split into this many shards and only the "
+    "sequences in the shard given by --shard_index are simulated. Sequences "
+    "are assigned to shards by a hash of their id, or of their index in the "
+    "input if they don't have one. The output includes the per sequence "
+    "totals needed by tools/merge_results to combine all of the shards into "
+    "a single result.")
+
+flags.DEFINE_integer("shard_index", 0,
+                     "When --num_shards is set, the shard to simulate.")
+
+flags.DEFINE_string(
+    "subset_size_cache", None,
+    "Path to a sqlite database used to cache the sizes of font subsets, the "
+    "sizes of compressed range request payloads and the slicing strategy "
+    "chosen for each font by the unicode range method. The cache is shared "
+    "by all worker processes and reused by later runs.")
+
+flags.DEFINE_integer(
+    "subset_size_cache_max_entries", 10000000,
+    "The maximum number of subset sizes kept in --subset_size_cache.")
+
 flags.DEFINE_bool("output_binary", False,
                   "If true outputs the results in binary proto format.")
 
@@ -71,6 +134,32 @@ flags.DEFINE_bool(
     "If set, only simulate range requests. If not set, then simulate "
     "everything except for range requests.")
 
+flags.DEFINE_bool(
+    "estimate_range_request_sizes", False,
+    "If set, the compressed size of range request payloads is estimated from "
+    "the compressed size of each glyph instead of compressing every payload. "
+    "Much faster, but only approximate.")
+
+flags.DEFINE_string(
+    "unicode_range_size_table", None,
+    "Path to a table of precomputed unicode range subset sizes written by "
+    "tools/precompute_unicode_range_sizes.py. Subsets of fonts in the table "
+    "don't need to be cut during the simulation.")
+
+flags.DEFINE_integer(
+    "patch_subset_cache_mb", 128,
+    "Total memory budget in megabytes of the caches of subsets and patches "
+    "computed by the patch subset servers. Each worker process has a subset "
+    "and a patch cache, so each cache gets this divided by 2 * "
+    "--parallelism. 0 disables the caches.")
+
+flags.DEFINE_enum(
+    "request_compression", "exact", ["exact", "fast"],
+    "How the compressed sizes of patch subset requests and responses are "
+    "measured. 'fast' uses a low brotli quality which is much faster but only "
+    "approximates the sizes, intended for exploratory runs. The mode is "
+    "recorded in the results.")
+
 flags.DEFINE_bool(
     "simulate_patch_subset", False,
     "If set, only simulate patch subset requests. If not set then all non "
@@ -81,155 +170,26 @@ DEFAULT_FONT_ID = ""
 
 PFE_METHODS = []  # Populated by 'main' method since it depends on flags.
 
-NETWORK_MODELS = [
-    network_models.MOBILE_2G_SLOWEST,
-    network_models.MOBILE_2G_SLOW,
-    network_models.MOBILE_2G_MEDIAN,
-    network_models.MOBILE_2G_FAST,
-    network_models.MOBILE_2G_FASTEST,
-    network_models.MOBILE_3G_SLOWEST,
-    network_models.MOBILE_3G_SLOW,
-    network_models.MOBILE_3G_MEDIAN,
-    network_models.MOBILE_3G_FAST,
-    network_models.MOBILE_3G_FASTEST,
-    network_models.MOBILE_4G_SLOWEST,
-    network_models.MOBILE_4G_SLOW,
-    network_models.MOBILE_4G_MEDIAN,
-    network_models.MOBILE_4G_FAST,
-    network_models.MOBILE_4G_FASTEST,
-    network_models.MOBILE_WIFI_SLOWEST,
-    network_models.MOBILE_WIFI_SLOW,
-    network_models.MOBILE_WIFI_MEDIAN,
-    network_models.MOBILE_WIFI_FAST,
-    network_models.MOBILE_WIFI_FASTEST,
-    network_models.DESKTOP_SLOWEST,
-    network_models.DESKTOP_SLOW,
-    network_models.DESKTOP_MEDIAN,
-    network_models.DESKTOP_FAST,
-    network_models.DESKTOP_FASTEST,
-]
-
-
-def to_protos(simulation_results, cost_function):
-  """Converts results from the simulation (a dict from key to totals array) into proto.
-
-  Converts to a list of method result protos."""
-  results = []
-  for key, network_totals in sorted(simulation_results.items()):
-    results.append(to_method_result_proto(key, network_totals, cost_function))
-
-  return results
-
-
-def to_method_result_proto(method_name, network_totals, cost_function):
-  """Converts a set of totals for a method into the corresponding proto."""
-  method_result_proto = result_pb2.MethodResultProto()
-  method_result_proto.method_name = method_name
-
-  # TODO(garretrieger): produce aggregate network results
-
-  for category_proto in to_network_category_protos(network_totals,
-                                                   cost_function):
-    method_result_proto.results_by_network_category.append(category_proto)
-
-  for key, totals in sorted(network_totals.items()):
-    method_result_proto.results_by_network.append(
-        to_network_result_proto(key, totals, cost_function))
-  return method_result_proto
-
-
-def get_network_model(name):
-  for net_model in NETWORK_MODELS:
-    if net_model.name == name:
-      return net_model
-  return None
-
-
-def to_network_category_protos(network_totals, cost_function):  # pylint: disable=too-many-locals
-  """Convert network totals to per category totals.
-
-  For each network category combine the totals using a weighted average
-  to produce a total cost and total bytes transferred per sequence.
-  """
-  categories = collections.defaultdict(list)
-  num_totals = 0
-  for network_name, totals in network_totals.items():
-    net_model = get_network_model(network_name)
-    categories[net_model.category].append((net_model.weight, totals))
-    num_totals = max(num_totals, len(totals))
-
-  result = []
-  for category in sorted(categories):
-    category_costs = [0.0] * num_totals
-    category_bytes = [0.0] * num_totals
-    category_sequence_ids = [
-        seq_total.sequence_id for seq_total in categories[category][0][1]
-    ]
-    for category_totals in categories[category]:
-      weight = category_totals[0]
-      for i in range(len(category_totals[1])):
-        seq_total = category_totals[1][i]
-        for graph_total in seq_total.totals:
-          category_costs[i] += weight * (cost_function(graph_total.total_time))
-          category_bytes[i] += weight * (graph_total.request_bytes +
-                                         graph_total.response_bytes)
-
-    category_proto = result_pb2.NetworkCategoryResultProto()
-    category_proto.network_category = category
-    category_proto.cost_per_sequence.extend(category_costs)
-    category_proto.bytes_per_sequence.extend(category_bytes)
-    category_proto.sequence_ids.extend(category_sequence_ids)
-    result.append(category_proto)
+REQUEST_COMPRESSION_MODES = {
+    "exact": patch_subset_method.REQUEST_COMPRESSION_EXACT,
+    "fast": patch_subset_method.REQUEST_COMPRESSION_FAST,
+}
 
-  return result
+# When using --mmap_sequences, the index of the sequences to be simulated.
+# Set before the worker processes are started so they inherit it.
+SEQUENCE_RECORDS = None
+
+# Number of chunks of work, per process, that sequences are split into.
+CHUNKS_PER_PROCESS = 8
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+class CheckpointMismatchError(Exception):
+  """A checkpoint was produced from a different input or set of methods."""
 
 
-def to_network_result_proto(network_model_name, totals, cost_function):  # pylint: disable=too-many-locals
-  """Convert totals from the simulation into a NetworkResultProto."""
-  network_result_proto = result_pb2.NetworkResultProto()
-  network_result_proto.network_model_name = network_model_name
-
-  request_bytes_per_page_view = distribution.Distribution(
-      distribution.LinearBucketer(5))
-  response_bytes_per_page_view = distribution.Distribution(
-      distribution.LinearBucketer(5))
-  latency_distribution = distribution.Distribution(
-      distribution.LinearBucketer(5))
-  cost_per_page_view = distribution.Distribution(distribution.LinearBucketer(5))
-
-  total_request_count = 0
-  total_request_bytes = 0
-  total_response_bytes = 0
-  total_wait_time_ms = 0
-  total_cost = 0
-  for seq_totals in totals:
-    for total in seq_totals.totals:
-      the_cost = cost_function(total.total_time)
-      request_bytes_per_page_view.add_value(total.request_bytes)
-      response_bytes_per_page_view.add_value(total.response_bytes)
-      latency_distribution.add_value(total.total_time)
-      cost_per_page_view.add_value(the_cost)
-      total_request_count += total.num_requests
-      total_request_bytes += total.request_bytes
-      total_response_bytes += total.response_bytes
-      total_wait_time_ms += total.total_time
-      total_cost += the_cost
-
-  network_result_proto.request_bytes_per_page_view.CopyFrom(
-      request_bytes_per_page_view.to_proto())
-  network_result_proto.response_bytes_per_page_view.CopyFrom(
-      response_bytes_per_page_view.to_proto())
-  network_result_proto.wait_per_page_view_ms.CopyFrom(
-      latency_distribution.to_proto())
-  network_result_proto.cost_per_page_view.CopyFrom(
-      cost_per_page_view.to_proto())
-  network_result_proto.total_cost = total_cost
-  network_result_proto.total_wait_time_ms = total_wait_time_ms
-  network_result_proto.total_request_bytes = total_request_bytes
-  network_result_proto.total_response_bytes = total_response_bytes
-  network_result_proto.total_request_count = total_request_count
-
-  return network_result_proto
+NETWORK_MODELS = network_models.ALL_NETWORK_MODELS
 
 
 def write_failed_indices(failed_indices):
@@ -248,6 +208,105 @@ def read_binary_input(input_data_path):
   return page_view_sequence_pb2.DataSetProto.FromString(binary_input)
 
 
+def read_delimited_input(input_data_path, selector):
+  """Lazily reads length delimited PageViewSequenceProto's.
+
+  Returns a generator which yields (serialized sequence, estimated cost) for
+  each sequence that is picked by selector. Sequences are left serialized so
+  they can be sent to another process.
+  """
+  if input_data_path == '-':
+    yield from filter_serialized_sequences(
+        delimited_io.read_records(sys.stdin.buffer), selector)
+    return
+
+  with open(input_data_path, 'rb') as input_data_file:
+    yield from filter_serialized_sequences(
+        delimited_io.read_records(input_data_file), selector)
+
+
+def filter_serialized_sequences(serialized_sequences, selector):
+  """Drops serialized sequences which aren't picked by selector."""
+  for serialized in serialized_sequences:
+    sequence = page_view_sequence_pb2.PageViewSequenceProto.FromString(
+        serialized)
+    if selector.select(sequence):
+      yield serialized, sequence_cost(sequence)
+
+
+class SequenceSelector:
+  """Picks the sequences from the input data which are to be simulated.
+
+  A sequence is simulated if it passes the language filter and, when
+  num_shards is set, is assigned to the shard shard_index. The index of
+  each picked sequence within the full (language filtered) input data is
+  recorded in global_indices.
+
+  Sequences are assigned to shards by id. Sequences without an id (id 0,
+  for example all json input) are assigned by their global index instead.
+  """
+
+  def __init__(self, shard_index=0, num_shards=None):
+    """Selects the sequences of shard shard_index out of num_shards.
+
+    num_shards=None means the input isn't sharded and every sequence that
+    passes the language filter is selected.
+    """
+    self.shard_index = shard_index
+    self.num_shards = num_shards
+    self.num_seen = 0
+    self.global_indices = array.array("Q")
+    self.seen_ids = set()
+    self.warned_duplicate_id = False
+
+  def select(self, sequence):
+    """Returns true if sequence should be simulated."""
+    if not languages.should_keep(sequence.language):
+      return False
+
+    index = self.num_seen
+    self.num_seen += 1
+    if (self.num_shards and shard_for(self.shard_key(sequence, index),
+                                      self.num_shards) != self.shard_index):
+      return False
+
+    self.global_indices.append(index)
+    return True
+
+  def shard_key(self, sequence, index):
+    """Returns what a sequence's shard is picked by: its id or its index."""
+    if not sequence.id:
+      return index
+
+    if sequence.id in self.seen_ids:
+      if not self.warned_duplicate_id:
+        LOG.warning(
+            "Sequence id %s is used by more than one sequence. Sequences "
+            "sharing an id are always assigned to the same shard.", sequence.id)
+        self.warned_duplicate_id = True
+    else:
+      self.seen_ids.add(sequence.id)
+    return sequence.id
+
+
+def shard_for(sequence_id, num_shards):
+  """Deterministically assigns a sequence id to a shard."""
+  return zlib.crc32(str(sequence_id).encode("utf-8")) % num_shards
+
+
+def sequence_cost(sequence):
+  """Estimates the relative cost of simulating a sequence.
+
+  Simulation time grows with both the number of page views and the number
+  of distinct codepoints that fonts get extended with.
+  """
+  codepoints = set()
+  for page_view in sequence.page_views:
+    for content in page_view.contents:
+      codepoints.update(content.codepoints)
+  return max(len(sequence.page_views) * len(codepoints), 1)
+
+
 def read_text_input(input_data_path):
   """Reads text proto data."""
   if input_data_path == '-':
@@ -287,12 +346,51 @@ def read_json_input(input_data_path):
   return result
 
 
-def segment_sequences(sequences, segments):
-  segment_size = max(int(len(sequences) / segments), 1)
-  return ([
-      sequences[s:s + segment_size]
-      for s in range(0, len(sequences), segment_size)
-  ], segment_size)
+def schedule_chunks(costs, num_processes):
+  """Groups sequences into chunks of work for the worker processes.
+
+  Sequences are ordered most expensive first and chunks are filled up to an
+  equal share of the total estimated cost. Expensive sequences end up in
+  small chunks which start early while the cheap ones are batched together
+  at the end, so that all processes finish at around the same time.
+
+  Returns a list of chunks, each a list of sequence indices.
+  """
+  order = sorted(range(len(costs)), key=lambda i: (-costs[i], i))
+  target_cost = sum(costs) / max(num_processes * CHUNKS_PER_PROCESS, 1)
+
+  chunks = []
+  chunk = []
+  chunk_cost = 0
+  for idx in order:
+    chunk.append(idx)
+    chunk_cost += costs[idx]
+    if chunk_cost >= target_cost:
+      chunks.append(chunk)
+      chunk = []
+      chunk_cost = 0
+  if chunk:
+    chunks.append(chunk)
+
+  return chunks
+
+
+def stream_chunks(sequences, chunk_size):
+  """Lazily splits an iterable of (serialized sequence, cost) into chunks.
+
+  Chunks are produced in input order since the full set of sequences is
+  never known up front.
+  """
+  start = 0
+  chunk = []
+  for serialized, _ in sequences:
+    chunk.append(serialized)
+    if len(chunk) == chunk_size:
+      yield list(range(start, start + len(chunk))), chunk
+      start += len(chunk)
+      chunk = []
+  if chunk:
+    yield list(range(start, start + len(chunk))), chunk
 
 
 def do_analysis(serialized_sequences):
@@ -307,27 +405,53 @@ def do_analysis(serialized_sequences):
                                  FONT_DIRECTORY, DEFAULT_FONT_ID)
 
 
-def merge_results(segmented_results, segment_size):
-  """Merge a set of results, one per segment of sequences, into a single result dict."""
+def analyze_chunk(chunk):
+  """Runs the simulation on a chunk of sequences.
 
+  A chunk is a tuple of the global indices of the sequences and the list
+  of serialized sequences. If the sequences are None they are read from
+  SEQUENCE_RECORDS, so only the indices need to be sent to the worker
+  process. Returns a tuple of the indices and the SimulationResults.
+  """
+  indices, serialized_sequences = chunk
+  if serialized_sequences is None:
+    serialized_sequences = [SEQUENCE_RECORDS[i] for i in indices]
+  return indices, do_analysis(serialized_sequences)
+
+
+def merge_results(chunk_results):
+  """Merge a set of results, one per chunk of sequences, into a single result dict.
+
+  chunk_results is a list of (indices, SimulationResults) which may be in any
+  order. Per sequence totals and failed indices are put back in the order of
+  the global sequence indices.
+  """
   failed_indices = []
-  merged = collections.defaultdict(lambda: collections.defaultdict(list))
+  ordered_totals = []
+  for indices, results in chunk_results:
+    failed = set(results.failed_indices)
+    failed_indices.extend(indices[i] for i in failed)
+    succeeded = [idx for i, idx in enumerate(indices) if i not in failed]
+
+    for method, network_results in results.totals_by_method.items():
+      for network, totals in network_results.items():
+        ordered_totals.extend((idx, method, network, total)
+                              for idx, total in zip(succeeded, totals))
 
-  segment_no = 0
-  for segment in segmented_results:
-    failed_indices.extend(
-        [idx + segment_no * segment_size for idx in segment.failed_indices])
-    simulation.merge_results_by_method(segment.totals_by_method, merged)
-    segment_no += 1
+  merged = collections.defaultdict(lambda: collections.defaultdict(list))
+  for _, method, network, total in sorted(ordered_totals,
+                                          key=lambda entry: entry[0]):
+    merged[method][network].append(total)
 
-  return simulation.SimulationResults(merged, failed_indices)
+  return simulation.SimulationResults(merged, sorted(failed_indices))
 
 
-def start_analysis():
-  """Read input data and start up the analysis."""
-  input_data_path = FLAGS.input_data
+def read_sequences(input_data_path, selector):
+  """Read all of the input data, and return the sequences to be simulated.
 
-  LOG.info("Reading input data ...")
+  Returns a list of (serialized sequence, estimated cost). Sequences are
+  serialized so they can be sent to another process.
+  """
   if FLAGS.input_form == "binary":
     data_set = read_binary_input(input_data_path)
   elif FLAGS.input_form == "text":
@@ -335,52 +459,321 @@ def start_analysis():
   elif FLAGS.input_form == "json":
     data_set = read_json_input(input_data_path)
   else:
-    LOG.error("Unknown input_form. Needs to be 'binary', 'text', or 'json'.")
+    LOG.error("Unknown input_form. Needs to be 'binary', 'text', 'json', "
+              "or 'delimited'.")
   LOG.info('Read %s sequences', len(data_set.sequences))
 
   if data_set.logged_method_name:
     PFE_METHODS.append(logged_pfe_method.for_name(data_set.logged_method_name))
 
   LOG.info("Preparing input data.")
-  # the sequence proto's need to be serialized since they are being
-  # sent to another process.
-  sequences = [
-      sequence.SerializeToString()
-      for sequence in data_set.sequences
-      if languages.should_keep(sequence.language)
-  ]
-  segmented_sequences, segment_size = segment_sequences(sequences,
-                                                        FLAGS.parallelism * 2)
+  return [(sequence.SerializeToString(), sequence_cost(sequence))
+          for sequence in data_set.sequences
+          if selector.select(sequence)]
+
+
+def prepare_sequence_records(input_data_path, temp_dir, selector):
+  """Produces a memory mappable file of the sequences to be simulated.
+
+  A delimited input file is used as is, only the index of sequences which
+  pass the language filter is built. Otherwise the sequences are written
+  to a file in temp_dir. Returns a tuple of a delimited_io.MappedRecords
+  and the estimated cost of each sequence.
+  """
+  costs = []
+  if FLAGS.input_form == "delimited" and input_data_path != '-':
+    records = delimited_io.MappedRecords(input_data_path)
+    with open(input_data_path, 'rb') as input_data_file:
+      for offset, serialized in delimited_io.read_records_with_offsets(
+          input_data_file):
+        sequence = page_view_sequence_pb2.PageViewSequenceProto.FromString(
+            serialized)
+        if selector.select(sequence):
+          records.add(offset, len(serialized))
+          costs.append(sequence_cost(sequence))
+    return records, costs
+
+  if FLAGS.input_form == "delimited":
+    sequences = read_delimited_input(input_data_path, selector)
+  else:
+    sequences = read_sequences(input_data_path, selector)
+
+  records = delimited_io.MappedRecords(os.path.join(temp_dir, "sequences"))
+  with open(records.path, 'wb') as records_file:
+    for serialized, estimated_cost in sequences:
+      delimited_io.write_record(records_file, serialized)
+      records.add(records_file.tell() - len(serialized), len(serialized))
+      costs.append(estimated_cost)
+  return records, costs
+
+
+def analyze_chunks(chunks, pool):
+  """Runs analyze_chunk on each chunk, yielding results as they complete.
+
+  Chunks are handed out to whichever process is free next. At most two
+  chunks per process are queued at once so that chunks can be produced
+  lazily without all of them being held in memory.
+  """
+  completed = queue.Queue()
+  pending = 0
+  for chunk in chunks:
+    pool.apply_async(analyze_chunk, (chunk,),
+                     callback=completed.put,
+                     error_callback=completed.put)
+    pending += 1
+    if pending >= 2 * FLAGS.parallelism:
+      yield get_chunk_result(completed)
+      pending -= 1
+
+  while pending:
+    yield get_chunk_result(completed)
+    pending -= 1
+
+
+def get_chunk_result(completed):
+  """Waits for the next chunk result, raising the error if the chunk failed."""
+  result = completed.get()
+  if isinstance(result, Exception):
+    raise result
+  return result
+
+
+def run_analysis(chunks):
+  """Runs analyze_chunk on each chunk and merges the results.
+
+  If --checkpoint_dir is set, chunks which were already completed by an
+  earlier run are skipped and each newly completed chunk is saved.
+  """
+  if not FLAGS.checkpoint_dir:
+    return merge_results(analyze_all(chunks))
+
+  key = checkpoint_key()
+  os.makedirs(FLAGS.checkpoint_dir, exist_ok=True)
+  loaded = load_checkpoints(FLAGS.checkpoint_dir, key, FLAGS.retry_failed)
+  completed = {idx for indices, _ in loaded for idx in indices}
+  LOG.info("Resuming with %s sequences already simulated.", len(completed))
+
+  new_results = save_checkpoints(FLAGS.checkpoint_dir, key,
+                                 analyze_all(skip_completed(chunks, completed)))
+  return merge_results(itertools.chain(loaded, new_results))
+
 
-  LOG.info("Running simulations on %s sequences.", len(sequences))
+def analyze_all(chunks):
+  """Runs analyze_chunk on each chunk, yielding results as they complete."""
   if FLAGS.parallelism > 1:
-    with Pool(FLAGS.parallelism) as pool:
-      results = merge_results(pool.map(do_analysis, segmented_sequences),
-                              segment_size)
+    with Pool(FLAGS.parallelism, initializer=init_worker) as pool:
+      yield from analyze_chunks(chunks, pool)
+      # Let the workers exit normally so that they log their cache stats.
+      pool.close()
+      pool.join()
+    return
+
+  for chunk in chunks:
+    yield analyze_chunk(chunk)
+  log_cache_stats()
+
+
+def init_worker():
+  """Sets up a worker process to log its cache stats when it exits."""
+  # Workers don't run atexit handlers, only multiprocessing finalizers.
+  multiprocessing.util.Finalize(None, log_cache_stats, exitpriority=10)
+
+
+def log_cache_stats():
+  """Logs how effective this process's caches were."""
+  cache = subset_sizer.PERSISTENT_CACHE
+  if cache is not None:
+    cache.flush()
+    LOG.info("Process %s --subset_size_cache: %s hits, %s misses.", os.getpid(),
+             cache.hits, cache.misses)
+
+  if FLAGS.patch_subset_cache_mb:
+    stats = patch_subset_method.cache_stats()
+    LOG.info(
+        "Process %s patch subset caches: subsets %s hits, %s misses; "
+        "patches %s hits, %s misses; %s bytes.", os.getpid(), stats.subset_hits,
+        stats.subset_misses, stats.patch_hits, stats.patch_misses,
+        stats.size_bytes)
+
+
+def checkpoint_key():
+  """Identifies the input and configuration that checkpoints belong to.
+
+  Sequence indices are only meaningful for a specific input, shard and
+  language filter, and totals only for a specific set of methods, fonts,
+  method settings and way of measuring sizes. Method names don't encode
+  their settings, so the flags which configure them are part of the key.
+  """
+  language_filter = sorted(languages.language_filter() or [])
+  method_names = sorted(method.name() for method in PFE_METHODS)
+  return (FLAGS.input_data, input_fingerprint(FLAGS.input_data),
+          FLAGS.input_form, FLAGS.shard_index, FLAGS.num_shards,
+          language_filter, FLAGS.script_category, method_names,
+          FLAGS.font_directory, FLAGS.default_font_id, FLAGS.auto_settings,
+          FLAGS.no_opt, FLAGS.request_compression,
+          FLAGS.estimate_range_request_sizes)
+
+
+def input_fingerprint(input_data_path):
+  """Identifies the contents of the input by its size and modification time.
+
+  Returns None for standard input.
+  """
+  if input_data_path == '-':
+    return None
+  stat = os.stat(input_data_path)
+  return (stat.st_size, stat.st_mtime_ns)
+
+
+def skip_completed(chunks, completed):
+  """Removes the sequences in the set completed from each chunk.
+
+  Chunks which have no sequences left are dropped entirely.
+  """
+  for indices, serialized_sequences in chunks:
+    keep = [i for i, idx in enumerate(indices) if idx not in completed]
+    if len(keep) == len(indices):
+      yield indices, serialized_sequences
+    elif keep:
+      yield ([indices[i] for i in keep], None if serialized_sequences is None
+             else [serialized_sequences[i] for i in keep])
+
+
+def save_checkpoints(checkpoint_dir, key, chunk_results):
+  """Saves each chunk result to checkpoint_dir as it passes through."""
+  for indices, results in chunk_results:
+    write_checkpoint(
+        os.path.join(checkpoint_dir,
+                     uuid.uuid4().hex + CHECKPOINT_SUFFIX), key, indices,
+        results)
+    yield indices, results
+
+
+def write_checkpoint(path, key, indices, results):
+  """Atomically writes a single chunk result to path."""
+  temp_path = path + ".tmp"
+  with open(temp_path, 'wb') as checkpoint_file:
+    pickle.dump((key, indices, results), checkpoint_file)
+  os.replace(temp_path, path)
+
+
+def load_checkpoints(checkpoint_dir, key, retry_failed):
+  """Loads all of the chunk results saved in checkpoint_dir.
+
+  Returns a list of (indices, SimulationResults). If retry_failed is set,
+  failed sequences are removed from the checkpoints so that they will be
+  simulated again.
+  """
+  chunk_results = []
+  for name in sorted(os.listdir(checkpoint_dir)):
+    if not name.endswith(CHECKPOINT_SUFFIX):
+      continue
+
+    path = os.path.join(checkpoint_dir, name)
+    with open(path, 'rb') as checkpoint_file:
+      checkpoint_key_value, indices, results = pickle.load(checkpoint_file)
+    if checkpoint_key_value != key:
+      raise CheckpointMismatchError(
+          "Checkpoint %s was not produced by a run with the same input and "
+          "methods." % path)
+
+    if retry_failed and results.failed_indices:
+      failed = set(results.failed_indices)
+      indices = [idx for i, idx in enumerate(indices) if i not in failed]
+      results = simulation.SimulationResults(results.totals_by_method, [])
+      if not indices:
+        os.remove(path)
+        continue
+      write_checkpoint(path, key, indices, results)
+
+    chunk_results.append((indices, results))
+
+  return chunk_results
+
+
+def start_analysis():
+  """Read input data and start up the analysis."""
+  global SEQUENCE_RECORDS  # pylint: disable=global-statement
+  input_data_path = FLAGS.input_data
+  if FLAGS.num_shards and not 0 <= FLAGS.shard_index < FLAGS.num_shards:
+    raise app.UsageError("--shard_index must be less than --num_shards.")
+  selector = SequenceSelector(FLAGS.shard_index, FLAGS.num_shards)
+
+  LOG.info("Reading input data ...")
+  if FLAGS.mmap_sequences:
+    with tempfile.TemporaryDirectory() as temp_dir:
+      SEQUENCE_RECORDS, costs = prepare_sequence_records(
+          input_data_path, temp_dir, selector)
+      LOG.info("Running simulations on %s mapped sequences.", len(costs))
+      results = run_analysis([
+          (indices, None)
+          for indices in schedule_chunks(costs, FLAGS.parallelism)
+      ])
+      SEQUENCE_RECORDS.close()
+  elif FLAGS.input_form == "delimited":
+    # Sequences are streamed from the input to the workers, so the full data
+    # set is never in memory.
+    LOG.info("Running simulations on streamed sequences.")
+    results = run_analysis(
+        stream_chunks(read_delimited_input(input_data_path, selector),
+                      FLAGS.chunk_size))
   else:
-    results = merge_results([do_analysis(s) for s in segmented_sequences],
-                            segment_size)
+    sequences = read_sequences(input_data_path, selector)
+    LOG.info("Running simulations on %s sequences.", len(sequences))
+    costs = [estimated_cost for _, estimated_cost in sequences]
+    chunks = schedule_chunks(costs, FLAGS.parallelism)
+    results = run_analysis([
+        (indices, [sequences[i][0] for i in indices]) for indices in chunks
+    ])
 
   if results.failed_indices:
     LOG.info("%s sequences dropped due to errors in simulation.",
              len(results.failed_indices))
     if FLAGS.failed_indices_out:
-      write_failed_indices(results.failed_indices)
+      write_failed_indices(
+          selector.global_indices[i] for i in results.failed_indices)
 
   LOG.info("Formatting output.")
-  results = to_protos(results.totals_by_method, cost.cost)
-
-  results_proto = result_pb2.AnalysisResultProto()
-  for method_result in results:
+  results_proto = result_pb2.AnalysisResultProto(
+      request_compression_mode=result_pb2.RequestCompressionMode.Value(
+          "REQUEST_COMPRESSION_" + FLAGS.request_compression.upper()),
+      estimated_range_request_sizes=FLAGS.estimate_range_request_sizes)
+  for method_result in result_protos.to_protos(results.totals_by_method,
+                                               cost.cost):
     results_proto.results.append(method_result)
 
+  if FLAGS.num_shards:
+    results_proto.shard.CopyFrom(
+        result_protos.to_shard_proto(results, selector.global_indices,
+                                     FLAGS.shard_index, FLAGS.num_shards))
+
   return results_proto
 
 
 def install_flags():
+  """Saves flag values in globals (see main)."""
   global FONT_DIRECTORY, DEFAULT_FONT_ID  # pylint: disable=global-statement
   FONT_DIRECTORY = FLAGS.font_directory
   DEFAULT_FONT_ID = FLAGS.default_font_id
+  if FLAGS.subset_size_cache:
+    cache = persistent_cache.PersistentCache(
+        FLAGS.subset_size_cache, FLAGS.subset_size_cache_max_entries)
+    subset_sizer.PERSISTENT_CACHE = cache
+    range_size_oracle.PERSISTENT_CACHE = cache
+    slicing_strategy_loader.PERSISTENT_CACHE = cache
+  range_size_oracle.ESTIMATE_SIZES = FLAGS.estimate_range_request_sizes
+  if FLAGS.unicode_range_size_table:
+    unicode_range_pfe_method.load_subset_size_table(
+        FLAGS.unicode_range_size_table)
+  patch_subset_method.set_request_compression(
+      REQUEST_COMPRESSION_MODES[FLAGS.request_compression])
+  patch_subset_method.set_cache_budget(patch_subset_cache_budget())
+
+
+def patch_subset_cache_budget():
+  """Returns the budget in bytes of each patch subset server cache."""
+  num_caches = 2 * max(FLAGS.parallelism, 1)
+  return FLAGS.patch_subset_cache_mb * 1024 * 1024 // num_caches
 
 
 def main(argv):
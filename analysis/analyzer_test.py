@@ -1,193 +1,110 @@
 """Unit tests for the analyzer module."""
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 from analysis import analyzer
-from analysis import result_pb2
+from analysis import languages
+from analysis import page_view_sequence_pb2
 from analysis import simulation
 
 
-def mock_cost(total_time_ms):
-  return total_time_ms / 10
-
-
 def sr(values, failed_indices=None):  # pylint: disable=invalid-name
   if failed_indices is None:
     failed_indices = []
   return simulation.SimulationResults(values, failed_indices)
 
 
-def s(values):  # pylint: disable=invalid-name
-  return simulation.SequenceTotals(values, 42)
-
-
-def g(time, request, response):  # pylint: disable=invalid-name
-  return simulation.GraphTotal(time, request, response, 0)
-
-
 class AnalyzerTest(unittest.TestCase):
 
-  def test_to_network_category_protos(self):
-    cost_function = lambda cost: cost * 2
-    network_totals = {
-        "desktop_slowest": [
-            s([
-                g(100, 200, 300),
-                g(200, 300, 400),
-                g(300, 400, 500),
-            ]),
-            s([
-                g(200, 300, 400),
-                g(300, 400, 500),
-            ]),
-        ],
-        "desktop_median": [
-            s([
-                g(10, 20, 30),
-                g(20, 30, 40),
-            ]),
-            s([
-                g(30, 40, 50),
-            ]),
-        ],
-        "mobile_wifi_slowest": [
-            s([g(1, 2, 3)]),
-            s([g(4, 5, 6)]),
-        ]
-    }
-
-    result = analyzer.to_network_category_protos(network_totals, cost_function)
-
-    self.assertEqual(len(result), 2)
-    self.assertEqual(result[0].network_category, "desktop")
-    self.assertEqual(len(result[0].cost_per_sequence), 2)
-    self.assertEqual(len(result[0].bytes_per_sequence), 2)
-
-    self.assertEqual(result[1].network_category, "wifi")
-    self.assertEqual(len(result[1].cost_per_sequence), 2)
-    self.assertEqual(len(result[1].bytes_per_sequence), 2)
-
-    # s0:
-    #  cost =   0.05 * 2 * (100 + 200 + 300)
-    #         + 0.50 * 2 * (10 + 20)
-    #  bytes =  0.05 * (200 + 300 + 300 + 400 + 400 + 500)
-    #         + 0.50 * (20 + 30 + 30 + 40)
-    self.assertEqual(result[0].cost_per_sequence[0], 90)
-    self.assertEqual(result[0].bytes_per_sequence[0], 165)
-
-    # s1:
-    #  cost =   0.05 * 2 * (200 + 300)
-    #         + 0.50 * 2 * (30)
-    #  bytes =  0.05 * (300 + 400 + 400 + 500)
-    #         + 0.50 * (40 + 50)
-    self.assertEqual(result[0].cost_per_sequence[1], 80)
-    self.assertEqual(result[0].bytes_per_sequence[1], 125)
-
-  def test_result_to_protos(self):
-    self.maxDiff = None  # pylint: disable=invalid-name
-    method_proto = result_pb2.MethodResultProto()
-    method_proto.method_name = "Fake_PFE"
-
-    network_category_proto = result_pb2.NetworkCategoryResultProto()
-    network_category_proto.network_category = "2G"
-    network_category_proto.cost_per_sequence.extend([210.0, 0.0])
-    network_category_proto.bytes_per_sequence.extend([3000.0, 0.0])
-    network_category_proto.sequence_ids.append(42)
-    method_proto.results_by_network_category.append(network_category_proto)
-
-    network_category_proto = result_pb2.NetworkCategoryResultProto()
-    network_category_proto.network_category = "desktop"
-    network_category_proto.cost_per_sequence.extend([10.0, 10.0])
-    network_category_proto.bytes_per_sequence.extend([1500.0, 1500.0])
-    network_category_proto.sequence_ids.extend([42, 43])
-    method_proto.results_by_network_category.append(network_category_proto)
-
-    network_proto = result_pb2.NetworkResultProto()
-    network_proto.network_model_name = "desktop_median"
-    network_proto.total_cost = 40
-    network_proto.total_wait_time_ms = 400
-    network_proto.wait_per_page_view_ms.buckets.add(end=200)
-    network_proto.wait_per_page_view_ms.buckets.add(end=205, count=2)
-    network_proto.cost_per_page_view.buckets.add(end=20)
-    network_proto.cost_per_page_view.buckets.add(end=25, count=2)
-    network_proto.request_bytes_per_page_view.buckets.add(end=1000)
-    network_proto.request_bytes_per_page_view.buckets.add(end=1005, count=2)
-    network_proto.response_bytes_per_page_view.buckets.add(end=2000)
-    network_proto.response_bytes_per_page_view.buckets.add(end=2005, count=2)
-    network_proto.total_request_bytes = 2000
-    network_proto.total_response_bytes = 4000
-    network_proto.total_request_count = 12
-    method_proto.results_by_network.append(network_proto)
-
-    network_proto = result_pb2.NetworkResultProto()
-    network_proto.network_model_name = "mobile_2g_median"
-    network_proto.total_cost = 420
-    network_proto.total_wait_time_ms = 4200
-    network_proto.wait_per_page_view_ms.buckets.add(end=2100)
-    network_proto.wait_per_page_view_ms.buckets.add(end=2105, count=2)
-    network_proto.cost_per_page_view.buckets.add(end=210)
-    network_proto.cost_per_page_view.buckets.add(end=215, count=2)
-    network_proto.request_bytes_per_page_view.buckets.add(end=1000)
-    network_proto.request_bytes_per_page_view.buckets.add(end=1005, count=2)
-    network_proto.response_bytes_per_page_view.buckets.add(end=2000)
-    network_proto.response_bytes_per_page_view.buckets.add(end=2005, count=2)
-    network_proto.total_request_bytes = 2000
-    network_proto.total_response_bytes = 4000
-    network_proto.total_request_count = 12
-    method_proto.results_by_network.append(network_proto)
-
-    self.assertEqual(
-        analyzer.to_protos(
-            {
-                "Fake_PFE": {
-                    "mobile_2g_median": [
-                        simulation.SequenceTotals([
-                            simulation.GraphTotal(2100, 1000, 2000, 5),
-                            simulation.GraphTotal(2100, 1000, 2000, 7)
-                        ], 42),
-                    ],
-                    "desktop_median": [
-                        simulation.SequenceTotals([
-                            simulation.GraphTotal(200, 1000, 2000, 5),
-                        ], 42),
-                        simulation.SequenceTotals(
-                            [simulation.GraphTotal(200, 1000, 2000, 7)], 43),
-                    ]
-                }
-            }, mock_cost), [method_proto])
-
-  def test_segment_sequences(self):
-    self.assertEqual(([], 1), analyzer.segment_sequences([], 3))
-    self.assertEqual(([[1, 2, 3, 4, 5, 6, 7, 8, 9]], 9),
-                     analyzer.segment_sequences([1, 2, 3, 4, 5, 6, 7, 8, 9], 1))
-    self.assertEqual(([[1, 2, 3, 4], [5, 6, 7, 8], [9]], 4),
-                     analyzer.segment_sequences([1, 2, 3, 4, 5, 6, 7, 8, 9], 2))
-    self.assertEqual(([[1, 2, 3], [4, 5, 6], [7, 8, 9]], 3),
-                     analyzer.segment_sequences([1, 2, 3, 4, 5, 6, 7, 8, 9], 3))
-    self.assertEqual(([[1], [2], [3], [4], [5], [6], [7], [8], [9]], 1),
-                     analyzer.segment_sequences([1, 2, 3, 4, 5, 6, 7, 8, 9], 9))
-    self.assertEqual(([[1], [2], [3], [4], [5], [6], [7], [8], [9]], 1),
-                     analyzer.segment_sequences([1, 2, 3, 4, 5, 6, 7, 8, 9],
-                                                10))
+  def test_sequence_cost(self):
+    sequence = page_view_sequence_pb2.PageViewSequenceProto()
+    self.assertEqual(analyzer.sequence_cost(sequence), 1)
+
+    page_view = sequence.page_views.add()
+    page_view.contents.add(codepoints=[1, 2, 3])
+    page_view.contents.add(codepoints=[3, 4])
+    sequence.page_views.add().contents.add(codepoints=[1, 5])
+    self.assertEqual(analyzer.sequence_cost(sequence), 10)
+
+  @mock.patch.object(languages, "should_keep", return_value=True)
+  def test_sequence_selector(self, _):
+    sequences = []
+    for i in range(20):
+      sequence = page_view_sequence_pb2.PageViewSequenceProto()
+      sequence.id = i
+      sequences.append(sequence)
+
+    selector = analyzer.SequenceSelector()
+    self.assertTrue(all(selector.select(seq) for seq in sequences))
+    self.assertEqual(list(selector.global_indices), list(range(20)))
+
+    selected = set()
+    for shard_index in range(3):
+      selector = analyzer.SequenceSelector(shard_index, 3)
+      picked = [seq.id for seq in sequences if selector.select(seq)]
+      self.assertEqual(list(selector.global_indices), picked)
+      self.assertEqual(
+          picked,
+          [i for i in range(20) if analyzer.shard_for(i, 3) == shard_index])
+      selected.update(picked)
+
+    self.assertEqual(selected, set(range(20)))
+
+  @mock.patch.object(languages, "should_keep", return_value=True)
+  def test_sequence_selector_without_ids(self, _):
+    sequences = [
+        page_view_sequence_pb2.PageViewSequenceProto() for _ in range(20)
+    ]
+
+    selected = []
+    for shard_index in range(3):
+      selector = analyzer.SequenceSelector(shard_index, 3)
+      picked = [i for i, seq in enumerate(sequences) if selector.select(seq)]
+      self.assertEqual(list(selector.global_indices), picked)
+      self.assertLess(len(picked), 20)
+      selected.extend(picked)
+
+    self.assertEqual(sorted(selected), list(range(20)))
+
+  def test_schedule_chunks(self):
+    self.assertEqual([], analyzer.schedule_chunks([], 3))
+    self.assertEqual([[0, 1, 2, 3]], analyzer.schedule_chunks([1, 1, 1, 1], 0))
+    # Total cost is 40 and there's 8 chunks per process, so chunks are filled
+    # up to a cost of 5.
+    self.assertEqual([[1], [3], [0, 2], [4, 5, 6, 7, 8]],
+                     analyzer.schedule_chunks([4, 20, 1, 10, 1, 1, 1, 1, 1], 1))
+
+  def test_stream_chunks(self):
+    self.assertEqual([], list(analyzer.stream_chunks([], 2)))
+    self.assertEqual([
+        ([0, 1], [b"a", b"b"]),
+        ([2, 3], [b"c", b"d"]),
+        ([4], [b"e"]),
+    ],
+                     list(
+                         analyzer.stream_chunks([(b"a", 1), (b"b", 1),
+                                                 (b"c", 1), (b"d", 1),
+                                                 (b"e", 1)], 2)))
 
   def test_merge_results(self):
-    self.assertEqual(analyzer.merge_results([], 10),
+    self.assertEqual(analyzer.merge_results([]),
                      simulation.SimulationResults(dict(), []))
     self.assertEqual(
-        analyzer.merge_results([sr({"abc": {
-            "def": [1]
-        }}, [13])], 10),
+        analyzer.merge_results([([13], sr({"abc": {
+            "def": []
+        }}, [0]))]),
         # Expected
-        sr({"abc": {
-            "def": [1]
-        }}, [13]))
+        sr({}, [13]))
 
     self.assertEqual(
         analyzer.merge_results([
-            sr({"abc": {
+            ([10, 11], sr({"abc": {
                 "def": [1]
-            }}, [11]),
-            sr({}, [13]),
-        ], 10),
+            }}, [1])),
+            ([23], sr({}, [0])),
+        ]),
         # Expected
         sr({"abc": {
             "def": [1]
@@ -195,13 +112,13 @@ class AnalyzerTest(unittest.TestCase):
 
     self.assertEqual(
         analyzer.merge_results([
-            sr({"abc": {
+            ([0], sr({"abc": {
                 "jkl": [1]
-            }}),
-            sr({"def": {
+            }})),
+            ([1], sr({"def": {
                 "ghi": [2]
-            }}),
-        ], 10), sr({
+            }})),
+        ]), sr({
             "abc": {
                 "jkl": [1]
             },
@@ -212,30 +129,16 @@ class AnalyzerTest(unittest.TestCase):
 
     self.assertEqual(
         analyzer.merge_results([
-            sr({"abc": {
+            ([0], sr({"abc": {
                 "jkl": [1]
-            }}),
-            sr({"abc": {
+            }})),
+            ([1], sr({"abc": {
                 "jkl": [2]
-            }}),
-        ], 10), sr({
-            "abc": {
-                "jkl": [1, 2]
-            },
-        }))
-
-    self.assertEqual(
-        analyzer.merge_results([
-            sr({"abc": {
-                "jkl": [1]
-            }}),
-            sr({"abc": {
-                "jkl": [2]
-            }}),
-            sr({"mno": {
+            }})),
+            ([2], sr({"mno": {
                 "jkl": [3]
-            }}),
-        ], 10), sr({
+            }})),
+        ]), sr({
             "abc": {
                 "jkl": [1, 2]
             },
@@ -246,19 +149,136 @@ class AnalyzerTest(unittest.TestCase):
 
     self.assertEqual(
         analyzer.merge_results([
-            sr({"abc": {
+            ([0], sr({"abc": {
                 "jkl": [1]
-            }}),
-            sr({"abc": {
+            }})),
+            ([1], sr({"abc": {
                 "mno": [2]
-            }}),
-        ], 10), sr({
+            }})),
+        ]), sr({
             "abc": {
                 "jkl": [1],
                 "mno": [2]
             },
         }))
 
+  def test_merge_results_out_of_order(self):
+    self.assertEqual(
+        analyzer.merge_results([
+            ([4, 1, 3], sr({"abc": {
+                "jkl": [4, 3]
+            }}, [1])),
+            ([0, 5, 2], sr({"abc": {
+                "jkl": [0, 5]
+            }}, [2])),
+        ]), sr({"abc": {
+            "jkl": [0, 3, 4, 5]
+        }}, [1, 2]))
+
+  def test_skip_completed(self):
+    self.assertEqual([
+        ([0, 1], [b"a", b"b"]),
+        ([3], [b"d"]),
+        ([6, 8], None),
+    ],
+                     list(
+                         analyzer.skip_completed([
+                             ([0, 1], [b"a", b"b"]),
+                             ([2, 3], [b"c", b"d"]),
+                             ([4], [b"e"]),
+                             ([6, 7, 8], None),
+                         ], {2, 4, 7})))
+
+  def test_checkpoints(self):
+    key = ("input", "binary", [], ["method"])
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+      saved = list(
+          analyzer.save_checkpoints(checkpoint_dir, key, [
+              ([4, 1, 3], sr({"abc": {
+                  "jkl": [4, 3]
+              }}, [1])),
+              ([2], sr({"abc": {
+                  "jkl": [2]
+              }})),
+          ]))
+      self.assertEqual(len(saved), 2)
+      self.assertEqual(len(os.listdir(checkpoint_dir)), 2)
+
+      loaded = analyzer.load_checkpoints(checkpoint_dir, key, False)
+      self.assertEqual(analyzer.merge_results(loaded),
+                       sr({"abc": {
+                           "jkl": [2, 3, 4]
+                       }}, [1]))
+
+      with self.assertRaises(analyzer.CheckpointMismatchError):
+        analyzer.load_checkpoints(checkpoint_dir, ("other",), False)
+
+      # Retrying drops the failed sequence from the saved checkpoints.
+      loaded = analyzer.load_checkpoints(checkpoint_dir, key, True)
+      self.assertEqual(analyzer.merge_results(loaded),
+                       sr({"abc": {
+                           "jkl": [2, 3, 4]
+                       }}))
+      self.assertEqual(
+          analyzer.merge_results(
+              analyzer.load_checkpoints(checkpoint_dir, key, False)),
+          sr({"abc": {
+              "jkl": [2, 3, 4]
+          }}))
+
+  def test_input_fingerprint(self):
+    with tempfile.TemporaryDirectory() as the_dir:
+      path = os.path.join(the_dir, "input")
+      with open(path, "wb") as input_file:
+        input_file.write(b"abc")
+      fingerprint = analyzer.input_fingerprint(path)
+      self.assertEqual(fingerprint, analyzer.input_fingerprint(path))
+
+      with open(path, "ab") as input_file:
+        input_file.write(b"d")
+      self.assertNotEqual(fingerprint, analyzer.input_fingerprint(path))
+
+    self.assertIsNone(analyzer.input_fingerprint("-"))
+
+  @mock.patch.object(languages, "language_filter", return_value=None)
+  def test_checkpoint_key_includes_settings(self, _):
+    flag_values = {
+        "input_data": "-",
+        "input_form": "binary",
+        "shard_index": 0,
+        "num_shards": None,
+        "script_category": None,
+        "font_directory": "fonts",
+        "default_font_id": "Roboto-Regular.ttf",
+        "auto_settings": False,
+        "no_opt": False,
+        "request_compression": "exact",
+        "estimate_range_request_sizes": False,
+    }
+    keys = []
+    for name, value in [(None, None), ("font_directory", "other_fonts"),
+                        ("default_font_id", "Other.ttf"),
+                        ("script_category", "cjk"), ("auto_settings", True),
+                        ("no_opt", True)]:
+      flags = mock.Mock(**flag_values)
+      if name:
+        setattr(flags, name, value)
+      with mock.patch.object(analyzer, "FLAGS", flags):
+        keys.append(analyzer.checkpoint_key())
+
+    # Changing any one of the settings changes the key.
+    for key in keys[1:]:
+      self.assertNotEqual(key, keys[0])
+
+  def test_patch_subset_cache_budget(self):
+    flags = mock.Mock(patch_subset_cache_mb=128, parallelism=4)
+    with mock.patch.object(analyzer, "FLAGS", flags):
+      self.assertEqual(analyzer.patch_subset_cache_budget(), 16 * 1024 * 1024)
+
+    flags = mock.Mock(patch_subset_cache_mb=128, parallelism=1)
+    with mock.patch.object(analyzer, "FLAGS", flags):
+      self.assertEqual(analyzer.patch_subset_cache_budget(), 64 * 1024 * 1024)
+
 
 if __name__ == '__main__':
   unittest.main()
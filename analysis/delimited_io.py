@@ -0,0 +1,139 @@
+"""Reads and writes streams of length delimited records.
+
+Each record is the varint encoded length of the record followed by the
+record bytes (typically a serialized proto). This allows a large data set
+to be written and read one record at a time instead of as a single proto.
+"""
+
+import array
+import mmap
+
+
+class DelimitedFormatError(Exception):
+  """The input stream is not a valid sequence of length delimited records."""
+
+
+def encode_varint(value):
+  """Encodes a non-negative integer as a base 128 varint."""
+  result = bytearray()
+  while True:
+    bits = value & 0x7F
+    value >>= 7
+    if value:
+      result.append(bits | 0x80)
+    else:
+      result.append(bits)
+      return bytes(result)
+
+
+def write_record(out_file, record):
+  """Writes a single length delimited record to out_file."""
+  out_file.write(encode_varint(len(record)))
+  out_file.write(record)
+
+
+def write_messages(out_file, messages):
+  """Writes each proto message in messages to out_file as a record."""
+  for message in messages:
+    write_record(out_file, message.SerializeToString())
+
+
+def read_varint(in_file):
+  """Reads a varint from in_file. Returns None at the end of the stream."""
+  return read_varint_with_size(in_file)[0]
+
+
+def read_varint_with_size(in_file):
+  """Reads a varint from in_file.
+
+  Returns a tuple of the value and the number of bytes read. The value is
+  None at the end of the stream.
+  """
+  result = 0
+  size = 0
+  while True:
+    byte = in_file.read(1)
+    if not byte:
+      if size:
+        raise DelimitedFormatError("Stream ended in the middle of a varint.")
+      return None, 0
+
+    result |= (byte[0] & 0x7F) << (7 * size)
+    size += 1
+    if not byte[0] & 0x80:
+      return result, size
+
+
+def read_records(in_file):
+  """Lazily reads each record from in_file.
+
+  Returns a generator which yields the bytes of each record.
+  """
+  for _, record in read_records_with_offsets(in_file):
+    yield record
+
+
+def read_records_with_offsets(in_file):
+  """Lazily reads each record from in_file.
+
+  Returns a generator which yields a tuple of the offset of the record
+  bytes (relative to where reading started) and the bytes of the record.
+  """
+  offset = 0
+  while True:
+    length, varint_size = read_varint_with_size(in_file)
+    if length is None:
+      return
+
+    offset += varint_size
+    record = in_file.read(length)
+    if len(record) != length:
+      raise DelimitedFormatError("Stream ended in the middle of a record.")
+    yield offset, record
+    offset += length
+
+
+class MappedRecords:
+  """Random access to a set of records stored in a length delimited file.
+
+  Holds an index of the offset and length of each record. The file itself is
+  only memory mapped on first access, so copies of this object (for example
+  in forked worker processes) each map the file and read records directly
+  from it.
+  """
+
+  def __init__(self, path):
+    self.path = path
+    self.offsets = array.array("Q")
+    self.lengths = array.array("Q")
+    self.mapped = None
+
+  def add(self, offset, length):
+    """Adds the record at offset with length to the end of the index."""
+    self.offsets.append(offset)
+    self.lengths.append(length)
+
+  def __len__(self):
+    return len(self.offsets)
+
+  def __getitem__(self, index):
+    """Returns the bytes of the record at index, mapping the file if needed."""
+    if self.mapped is None:
+      with open(self.path, "rb") as records_file:
+        self.mapped = mmap.mmap(records_file.fileno(),
+                                0,
+                                access=mmap.ACCESS_READ)
+
+    offset = self.offsets[index]
+    return self.mapped[offset:offset + self.lengths[index]]
+
+  def __getstate__(self):
+    state = dict(self.__dict__)
+    state["mapped"] = None
+    return state
+
+  def close(self):
+    """Unmaps the records file if it is mapped."""
+    if self.mapped is not None:
+      self.mapped.close()
+      self.mapped = None
@@ -0,0 +1,73 @@
+"""Unit tests for the delimited_io module."""
+
+import io
+import os
+import tempfile
+import unittest
+
+from analysis import delimited_io
+
+
+class DelimitedIoTest(unittest.TestCase):
+
+  def test_encode_varint(self):
+    self.assertEqual(delimited_io.encode_varint(0), b"\x00")
+    self.assertEqual(delimited_io.encode_varint(1), b"\x01")
+    self.assertEqual(delimited_io.encode_varint(127), b"\x7f")
+    self.assertEqual(delimited_io.encode_varint(128), b"\x80\x01")
+    self.assertEqual(delimited_io.encode_varint(300), b"\xac\x02")
+
+  def test_read_varint(self):
+    self.assertEqual(delimited_io.read_varint(io.BytesIO(b"\xac\x02")), 300)
+    self.assertEqual(delimited_io.read_varint(io.BytesIO(b"\x00")), 0)
+    self.assertIsNone(delimited_io.read_varint(io.BytesIO(b"")))
+
+    with self.assertRaises(delimited_io.DelimitedFormatError):
+      delimited_io.read_varint(io.BytesIO(b"\xac"))
+
+  def test_round_trip(self):
+    records = [b"abc", b"", b"x" * 1000]
+    out_file = io.BytesIO()
+    for record in records:
+      delimited_io.write_record(out_file, record)
+
+    self.assertEqual(
+        list(delimited_io.read_records(io.BytesIO(out_file.getvalue()))),
+        records)
+
+  def test_read_records_truncated(self):
+    with self.assertRaises(delimited_io.DelimitedFormatError):
+      list(delimited_io.read_records(io.BytesIO(b"\x05abc")))
+
+  def test_read_records_with_offsets(self):
+    out_file = io.BytesIO()
+    delimited_io.write_record(out_file, b"abc")
+    delimited_io.write_record(out_file, b"y" * 200)
+    delimited_io.write_record(out_file, b"de")
+
+    self.assertEqual(
+        list(
+            delimited_io.read_records_with_offsets(
+                io.BytesIO(out_file.getvalue()))), [
+                    (1, b"abc"),
+                    (6, b"y" * 200),
+                    (207, b"de"),
+                ])
+
+  def test_mapped_records(self):
+    with tempfile.TemporaryDirectory() as the_dir:
+      path = os.path.join(the_dir, "records")
+      records = delimited_io.MappedRecords(path)
+      with open(path, "wb") as out_file:
+        for record in [b"abc", b"def", b"ghij"]:
+          delimited_io.write_record(out_file, record)
+          records.add(out_file.tell() - len(record), len(record))
+
+      self.assertEqual(len(records), 3)
+      self.assertEqual(records[2], b"ghij")
+      self.assertEqual(records[0], b"abc")
+      records.close()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,9 +1,12 @@
 """Loads fonts from disk and caches the results."""
 
 import functools
+import io
 import os
 import re
 
+from fontTools import ttLib
+
 
 class FontLoader:
   """Loads fonts from disk.
@@ -46,3 +49,78 @@ class FontLoader:
   def load_font(self, font_id):
     with open(self.path_for_font(font_id), 'rb') as font_file:
       return font_file.read()
+
+  @functools.lru_cache(maxsize=32)
+  def load_font_info(self, font_id):
+    """Returns a FontInfo for the font. Results are cached."""
+    return FontInfo(self.load_font(font_id))
+
+
+class FontInfo:
+  """Metadata parsed from a font.
+
+  The font is only parsed when a piece of metadata is first needed, and
+  then only the tables needed for it are loaded. Each piece of metadata
+  is computed once.
+  """
+
+  def __init__(self, font_bytes):
+    self.font_bytes = font_bytes
+
+  @functools.cached_property
+  def font(self):
+    return ttLib.TTFont(io.BytesIO(self.font_bytes), lazy=True)
+
+  @functools.cached_property
+  def best_cmap(self):
+    """Map from codepoint to glyph name, using the font's preferred cmap."""
+    return self.font["cmap"].getBestCmap() or dict()
+
+  @functools.cached_property
+  def glyph_order(self):
+    return self.font.getGlyphOrder()
+
+  @functools.cached_property
+  def glyph_ids(self):
+    """Map from glyph name to glyph id."""
+    return {name: glyph_id for glyph_id, name in enumerate(self.glyph_order)}
+
+  @functools.cached_property
+  def codepoint_glyph_ids(self):
+    """Map from codepoint to glyph id, using the font's preferred cmap."""
+    glyph_ids = self.glyph_ids
+    return {
+        codepoint: glyph_ids[glyph_name]
+        for codepoint, glyph_name in self.best_cmap.items()
+    }
+
+  def glyph_ids_for_codepoints(self, codepoints):
+    """Returns the set of glyph ids mapped to by codepoints.
+
+    Codepoints not in the font's cmap are ignored.
+    """
+    lookup = self.codepoint_glyph_ids
+    return {
+        lookup[codepoint] for codepoint in codepoints if codepoint in lookup
+    }
+
+  @functools.cached_property
+  def codepoints(self):
+    """The set of codepoints mapped by any of the font's unicode cmaps."""
+    result = set()
+    for sub_table in self.font["cmap"].tables:
+      if sub_table.isUnicode():
+        result.update(sub_table.cmap.keys())
+    return frozenset(result)
+
+  @functools.cached_property
+  def glyph_sizes(self):
+    """The size in bytes of the outline data of each glyph, by glyph id."""
+    if "glyf" in self.font:
+      offsets = list(self.font["loca"])
+    elif "CFF " in self.font:
+      cff = self.font["CFF "].cff
+      offsets = cff[cff.fontNames[0]].CharStrings.charStringsIndex.offsets
+    else:
+      raise ValueError("Font has no glyf or CFF table.")
+    return [end - start for start, end in zip(offsets, offsets[1:])]
@@ -41,6 +41,43 @@ class FontLoaderTest(unittest.TestCase):
 
       self.assertEqual(str(the_bytes, encoding='UTF-8'), font_contents)
 
+  def test_load_font_info(self):
+    loader = font_loader.FontLoader('./patch_subset/testdata/')
+    info = loader.load_font_info('Roboto-Regular.abcd.ttf')
+    self.assertIs(info, loader.load_font_info('Roboto-Regular.abcd.ttf'))
+
+    self.assertEqual(info.codepoints, {0x61, 0x62, 0x63, 0x64})
+    self.assertEqual(set(info.best_cmap), {0x61, 0x62, 0x63, 0x64})
+    glyph_id = info.glyph_ids[info.best_cmap[0x61]]
+    self.assertEqual(info.glyph_order[glyph_id], info.best_cmap[0x61])
+    self.assertEqual(len(info.glyph_sizes), len(info.glyph_order))
+    self.assertGreater(info.glyph_sizes[glyph_id], 0)
+
+  def test_glyph_ids_for_codepoints(self):
+    loader = font_loader.FontLoader('./patch_subset/testdata/')
+    info = loader.load_font_info('Roboto-Regular.abcd.ttf')
+    expected = {
+        info.glyph_ids[info.best_cmap[codepoint]] for codepoint in [0x61, 0x63]
+    }
+
+    self.assertEqual(len(info.codepoint_glyph_ids), 4)
+    self.assertEqual(info.codepoint_glyph_ids[0x61],
+                     info.glyph_ids[info.best_cmap[0x61]])
+    self.assertEqual(info.glyph_ids_for_codepoints([0x61, 0x63, 0x7A]),
+                     expected)
+    self.assertEqual(info.glyph_ids_for_codepoints([]), set())
+
+  def test_load_font_info_cff(self):
+    loader = font_loader.FontLoader('./patch_subset/testdata/')
+    info = loader.load_font_info('Ahem.optimized.otf')
+    self.assertEqual(len(info.glyph_sizes), len(info.glyph_order))
+    self.assertIn(0x41, info.codepoints)
+
+  def test_load_font_info_missing_font(self):
+    loader = font_loader.FontLoader('./patch_subset/testdata/')
+    with self.assertRaises(IOError):
+      loader.load_font_info('Roboto-Bold.ttf')
+
 
 if __name__ == '__main__':
   unittest.main()
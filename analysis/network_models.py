@@ -209,3 +209,39 @@ DESKTOP_FASTEST = simulation.NetworkModel("desktop_fastest",
                                           bandwidth_down=7500,
                                           category="desktop",
                                           weight=0.05)
+
+ALL_NETWORK_MODELS = [
+    MOBILE_2G_SLOWEST,
+    MOBILE_2G_SLOW,
+    MOBILE_2G_MEDIAN,
+    MOBILE_2G_FAST,
+    MOBILE_2G_FASTEST,
+    MOBILE_3G_SLOWEST,
+    MOBILE_3G_SLOW,
+    MOBILE_3G_MEDIAN,
+    MOBILE_3G_FAST,
+    MOBILE_3G_FASTEST,
+    MOBILE_4G_SLOWEST,
+    MOBILE_4G_SLOW,
+    MOBILE_4G_MEDIAN,
+    MOBILE_4G_FAST,
+    MOBILE_4G_FASTEST,
+    MOBILE_WIFI_SLOWEST,
+    MOBILE_WIFI_SLOW,
+    MOBILE_WIFI_MEDIAN,
+    MOBILE_WIFI_FAST,
+    MOBILE_WIFI_FASTEST,
+    DESKTOP_SLOWEST,
+    DESKTOP_SLOW,
+    DESKTOP_MEDIAN,
+    DESKTOP_FAST,
+    DESKTOP_FASTEST,
+]
+
+
+def get_network_model(name):
+  """Returns the network model in ALL_NETWORK_MODELS with name."""
+  for net_model in ALL_NETWORK_MODELS:
+    if net_model.name == name:
+      return net_model
+  return None
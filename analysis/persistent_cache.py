@@ -0,0 +1,139 @@
+"""A key value cache stored in a local sqlite database.
+
+The cache can be shared by several processes (for example the analyzer's
+worker processes) and by separate runs. Each process opens its own
+connection on first use. Once the cache holds more than max_entries the
+least recently used entries are evicted.
+
+Reads don't write to the database, so they don't contend for its write
+lock. The last use times of the entries read are kept in memory and
+written in batches.
+"""
+
+import os
+import sqlite3
+import time
+
+# How many entries can be added between checks of the size of the cache.
+EVICTION_CHECK_INTERVAL = 1000
+
+# When the cache is over its size limit, it's shrunk to this fraction of the
+# limit so that evictions aren't needed on every put.
+EVICTION_TARGET = 0.9
+
+# How many entries can be read before their last use times are written.
+TOUCH_BATCH_SIZE = 1000
+
+
+class PersistentCache:
+  """Maps string keys to values (int, float, str or bytes) stored on disk."""
+
+  # pylint: disable=too-many-instance-attributes
+
+  def __init__(self, path, max_entries=None):
+    """Creates a cache stored in the sqlite database at path.
+
+    If max_entries is None the size of the cache is not limited.
+    """
+    self.path = path
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self.puts_since_check = 0
+    # Last use time of entries read since the last flush(), by key.
+    self.touched = dict()
+    self.connection = None
+    self.pid = None
+
+  def _connect(self):
+    """Returns a connection to the database for the current process."""
+    if self.connection is None or self.pid != os.getpid():
+      self.connection = sqlite3.connect(self.path,
+                                        timeout=60,
+                                        isolation_level=None)
+      self.connection.execute("PRAGMA journal_mode=WAL")
+      # With WAL, commits then don't wait for the disk. A crash can lose the
+      # most recent entries but can't corrupt the database.
+      self.connection.execute("PRAGMA synchronous=NORMAL")
+      self.connection.execute("CREATE TABLE IF NOT EXISTS cache ("
+                              "key TEXT PRIMARY KEY, "
+                              "value, "
+                              "last_used REAL)")
+      self.connection.execute("CREATE INDEX IF NOT EXISTS cache_last_used "
+                              "ON cache(last_used)")
+      self.pid = os.getpid()
+    return self.connection
+
+  def get(self, key, default=None):
+    """Returns the value for key, or default if it's not in the cache."""
+    connection = self._connect()
+    row = connection.execute("SELECT value FROM cache WHERE key = ?",
+                             (key,)).fetchone()
+    if row is None:
+      self.misses += 1
+      return default
+
+    self.hits += 1
+    self.touched[key] = time.time()
+    if len(self.touched) >= TOUCH_BATCH_SIZE:
+      self.flush()
+    return row[0]
+
+  def put(self, key, value):
+    """Stores value for key, evicting old entries if the cache is full."""
+    connection = self._connect()
+    connection.execute(
+        "INSERT OR REPLACE INTO cache (key, value, last_used) "
+        "VALUES (?, ?, ?)", (key, value, time.time()))
+
+    self.puts_since_check += 1
+    if self.puts_since_check >= EVICTION_CHECK_INTERVAL:
+      self.evict()
+
+  def flush(self):
+    """Writes the last use times of the entries read to the database."""
+    if not self.touched:
+      return
+
+    connection = self._connect()
+    connection.execute("BEGIN")
+    connection.executemany("UPDATE cache SET last_used = ? WHERE key = ?",
+                           [(used, key) for key, used in self.touched.items()])
+    connection.execute("COMMIT")
+    self.touched.clear()
+
+  def evict(self):
+    """Removes the least recently used entries if the cache is too large."""
+    self.puts_since_check = 0
+    if self.max_entries is None:
+      return
+
+    self.flush()
+
+    count = len(self)
+    if count <= self.max_entries:
+      return
+
+    self._connect().execute(
+        "DELETE FROM cache WHERE key IN "
+        "(SELECT key FROM cache ORDER BY last_used, rowid LIMIT ?)",
+        (count - int(self.max_entries * EVICTION_TARGET),))
+
+  def __len__(self):
+    return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+  def __getstate__(self):
+    """Drops the sqlite connection and pending touches; workers reopen lazily."""
+    state = dict(self.__dict__)
+    state["connection"] = None
+    state["pid"] = None
+    state["touched"] = dict()
+    return state
+
+  def close(self):
+    """Closes this process's connection to the database."""
+    if self.connection is not None:
+      self.flush()
+      self.connection.close()
+      self.connection = None
+      self.pid = None
@@ -0,0 +1,100 @@
+"""Unit tests for the persistent_cache module."""
+
+import itertools
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+from analysis import persistent_cache
+
+
+class PersistentCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.temp_dir.name, "cache.db")
+
+  def tearDown(self):
+    self.temp_dir.cleanup()
+
+  def test_get_and_put(self):
+    cache = persistent_cache.PersistentCache(self.path)
+    self.assertIsNone(cache.get("abc"))
+    self.assertEqual(cache.get("abc", 3), 3)
+
+    cache.put("abc", 1234)
+    cache.put("def", "value")
+    self.assertEqual(cache.get("abc"), 1234)
+    self.assertEqual(cache.get("def"), "value")
+    self.assertEqual(len(cache), 2)
+    self.assertEqual(cache.hits, 2)
+    self.assertEqual(cache.misses, 2)
+    cache.close()
+
+  def test_shared_between_instances(self):
+    cache_1 = persistent_cache.PersistentCache(self.path)
+    cache_1.put("abc", 1234)
+
+    cache_2 = pickle.loads(pickle.dumps(cache_1))
+    self.assertIsNone(cache_2.connection)
+    cache_2.put("def", 5678)
+
+    self.assertEqual(cache_1.get("def"), 5678)
+    self.assertEqual(cache_2.get("abc"), 1234)
+    cache_1.close()
+    cache_2.close()
+
+  @mock.patch.object(persistent_cache, "EVICTION_CHECK_INTERVAL", 5)
+  @mock.patch.object(persistent_cache.time,
+                     "time",
+                     side_effect=itertools.count())
+  def test_eviction(self, _):
+    cache = persistent_cache.PersistentCache(self.path, max_entries=10)
+    for i in range(10):
+      cache.put(str(i), i)
+    self.assertEqual(len(cache), 10)
+
+    # Reading 0 makes it the most recently used.
+    self.assertEqual(cache.get("0"), 0)
+    for i in range(10, 15):
+      cache.put(str(i), i)
+
+    self.assertEqual(len(cache), 9)
+    self.assertEqual(cache.get("0"), 0)
+    self.assertIsNone(cache.get("1"))
+    self.assertIsNone(cache.get("6"))
+    self.assertEqual(cache.get("7"), 7)
+    self.assertEqual(cache.get("14"), 14)
+    cache.close()
+
+  @mock.patch.object(persistent_cache, "TOUCH_BATCH_SIZE", 2)
+  def test_reads_batch_last_used(self):
+    cache = persistent_cache.PersistentCache(self.path)
+    cache.put("abc", 1)
+    cache.put("def", 2)
+
+    def last_used(key):
+      return cache._connect().execute(  # pylint: disable=protected-access
+          "SELECT last_used FROM cache WHERE key = ?", (key,)).fetchone()[0]
+
+    before = last_used("abc")
+    with mock.patch.object(persistent_cache.time, "time", return_value=1e12):
+      self.assertEqual(cache.get("abc"), 1)
+      self.assertEqual(last_used("abc"), before)
+
+      self.assertEqual(cache.get("def"), 2)
+      self.assertEqual(last_used("abc"), 1e12)
+      self.assertEqual(last_used("def"), 1e12)
+
+      self.assertEqual(cache.get("abc"), 1)
+      cache.close()
+
+    cache = persistent_cache.PersistentCache(self.path)
+    self.assertEqual(last_used("abc"), 1e12)
+    cache.close()
+
+
+if __name__ == '__main__':
+  unittest.main()
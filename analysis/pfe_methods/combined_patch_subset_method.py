@@ -36,6 +36,14 @@ class CombinedPatchSubsetMethod:
   def network_sensitive(self):  # pylint: disable=no-self-use
     return True
 
+  def config_for_network(self, network_model):
+    """Returns the patch subset config used for network_model.
+
+    Without --auto_settings every network model uses the same config, which
+    allows the simulation to share sessions between them.
+    """
+    return pick_method(network_model, self.script).config
+
 
 def pick_method(network_model, script_category):  # pylint: disable=too-many-return-statements
   """Select best method based on the clients rtt and the script.
@@ -159,5 +167,8 @@ class CombinedPatchSubsetSession:
   def page_view(self, usage_by_font):
     return self.session.page_view(usage_by_font)
 
+  def page_views(self, usages_by_font):
+    return self.session.page_views(usages_by_font)
+
   def get_request_graphs(self):
     return self.session.get_request_graphs()
@@ -105,6 +105,17 @@ class CombinedPatchSubsetMethodTest(unittest.TestCase):
         desktop_session_normal.get_request_graphs()[0].total_response_bytes(),
         desktop_session_auto.get_request_graphs()[0].total_response_bytes())
 
+  def test_config_for_network(self):
+    self.assertEqual(
+        self.latin_method.config_for_network(network_models.DESKTOP_MEDIAN),
+        self.latin_method.config_for_network(network_models.MOBILE_2G_SLOWEST))
+
+    with flagsaver.flagsaver(auto_settings=True):
+      self.assertNotEqual(
+          self.latin_method.config_for_network(network_models.DESKTOP_MEDIAN),
+          self.latin_method.config_for_network(
+              network_models.MOBILE_2G_SLOWEST))
+
 
 if __name__ == '__main__':
   unittest.main()
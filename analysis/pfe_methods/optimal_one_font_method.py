@@ -28,7 +28,7 @@ class OptimalOneFontSession:
   def __init__(self, font_loader, a_subset_sizer=None):
     self.font_loader = font_loader
     self.subset_sizer = a_subset_sizer if a_subset_sizer else subset_sizer.SubsetSizer(
-        cache=dict())
+    )
 
     self.codepoints_by_font = dict()
     self.page_view_count = 0
@@ -60,8 +60,7 @@ class OptimalOneFontSession:
     requests = set()
     for font_id, codepoints in self.codepoints_by_font.items():
       font_bytes = self.font_loader.load_font(font_id)
-      size = self.subset_sizer.subset_size("%s:%s" % (font_id, len(codepoints)),
-                                           codepoints, font_bytes)
+      size = self.subset_sizer.subset_size(codepoints, font_bytes)
       if size:
         requests.add(request_graph.Request(0, size))
 
@@ -15,7 +15,7 @@ def u(codepoints):  # pylint: disable=invalid-name
 
 class MockSubsetSizer:
 
-  def subset_size(self, cache_key, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
+  def subset_size(self, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
     return len(subset) * 1000
 
 
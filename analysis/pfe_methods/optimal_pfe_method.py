@@ -30,7 +30,7 @@ class OptimalPfeSession:
   def __init__(self, font_loader, a_subset_sizer=None):
     self.font_loader = font_loader
     self.subset_sizer = a_subset_sizer if a_subset_sizer else subset_sizer.SubsetSizer(
-        cache=dict())
+    )
     self.request_graphs = []
 
     self.codepoints_by_font = dict()
@@ -52,9 +52,7 @@ class OptimalPfeSession:
     existing_codepoints.update(codepoints)
     self.codepoints_by_font[font_id] = existing_codepoints
 
-    size = self.subset_sizer.subset_size(
-        "%s:%s" % (font_id, len(existing_codepoints)), existing_codepoints,
-        font_bytes)
+    size = self.subset_sizer.subset_size(existing_codepoints, font_bytes)
 
     delta = size - self.subset_size_by_font.get(font_id, 0)
     self.subset_size_by_font[font_id] = size
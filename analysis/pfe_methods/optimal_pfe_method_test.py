@@ -15,13 +15,13 @@ def u(codepoints):  # pylint: disable=invalid-name
 
 class MockSubsetSizer:
 
-  def subset_size(self, cache_key, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
+  def subset_size(self, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
     return len(subset) * 1000
 
 
 class InverseMockSubsetSizer:
 
-  def subset_size(self, cache_key, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
+  def subset_size(self, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
     return int((1.0 / len(subset)) * 3000)
 
 
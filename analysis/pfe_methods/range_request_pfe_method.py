@@ -6,10 +6,11 @@ and then uses range requests to download the specific glyphs which are necessary
 """
 
 import io
-import zlib
+import itertools
 
 from analysis import network_models
 from analysis import request_graph
+from analysis.pfe_methods import range_size_oracle
 from collections import defaultdict
 from collections import namedtuple
 from fontTools import ttLib
@@ -26,14 +27,53 @@ def name():
 def start_session(network_model, font_loader, network_startup_cost_in_bytes=network_models.ESTIMATED_HTTP_REQUEST_HEADER_SIZE + network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE):
   return RangeRequestPfeSession(network_model, font_loader, network_startup_cost_in_bytes)
 
-def codepoints_to_glyphs(font_bytes, codepoints):
-  font = ttLib.TTFont(io.BytesIO(font_bytes))
-  cmap = font["cmap"].getBestCmap()
-  return set([font.getGlyphID(cmap[codepoint]) for codepoint in codepoints if codepoint in cmap])
+def codepoints_to_glyphs(font_info, codepoints):
+  return font_info.glyph_ids_for_codepoints(codepoints)
 
 class RangeRequestError(Exception):
   """We couldn't figure out the range requests to send."""
 
+class GlyphIndex:
+  """Sizes and cumulative byte offsets of the glyphs in a font.
+
+  Built once per font so that range computations only need to look at the
+  glyphs being requested instead of every glyph in the font.
+  """
+
+  def __init__(self, glyph_data):
+    """Indexes glyph_data, the outline bytes of each glyph in glyph id order.
+
+    offsets has num_glyphs() + 1 entries: offsets[i] is the byte offset of
+    glyph i and offsets[-1] the total size. nonzero_glyph_ids lists the ids of
+    the glyphs with data in ascending order; nonzero_position maps each of them
+    to its position in that list.
+    """
+    self.glyph_sizes = [len(data) for data in glyph_data]
+    # offsets[i] is the total size of glyphs [0, i).
+    self.offsets = list(itertools.accumulate(self.glyph_sizes, initial=0))
+    # Glyphs with no data are skipped when forming ranges.
+    self.nonzero_glyph_ids = [glyph_id for glyph_id, size in enumerate(self.glyph_sizes) if size]
+    self.nonzero_position = {glyph_id: i for i, glyph_id in enumerate(self.nonzero_glyph_ids)}
+
+  def num_glyphs(self):
+    """Returns the number of glyphs in the font."""
+    return len(self.glyph_sizes)
+
+  def total_size(self):
+    """Returns the size in bytes of all glyphs together."""
+    return self.offsets[-1]
+
+  def byte_length(self, begin_glyph, end_glyph):
+    """Returns the size in bytes of glyphs [begin_glyph, end_glyph)."""
+    return self.offsets[end_glyph] - self.offsets[begin_glyph]
+
+  def next_nonzero_glyph(self, glyph_id):
+    """Returns the first glyph after glyph_id (which must have data) that has data, or None."""
+    position = self.nonzero_position[glyph_id] + 1
+    if position < len(self.nonzero_glyph_ids):
+      return self.nonzero_glyph_ids[position]
+    return None
+
 class RangeRequestPfeSession:
 
   def __init__(self, network_model, font_loader, network_startup_cost_in_bytes):
@@ -124,6 +164,50 @@ class RangeRequestPfeSession:
     # Now they should have the same lengths
     return necessary_glyph_ranges, unnecessary_glyph_ranges
 
+  def compute_ranges(self, glyph_index, glyphs_to_download):
+    """Equivalent to compute_range_parallel_arrays, but uses a precomputed GlyphIndex.
+
+    Runs are found from the sorted list of needed glyphs, so the cost
+    depends on the number of glyphs requested rather than the size of the font.
+    """
+    if not glyph_index.nonzero_glyph_ids:
+      return [], []
+
+    first_glyph = glyph_index.nonzero_glyph_ids[0]
+    needed = sorted(glyph_id for glyph_id in glyphs_to_download
+                    if glyph_id in glyph_index.nonzero_position)
+
+    # Glyph ids at which the state switches between unnecessary and necessary.
+    # The first run (starting at glyph 0) is always a necessary run.
+    switches = []
+    if not needed or needed[0] != first_glyph:
+      switches.append(first_glyph)
+    i = 0
+    while i < len(needed):
+      run_start = needed[i]
+      while (i + 1 < len(needed) and
+             needed[i + 1] == glyph_index.next_nonzero_glyph(needed[i])):
+        i += 1
+      if run_start != first_glyph:
+        switches.append(run_start)
+      run_end = glyph_index.next_nonzero_glyph(needed[i])
+      if run_end is not None:
+        switches.append(run_end)
+      i += 1
+
+    boundaries = [0] + switches + [glyph_index.num_glyphs()]
+    necessary_glyph_ranges = []
+    unnecessary_glyph_ranges = []
+    for i in range(len(boundaries) - 1):
+      glyph_range = self.GlyphRange(glyph_index.byte_length(boundaries[i], boundaries[i + 1]), boundaries[i], boundaries[i + 1])
+      if i % 2 == 0:
+        necessary_glyph_ranges.append(glyph_range)
+      else:
+        unnecessary_glyph_ranges.append(glyph_range)
+    if len(necessary_glyph_ranges) > len(unnecessary_glyph_ranges):
+      unnecessary_glyph_ranges.append(self.GlyphRange(0, necessary_glyph_ranges[-1].end_glyph, glyph_index.num_glyphs()))
+    return necessary_glyph_ranges, unnecessary_glyph_ranges
+
   def coalesce_runs(self, necessary_glyph_ranges, unnecessary_glyph_ranges):
     extra_glyphs_to_download = set()
     i = 0
@@ -173,11 +257,15 @@ class RangeRequestPfeSession:
     necessary_glyphs = defaultdict(set)
     for font_id, usage in usage_by_font.items():
       if font_id not in GLYPH_DATA_CACHE:
-        GLYPH_DATA_CACHE[font_id] = self.compute_glyph_data(font_id)
-      font_data, glyph_data = GLYPH_DATA_CACHE[font_id]
+        font_data, glyph_data = self.compute_glyph_data(font_id)
+        glyph_index = GlyphIndex(glyph_data)
+        # Assume the font has been optimized correctly, and glyph data is placed at the end
+        base_size = len(font_data) - glyph_index.total_size()
+        GLYPH_DATA_CACHE[font_id] = (glyph_index, range_size_oracle.RangeSizeOracle(font_data, glyph_data, base_size))
+      glyph_index, size_oracle = GLYPH_DATA_CACHE[font_id]
 
       needs_base_request = font_id not in self.loaded_glyphs
-      glyphs = codepoints_to_glyphs(self.font_loader.load_font(font_id), usage.codepoints)
+      glyphs = codepoints_to_glyphs(self.font_loader.load_font_info(font_id), usage.codepoints)
       present_glyphs = self.loaded_glyphs[font_id]
       glyphs_to_download = set([glyph for glyph in glyphs if glyph not in present_glyphs])
 
@@ -186,7 +274,7 @@ class RangeRequestPfeSession:
 
       self.loaded_glyphs[font_id].update(glyphs_to_download)
 
-      necessary_glyph_ranges, unnecessary_glyph_ranges = self.compute_range_parallel_arrays([len(data) for data in glyph_data], glyphs_to_download)
+      necessary_glyph_ranges, unnecessary_glyph_ranges = self.compute_ranges(glyph_index, glyphs_to_download)
       extra_glyphs_to_download = self.coalesce_runs(necessary_glyph_ranges, unnecessary_glyph_ranges)
       self.loaded_glyphs[font_id].update(extra_glyphs_to_download)
 
@@ -196,14 +284,9 @@ class RangeRequestPfeSession:
       starting_index = 0
       if needs_base_request:
         payload_start, payload_end, extra_start, extra_end, starting_index = self.compute_initial_state(necessary_glyph_ranges, unnecessary_glyph_ranges)
-
-        # Assume the font has been optimized correctly, and glyph data is placed at the end
-        base_size = len(font_data) - sum([len(data) for data in glyph_data])
-        payload = font_data[: base_size] + b"".join(glyph_data[payload_start : payload_end])
-
-        compressed_payload = zlib.compress(payload)
+        compressed_size = size_oracle.base_range_size(payload_start, payload_end)
         self.loaded_glyphs[font_id].update(range(extra_start, extra_end))
-        base_request = request_graph.Request(network_models.ESTIMATED_HTTP_REQUEST_HEADER_SIZE, network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE + len(compressed_payload))
+        base_request = request_graph.Request(network_models.ESTIMATED_HTTP_REQUEST_HEADER_SIZE, network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE + compressed_size)
         requests.add(base_request)
 
       happens_after = None
@@ -212,9 +295,8 @@ class RangeRequestPfeSession:
       for i in range(starting_index, len(necessary_glyph_ranges)):
         if necessary_glyph_ranges[i].byte_length == 0:
           continue
-        payload = b"".join(glyph_data[necessary_glyph_ranges[i].begin_glyph : necessary_glyph_ranges[i].end_glyph])
-        compressed_payload = zlib.compress(payload)
-        request = request_graph.Request(network_models.ESTIMATED_HTTP_REQUEST_HEADER_SIZE, network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE + len(compressed_payload), happens_after=happens_after)
+        compressed_size = size_oracle.range_size(necessary_glyph_ranges[i].begin_glyph, necessary_glyph_ranges[i].end_glyph)
+        request = request_graph.Request(network_models.ESTIMATED_HTTP_REQUEST_HEADER_SIZE, network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE + compressed_size, happens_after=happens_after)
         requests.add(request)
 
     graph = request_graph.RequestGraph(requests)
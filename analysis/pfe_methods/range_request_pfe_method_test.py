@@ -1,5 +1,6 @@
 """Unit tests for the range_request_font_pfe_method module."""
 
+import random
 import unittest
 from analysis import font_loader
 from analysis import request_graph
@@ -72,6 +73,37 @@ class RangeRequestPfeMethodTest(unittest.TestCase):
     self.assertEqual(necessary_glyph_ranges, [GlyphRange(12, 0, 3)])
     self.assertEqual(unnecessary_glyph_ranges, [GlyphRange(0, 3, 3)])
 
+  def test_glyph_index(self):
+    glyph_index = range_request_pfe_method.GlyphIndex([b"abc", b"", b"de", b"f"])
+    self.assertEqual(glyph_index.num_glyphs(), 4)
+    self.assertEqual(glyph_index.total_size(), 6)
+    self.assertEqual(glyph_index.byte_length(1, 3), 2)
+    self.assertEqual(glyph_index.next_nonzero_glyph(0), 2)
+    self.assertEqual(glyph_index.next_nonzero_glyph(2), 3)
+    self.assertIsNone(glyph_index.next_nonzero_glyph(3))
+
+  def test_compute_ranges(self):
+    glyph_index = range_request_pfe_method.GlyphIndex([b"abc", b"defg", b"hijkl"])
+    necessary_glyph_ranges, unnecessary_glyph_ranges = self.session.compute_ranges(glyph_index, {1})
+    self.assertEqual(necessary_glyph_ranges, [GlyphRange(0, 0, 0), GlyphRange(4, 1, 2)])
+    self.assertEqual(unnecessary_glyph_ranges, [GlyphRange(3, 0, 1), GlyphRange(5, 2, 3)])
+
+    glyph_index = range_request_pfe_method.GlyphIndex([b"", b""])
+    self.assertEqual(self.session.compute_ranges(glyph_index, {0}), ([], []))
+
+  def test_compute_ranges_matches_compute_range_parallel_arrays(self):
+    rand = random.Random(42)
+    for _ in range(500):
+      num_glyphs = rand.randint(0, 20)
+      glyph_data = [b"x" * rand.choice([0, 0, 1, 5]) for _ in range(num_glyphs)]
+      glyphs_to_download = {glyph_id for glyph_id in range(num_glyphs) if rand.random() < 0.4}
+      glyph_index = range_request_pfe_method.GlyphIndex(glyph_data)
+
+      self.assertEqual(
+          self.session.compute_ranges(glyph_index, glyphs_to_download),
+          self.session.compute_range_parallel_arrays(glyph_index.glyph_sizes, glyphs_to_download),
+          "glyph_data=%s, glyphs_to_download=%s" % (glyph_data, glyphs_to_download))
+
   def test_coalesce_runs_empty(self):
     necessary_glyph_ranges = []
     unnecessary_glyph_ranges = []
@@ -130,8 +162,8 @@ class RangeRequestPfeMethodTest(unittest.TestCase):
     self.assertEqual(unnecessary_glyph_ranges, [GlyphRange(11, 3, 4), GlyphRange(12, 7, 8), GlyphRange(8, 9, 10)])
 
   def test_codepoints_to_glyphs(self):
-    font_bytes = self.session.font_loader.load_font("Ahem.optimized.ttf")
-    result = range_request_pfe_method.codepoints_to_glyphs(font_bytes, [65, 66])
+    font_info = self.session.font_loader.load_font_info("Ahem.optimized.ttf")
+    result = range_request_pfe_method.codepoints_to_glyphs(font_info, [65, 66])
     self.assertEqual(len(result), 2)
     result = list(result)
     self.assertGreater(result[0], 0)
@@ -0,0 +1,118 @@
+"""Computes the compressed size of range request payloads.
+
+Range requests download either a run of glyphs or the base of a font (every
+thing but the glyph outlines) plus an optional run of glyphs. Only the size
+of the compressed payload is needed by the simulation, and the same ranges
+recur across many sequences, so sizes are memoized per font and range.
+"""
+
+import functools
+import itertools
+import zlib
+
+from analysis.pfe_methods import subset_sizer
+
+# Maximum number of range sizes kept in memory (shared by all fonts).
+MAX_CACHED_SIZES = 100000
+
+# Optional persistent_cache.PersistentCache of exact range sizes shared across
+# processes and runs.
+PERSISTENT_CACHE = None
+
+# If true sizes are estimated from the compressed size of each glyph instead
+# of compressing the full payload. See RangeSizeOracle.estimated_size().
+ESTIMATE_SIZES = False
+
+# Size of the zlib header and trailer, i.e. the compressed size of nothing.
+ZLIB_OVERHEAD = len(zlib.compress(b""))
+
+
+class RangeSizeOracle:
+  """Compressed payload sizes for the range requests of one font."""
+
+  def __init__(self, font_data, glyph_data, base_size):
+    """Creates an oracle for a font.
+
+    font_data is the complete font file and glyph_data the outline data of
+    each glyph. The first base_size bytes of font_data are the base of the
+    font.
+    """
+    self.font_data = font_data
+    self.glyph_data = glyph_data
+    self.base_size = base_size
+    self.fingerprint = subset_sizer.font_fingerprint(font_data)
+
+  def range_size(self, begin_glyph, end_glyph):
+    """Size of the compressed outline data for glyphs [begin, end)."""
+    if ESTIMATE_SIZES:
+      return self.estimated_size(begin_glyph, end_glyph)
+    return self.exact_size("range", begin_glyph, end_glyph)
+
+  def base_range_size(self, begin_glyph, end_glyph):
+    """Size of the compressed font base followed by glyphs [begin, end)."""
+    if ESTIMATE_SIZES:
+      return (self.compressed_base_size - ZLIB_OVERHEAD +
+              self.estimated_size(begin_glyph, end_glyph))
+    return self.exact_size("base", begin_glyph, end_glyph)
+
+  @functools.lru_cache(maxsize=MAX_CACHED_SIZES)
+  def exact_size(self, kind, begin_glyph, end_glyph):
+    """Compresses a payload to find its size. Results are cached."""
+    key = "%s:%s:%d:%d" % (self.fingerprint, kind, begin_glyph, end_glyph)
+    if PERSISTENT_CACHE is not None:
+      size = PERSISTENT_CACHE.get(key)
+      if size is not None:
+        return size
+
+    payload = b"".join(self.glyph_data[begin_glyph:end_glyph])
+    if kind == "base":
+      payload = self.font_data[:self.base_size] + payload
+    size = len(zlib.compress(payload))
+
+    if PERSISTENT_CACHE is not None:
+      PERSISTENT_CACHE.put(key, size)
+    return size
+
+  def estimated_size(self, begin_glyph, end_glyph):
+    """Estimates the compressed size of glyphs [begin, end).
+
+    The first glyph of the range is counted at its compressed size on its
+    own. The rest are counted at their compressed size scaled by a per font
+    correction, which accounts for the redundancy between glyphs that
+    compressing them together removes.
+    """
+    first_size = 0
+    for glyph_id in range(begin_glyph, end_glyph):
+      first_size = self.compressed_glyph_sizes[glyph_id]
+      if first_size:
+        break
+    rest_size = (self.compressed_glyph_offsets[end_glyph] -
+                 self.compressed_glyph_offsets[begin_glyph] - first_size)
+    return ZLIB_OVERHEAD + first_size + round(rest_size * self.correction)
+
+  @functools.cached_property
+  def compressed_glyph_sizes(self):
+    """Compressed size (without zlib overhead) of each glyph on its own."""
+    return [
+        len(zlib.compress(data)) - ZLIB_OVERHEAD if data else 0
+        for data in self.glyph_data
+    ]
+
+  @functools.cached_property
+  def compressed_glyph_offsets(self):
+    """Cumulative compressed sizes of the glyphs."""
+    return list(itertools.accumulate(self.compressed_glyph_sizes, initial=0))
+
+  @functools.cached_property
+  def correction(self):
+    """Calibrates estimated_size() against compressing all of the glyphs."""
+    first_size = next((size for size in self.compressed_glyph_sizes if size), 0)
+    rest_size = self.compressed_glyph_offsets[-1] - first_size
+    if not rest_size:
+      return 1.0
+    all_glyphs = len(zlib.compress(b"".join(self.glyph_data))) - ZLIB_OVERHEAD
+    return (all_glyphs - first_size) / rest_size
+
+  @functools.cached_property
+  def compressed_base_size(self):
+    return len(zlib.compress(self.font_data[:self.base_size]))
@@ -0,0 +1,78 @@
+"""Unit tests for the range_size_oracle module."""
+
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+from analysis import persistent_cache
+from analysis.pfe_methods import range_size_oracle
+
+GLYPH_DATA = [b"", b"abcabcabc", b"defdef", b"abcdefabcdef", b"xyz"]
+BASE = b"base of the font"
+FONT_DATA = BASE + b"".join(GLYPH_DATA)
+
+
+class RangeSizeOracleTest(unittest.TestCase):
+
+  def setUp(self):
+    self.oracle = range_size_oracle.RangeSizeOracle(FONT_DATA, GLYPH_DATA,
+                                                    len(BASE))
+
+  def test_range_size(self):
+    self.assertEqual(self.oracle.range_size(1, 4),
+                     len(zlib.compress(b"abcabcabcdefdefabcdefabcdef")))
+    self.assertEqual(self.oracle.range_size(0, 0), len(zlib.compress(b"")))
+
+  def test_base_range_size(self):
+    self.assertEqual(self.oracle.base_range_size(2, 3),
+                     len(zlib.compress(BASE + b"defdef")))
+    self.assertEqual(self.oracle.base_range_size(0, 0),
+                     len(zlib.compress(BASE)))
+
+  def test_sizes_are_cached(self):
+    with mock.patch.object(range_size_oracle.zlib,
+                           "compress",
+                           wraps=zlib.compress) as compress:
+      size = self.oracle.range_size(1, 3)
+      self.assertEqual(self.oracle.range_size(1, 3), size)
+      self.assertEqual(compress.call_count, 1)
+
+  def test_sizes_are_persisted(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      cache = persistent_cache.PersistentCache(
+          os.path.join(temp_dir, "cache.db"))
+      range_size_oracle.PERSISTENT_CACHE = cache
+      try:
+        other_oracle = range_size_oracle.RangeSizeOracle(
+            FONT_DATA, GLYPH_DATA, len(BASE))
+        self.assertEqual(self.oracle.range_size(2, 5),
+                         other_oracle.range_size(2, 5))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+      finally:
+        range_size_oracle.PERSISTENT_CACHE = None
+        cache.close()
+
+  def test_estimated_size(self):
+    range_size_oracle.ESTIMATE_SIZES = True
+    try:
+      # The correction is calibrated so that the estimate for all glyphs is
+      # exact (up to rounding).
+      self.assertAlmostEqual(self.oracle.range_size(0, 5),
+                             len(zlib.compress(b"".join(GLYPH_DATA))),
+                             delta=1)
+      self.assertEqual(self.oracle.range_size(0, 0),
+                       range_size_oracle.ZLIB_OVERHEAD)
+      self.assertLess(self.oracle.range_size(1, 2),
+                      self.oracle.range_size(1, 4))
+      self.assertEqual(
+          self.oracle.base_range_size(1, 2),
+          len(zlib.compress(BASE)) + self.oracle.range_size(1, 2) -
+          range_size_oracle.ZLIB_OVERHEAD)
+    finally:
+      range_size_oracle.ESTIMATE_SIZES = False
+
+
+if __name__ == '__main__':
+  unittest.main()
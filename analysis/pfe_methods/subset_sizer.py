@@ -1,34 +1,85 @@
 """Helper functions for computing the size of a font subset."""
 
+import array
+import collections
+import functools
+import hashlib
 import io
 import logging
 
 from fontTools import subset
 from woff2_py import woff2
 
-# Cache of cut and woff2 encoded subset sizes.
-SUBSET_SIZE_CACHE = dict()
+# Maximum number of subset sizes kept in memory by SUBSET_SIZE_CACHE.
+MAX_CACHED_SIZES = 100000
+
+# Optional persistent_cache.PersistentCache of subset sizes shared across
+# processes and runs. Uses the same keys as SUBSET_SIZE_CACHE.
+PERSISTENT_CACHE = None
 
 logging.getLogger("fontTools.subset").setLevel(logging.WARNING)
 
 
+class LruCache:
+  """A dict like mapping that holds at most max_size entries.
+
+  Once full, setting a new key evicts the least recently used entry.
+  """
+
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self.entries = collections.OrderedDict()
+
+  def __contains__(self, key):
+    return key in self.entries
+
+  def __getitem__(self, key):
+    value = self.entries[key]
+    self.entries.move_to_end(key)
+    return value
+
+  def __setitem__(self, key, value):
+    self.entries[key] = value
+    self.entries.move_to_end(key)
+    if len(self.entries) > self.max_size:
+      self.entries.popitem(last=False)
+
+  def __len__(self):
+    return len(self.entries)
+
+
+# Cache of cut and woff2 encoded subset sizes. Keyed by the fingerprints of
+# the font and the codepoint set (see cache_key), so it's safe to share
+# between sessions and methods. Bounded so long runs don't grow without
+# limit; PERSISTENT_CACHE (if set) backs it.
+SUBSET_SIZE_CACHE = LruCache(MAX_CACHED_SIZES)
+
+
 class SubsetSizer:
   """Helper class that computes the woff2 encoded size of a font subset."""
 
   def __init__(self, cache=None):
     self.size_cache = (SUBSET_SIZE_CACHE if cache is None else cache)
 
-  def subset_size(self, cache_key, codepoints, font_bytes):
+  def subset_size(self, codepoints, font_bytes):
     """Returns the size of subset (a set of codepoints) of font_bytes after woff2 encoding."""
+    key = cache_key(codepoints, font_bytes)
+    if key in self.size_cache:
+      return self.size_cache[key]
 
-    if cache_key in self.size_cache:
-      return self.size_cache[cache_key]
+    if PERSISTENT_CACHE is not None:
+      final_size = PERSISTENT_CACHE.get(key)
+      if final_size is not None:
+        self.size_cache[key] = final_size
+        return final_size
 
     subset_bytes = self.subset(font_bytes, codepoints)
     woff2_bytes = woff2.ttf_to_woff2(subset_bytes)
 
     final_size = len(woff2_bytes)
-    self.size_cache[cache_key] = final_size
+    self.size_cache[key] = final_size
+    if PERSISTENT_CACHE is not None:
+      PERSISTENT_CACHE.put(key, final_size)
     return final_size
 
   def subset(self, font_bytes, codepoints):  # pylint: disable=no-self-use
@@ -43,3 +94,25 @@ class SubsetSizer:
       with io.BytesIO() as output:
         subset.save_font(font, output, options)
         return output.getvalue()
+
+
+def cache_key(codepoints, font_bytes):
+  """Returns the key under which the size of a subset is cached."""
+  return "%s:%s" % (font_fingerprint(font_bytes),
+                    codepoints_fingerprint(codepoints))
+
+
+@functools.lru_cache(maxsize=64)
+def font_fingerprint(font_bytes):
+  """Returns a hash of the contents of font_bytes."""
+  return hashlib.sha256(font_bytes).hexdigest()
+
+
+def codepoints_fingerprint(codepoints):
+  """Returns a 128 bit hash of a set of codepoints.
+
+  The codepoints are sorted first so the result doesn't depend on their
+  order.
+  """
+  packed = array.array("I", sorted(codepoints)).tobytes()
+  return hashlib.blake2b(packed, digest_size=16).hexdigest()
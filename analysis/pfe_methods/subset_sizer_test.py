@@ -1,6 +1,9 @@
 """Unit tests for the subset_sizer module."""
 
+import os
+import tempfile
 import unittest
+from analysis import persistent_cache
 from analysis.pfe_methods import subset_sizer
 
 
@@ -11,25 +14,35 @@ class SubsetSizerTest(unittest.TestCase):
       font_bytes = font_file.read()
 
     sizer = subset_sizer.SubsetSizer(cache=dict())
-    self.assertEqual(
-        sizer.subset_size("cache-key1", {0x61, 0x62, 0x63, 0x64}, font_bytes),
-        1640)
+    self.assertEqual(sizer.subset_size({0x61, 0x62, 0x63, 0x64}, font_bytes),
+                     1640)
 
   def test_subset_size_caches_locally(self):
     with open("./patch_subset/testdata/Roboto-Regular.ttf", "rb") as font_file:
       font_bytes = font_file.read()
 
-    sizer1 = subset_sizer.SubsetSizer(cache=dict())
+    cache = dict()
+    sizer1 = subset_sizer.SubsetSizer(cache=cache)
     sizer2 = subset_sizer.SubsetSizer(cache=dict())
+    self.assertEqual(sizer1.subset_size({0x61, 0x62, 0x63, 0x64}, font_bytes),
+                     1640)
+    self.assertEqual(sizer1.subset_size([0x64, 0x63, 0x62, 0x61], font_bytes),
+                     1640)
+    self.assertEqual(len(cache), 1)
     self.assertEqual(
-        sizer1.subset_size("cache-key2", {0x61, 0x62, 0x63, 0x64}, font_bytes),
-        1640)
-    self.assertEqual(
-        sizer1.subset_size("cache-key2", {0x61, 0x62, 0x63, 0x64},
-                           b'not a valid font'), 1640)
-    self.assertEqual(
-        sizer2.subset_size("cache-key2", {0x61, 0x62, 0x63, 0x64, 0x65},
-                           font_bytes), 1768)
+        sizer2.subset_size({0x61, 0x62, 0x63, 0x64, 0x65}, font_bytes), 1768)
+    self.assertEqual(len(cache), 1)
+
+  def test_subset_size_keyed_by_codepoints(self):
+    with open("./patch_subset/testdata/Roboto-Regular.ttf", "rb") as font_file:
+      font_bytes = font_file.read()
+
+    # Codepoint sets of the same size, in the same font, must not collide.
+    sizer = subset_sizer.SubsetSizer(cache=dict())
+    self.assertEqual(sizer.subset_size({0x61, 0x62, 0x63, 0x64}, font_bytes),
+                     1640)
+    self.assertNotEqual(sizer.subset_size({0x61, 0x62, 0x63, 0x65}, font_bytes),
+                        1640)
 
   def test_subset_size_caches_globally(self):
     with open("./patch_subset/testdata/Roboto-Regular.ttf", "rb") as font_file:
@@ -37,12 +50,53 @@ class SubsetSizerTest(unittest.TestCase):
 
     sizer1 = subset_sizer.SubsetSizer()
     sizer2 = subset_sizer.SubsetSizer()
-    self.assertEqual(
-        sizer1.subset_size("cache-key3", {0x61, 0x62, 0x63, 0x64}, font_bytes),
-        1640)
-    self.assertEqual(
-        sizer2.subset_size("cache-key3", {0x61, 0x62, 0x63, 0x64},
-                           b'not a valid font'), 1640)
+    self.assertEqual(sizer1.subset_size({0x61, 0x62, 0x63, 0x64}, font_bytes),
+                     1640)
+    self.assertIn(subset_sizer.cache_key({0x61, 0x62, 0x63, 0x64}, font_bytes),
+                  subset_sizer.SUBSET_SIZE_CACHE)
+    self.assertEqual(sizer2.subset_size({0x61, 0x62, 0x63, 0x64}, font_bytes),
+                     1640)
+
+  def test_lru_cache(self):
+    cache = subset_sizer.LruCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    self.assertEqual(cache["a"], 1)
+    cache["c"] = 3
+
+    self.assertEqual(len(cache), 2)
+    self.assertIn("a", cache)
+    self.assertNotIn("b", cache)
+    self.assertIn("c", cache)
+
+  def test_subset_size_caches_persistently(self):
+    with open("./patch_subset/testdata/Roboto-Regular.ttf", "rb") as font_file:
+      font_bytes = font_file.read()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+      cache = persistent_cache.PersistentCache(
+          os.path.join(temp_dir, "cache.db"))
+      subset_sizer.PERSISTENT_CACHE = cache
+      try:
+        sizer1 = subset_sizer.SubsetSizer(cache=dict())
+        sizer2 = subset_sizer.SubsetSizer(cache=dict())
+        self.assertEqual(
+            sizer1.subset_size({0x61, 0x62, 0x63, 0x64}, font_bytes), 1640)
+        self.assertEqual(
+            sizer2.subset_size({0x64, 0x63, 0x62, 0x61}, font_bytes), 1640)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+      finally:
+        subset_sizer.PERSISTENT_CACHE = None
+        cache.close()
+
+  def test_codepoints_fingerprint(self):
+    self.assertEqual(subset_sizer.codepoints_fingerprint({1, 2, 3}),
+                     subset_sizer.codepoints_fingerprint([3, 1, 2]))
+    self.assertNotEqual(subset_sizer.codepoints_fingerprint({1, 2, 3}),
+                        subset_sizer.codepoints_fingerprint({1, 2, 4}))
+    self.assertNotEqual(subset_sizer.codepoints_fingerprint({1, 2}),
+                        subset_sizer.codepoints_fingerprint({1, 2, 0}))
 
 
 if __name__ == '__main__':
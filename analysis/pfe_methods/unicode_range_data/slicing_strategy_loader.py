@@ -1,72 +1,186 @@
 """Helper that can load slicing strategy protos by name."""
 
+import collections
 import functools
+import hashlib
 import io
+import logging
 import os
 
-from fontTools import ttLib
 from google.protobuf import text_format
+from analysis import font_loader
 from analysis.pfe_methods.unicode_range_data import slicing_strategy_pb2
 
+LOG = logging.getLogger("analyzer")
+
 SLICING_STRATEGY_DIR = "analysis/pfe_methods/unicode_range_data"
 
+# Strategies are written as textprotos. The build also compiles them into
+# binary protos (see //tools:compile_slicing_strategies).
+TEXT_EXTENSION = ".textproto"
+BINARY_EXTENSION = ".pb"
+
+# Strategy chosen for each font in this process. Keyed by the sha256 of the
+# font.
+FONT_STRATEGY_CACHE = dict()
+
+# Optional persistent_cache.PersistentCache of the strategy chosen for each
+# font, shared across processes and runs.
+PERSISTENT_CACHE = None
 
-def slicing_strategy_for_font(font_bytes):  # pylint: disable=unused-argument
+
+def slicing_strategy_for_font(font_bytes):
   """Determines which slicing strategy should be used for the given font."""
+  return slicing_strategy_for_font_info(font_loader.FontInfo(font_bytes))
+
+
+def slicing_strategy_for_font_info(font_info):
+  """Determines which slicing strategy should be used for a parsed font.
+
+  The choice is cached by the contents of the font (and of the available
+  strategies), so each distinct font is only classified once. The font's
+  cmap is only read if the choice isn't already cached.
+  """
+  fingerprint = hashlib.sha256(font_info.font_bytes).hexdigest()
+  if fingerprint in FONT_STRATEGY_CACHE:
+    return FONT_STRATEGY_CACHE[fingerprint]
+
+  key = "slicing_strategy:%s:%s" % (fingerprint, strategies_fingerprint())
+  strategy_name = None
+  if PERSISTENT_CACHE is not None:
+    strategy_name = PERSISTENT_CACHE.get(key)
+
+  if strategy_name is None:
+    strategy_name = slicing_strategy_for_codepoints(font_info.codepoints)
+    if PERSISTENT_CACHE is not None:
+      PERSISTENT_CACHE.put(key, strategy_name)
 
+  FONT_STRATEGY_CACHE[fingerprint] = strategy_name
+  return strategy_name
+
+
+def slicing_strategy_for_codepoints(codepoints):
+  """Determines which slicing strategy should be used for a font.
+
+  codepoints is the set of codepoints in the font.
+  """
   # Slicing strategy is picked by counting what % of the codepoints in the font
   # are covered by each available strategy. Choose the strategy with the highest
-  # coverage.
-  codepoints = codepoints_in_font(font_bytes)
-  strategy_scores = dict()
-  for strategy_name in get_available_strategies():
-    strategy = load_slicing_strategy(strategy_name)
-    all_strategy_codepoints = set()
-    for subset in strategy:
-      all_strategy_codepoints.update(subset)
-
-    strategy_scores[strategy_name] = sum(
-        codepoint in all_strategy_codepoints for codepoint in codepoints)
+  # coverage. Ties go to the strategy covering the fewest codepoints (then to
+  # the first by name), so that the choice doesn't depend on set ordering.
+  strategy_scores = {
+      strategy_name: (len(
+          load_strategy_codepoints(strategy_name).intersection(codepoints)),
+                      -len(load_strategy_codepoints(strategy_name))
+                     ) for strategy_name in sorted(get_available_strategies())
+  }
 
   return max(strategy_scores.keys(),
              key=lambda strategy: strategy_scores[strategy])
 
 
+@functools.lru_cache(maxsize=None)
 def get_available_strategies():
   """Returns the names of all available strategies."""
-  return set(
-      f.replace(".textproto", "")
+  return frozenset(
+      os.path.splitext(f)[0]
       for f in os.listdir(SLICING_STRATEGY_DIR)
-      if os.path.isfile(os.path.join(SLICING_STRATEGY_DIR, f)) and
-      f.endswith(".textproto"))
+      if os.path.isfile(os.path.join(SLICING_STRATEGY_DIR, f)) and f.endswith((
+          TEXT_EXTENSION, BINARY_EXTENSION)))
+
+
+@functools.lru_cache(maxsize=None)
+def strategies_fingerprint():
+  """Returns the sha256 of the names and contents of all strategies."""
+  digest = hashlib.sha256()
+  for strategy_name in sorted(get_available_strategies()):
+    digest.update(strategy_name.encode("utf8"))
+    with open(strategy_path(strategy_name), "rb") as strategy_file:
+      digest.update(strategy_file.read())
+  return digest.hexdigest()
+
+
+def strategy_path(strategy_name):
+  """Returns the file a strategy is loaded from.
+
+  A strategy compiled to a binary proto (which is much faster to parse) is
+  used instead of the textproto when present, unless it is older than the
+  textproto. Then the textproto was edited after it was compiled, so the
+  binary proto is stale and the textproto is used instead.
+  """
+  binary_path = os.path.join(SLICING_STRATEGY_DIR,
+                             strategy_name + BINARY_EXTENSION)
+  text_path = os.path.join(SLICING_STRATEGY_DIR, strategy_name + TEXT_EXTENSION)
+  if not os.path.isfile(binary_path):
+    return text_path
+
+  if (os.path.isfile(text_path) and
+      os.path.getmtime(binary_path) < os.path.getmtime(text_path)):
+    LOG.warning(
+        "%s is older than %s, using the textproto. Recompile it with "
+        "tools:compile_slicing_strategies.", binary_path, text_path)
+    return text_path
+  return binary_path
 
 
 @functools.lru_cache(maxsize=None)
 def load_slicing_strategy(strategy_name):
   """Load the slicing strategy identified by strategy_name and return it."""
-  file_name = "%s.textproto" % strategy_name
-  with io.open(os.path.join(SLICING_STRATEGY_DIR, file_name),
-               'r',
-               encoding='utf8') as strategy_file:
-    strategy_file_contents = strategy_file.read()
+  strategy_proto = read_strategy_file(strategy_path(strategy_name))
+  return [subset_to_set(subset) for subset in strategy_proto.subsets]
+
 
+def read_strategy_file(path):
+  """Reads a SlicingStrategy proto from a textproto or binary proto file."""
   strategy_proto = slicing_strategy_pb2.SlicingStrategy()
+  if path.endswith(BINARY_EXTENSION):
+    with open(path, "rb") as strategy_file:
+      strategy_proto.ParseFromString(strategy_file.read())
+    return strategy_proto
+
+  with io.open(path, 'r', encoding='utf8') as strategy_file:
+    strategy_file_contents = strategy_file.read()
   text_format.Merge(strategy_file_contents, strategy_proto)
+  return strategy_proto
+
+
+@functools.lru_cache(maxsize=None)
+def load_strategy_codepoints(strategy_name):
+  """Returns the set of all codepoints covered by a slicing strategy."""
+  return frozenset().union(*load_slicing_strategy(strategy_name))
 
-  return [subset_to_set(subset) for subset in strategy_proto.subsets]
+
+@functools.lru_cache(maxsize=None)
+def load_subset_index(strategy_name):
+  """Maps each codepoint in a slicing strategy to the subsets containing it.
+
+  Returns a dict from codepoint to a tuple of the indices of the subsets
+  (within load_slicing_strategy(strategy_name)) which contain it.
+  """
+  index = collections.defaultdict(list)
+  for subset_index, subset in enumerate(load_slicing_strategy(strategy_name)):
+    for codepoint in subset:
+      index[codepoint].append(subset_index)
+  return {codepoint: tuple(indices) for codepoint, indices in index.items()}
+
+
+def subsets_for_codepoints(strategy_name, codepoints):
+  """Returns the indices of the subsets of a strategy which intersect codepoints.
+
+  Takes one lookup per codepoint instead of intersecting codepoints with
+  every subset of the strategy.
+  """
+  index = load_subset_index(strategy_name)
+  result = set()
+  for codepoint in codepoints:
+    result.update(index.get(codepoint, ()))
+  return result
 
 
 def subset_to_set(subset_proto):
   return set(cp.codepoint for cp in subset_proto.codepoint_frequencies)
 
 
-def codepoints_in_font(font_bytes):  # pylint: disable=unused-argument
+def codepoints_in_font(font_bytes):
   """Returns the set of codepoints that the font can render."""
-  font = ttLib.TTFont(io.BytesIO(font_bytes))
-
-  result = set()
-  for sub_table in font["cmap"].tables:
-    if sub_table.isUnicode():
-      result.update(sub_table.cmap.keys())
-
-  return result
+  return set(font_loader.FontInfo(font_bytes).codepoints)
@@ -1,7 +1,11 @@
 """Unit tests for the slicing_strategy_loader module."""
 
+import hashlib
+import os
+import tempfile
 import unittest
 
+from analysis import persistent_cache
 from analysis.pfe_methods.unicode_range_data import slicing_strategy_loader
 
 
@@ -25,6 +29,79 @@ class SlicingStrategyLoaderTest(unittest.TestCase):
     for code_point in strategy[0]:
       self.assertEqual(type(code_point), int)
 
+  def test_subsets_for_codepoints(self):
+    strategy = slicing_strategy_loader.load_slicing_strategy("japanese_slices")
+    codepoints = {0x61, 0x3042, 0x4E00, 0x10FFFF}
+    self.assertEqual(
+        slicing_strategy_loader.subsets_for_codepoints("japanese_slices",
+                                                       codepoints),
+        {
+            index for index, subset in enumerate(strategy)
+            if subset.intersection(codepoints)
+        })
+    self.assertEqual(
+        slicing_strategy_loader.subsets_for_codepoints("japanese_slices",
+                                                       set()), set())
+
+  def test_load_subset_index(self):
+    strategy = slicing_strategy_loader.load_slicing_strategy("non_cjk_slices")
+    index = slicing_strategy_loader.load_subset_index("non_cjk_slices")
+    self.assertIs(index,
+                  slicing_strategy_loader.load_subset_index("non_cjk_slices"))
+    for codepoint, subset_indices in index.items():
+      for subset_index in subset_indices:
+        self.assertIn(codepoint, strategy[subset_index])
+    self.assertEqual(sum(len(indices) for indices in index.values()),
+                     sum(len(subset) for subset in strategy))
+
+  def test_load_strategy_codepoints(self):
+    strategy = slicing_strategy_loader.load_slicing_strategy("non_cjk_slices")
+    codepoints = slicing_strategy_loader.load_strategy_codepoints(
+        "non_cjk_slices")
+    self.assertEqual(codepoints, set().union(*strategy))
+    self.assertIs(
+        codepoints,
+        slicing_strategy_loader.load_strategy_codepoints("non_cjk_slices"))
+
+  def test_slicing_strategy_for_codepoints(self):
+    self.assertEqual(
+        slicing_strategy_loader.slicing_strategy_for_codepoints(
+            {0x61, 0x62, 0x63}), "non_cjk_slices")
+    self.assertEqual(
+        slicing_strategy_loader.slicing_strategy_for_codepoints(
+            {0x3042, 0x3044, 0x30A2, 0x30A4, 0x61}), "japanese_slices")
+
+  def test_slicing_strategy_for_font_persistent_cache(self):
+    with open("patch_subset/testdata/Roboto-Regular.abcd.ttf",
+              "rb") as font_file:
+      font_bytes = font_file.read()
+
+    with tempfile.TemporaryDirectory() as the_dir:
+      cache = persistent_cache.PersistentCache(os.path.join(the_dir, "cache"))
+      slicing_strategy_loader.PERSISTENT_CACHE = cache
+      try:
+        slicing_strategy_loader.FONT_STRATEGY_CACHE.clear()
+        self.assertEqual(
+            slicing_strategy_loader.slicing_strategy_for_font(font_bytes),
+            "non_cjk_slices")
+        self.assertEqual(len(cache), 1)
+
+        # A new process only has the persistent cache, which is used instead
+        # of classifying the font again.
+        slicing_strategy_loader.FONT_STRATEGY_CACHE.clear()
+        cache.put(
+            "slicing_strategy:%s:%s" %
+            (hashlib.sha256(font_bytes).hexdigest(),
+             slicing_strategy_loader.strategies_fingerprint()),
+            "japanese_slices")
+        self.assertEqual(
+            slicing_strategy_loader.slicing_strategy_for_font(font_bytes),
+            "japanese_slices")
+      finally:
+        slicing_strategy_loader.PERSISTENT_CACHE = None
+        slicing_strategy_loader.FONT_STRATEGY_CACHE.clear()
+        cache.close()
+
   def test_get_available_strategies(self):
     strategies = slicing_strategy_loader.get_available_strategies()
     # Should at least have 1 non cjk, 3 chinese, 1 jp, 1 kr
@@ -16,10 +16,16 @@ from analysis import network_models
 from analysis import request_graph
 from analysis.pfe_methods import subset_sizer
 from analysis.pfe_methods.unicode_range_data import slicing_strategy_loader
+from analysis.pfe_methods.unicode_range_data import subset_size_table_pb2
 
 # Cache of which slicing strategy to use per font. Keyed by font name.
 FONT_SLICING_STRATEGY_CACHE = dict()
 
+# Precomputed subset sizes (see load_subset_size_table). Maps a font
+# fingerprint to a tuple of the slicing strategy name and the size of each
+# subset in the strategy.
+SUBSET_SIZE_TABLE = dict()
+
 
 def name():
   return "GoogleFonts_UnicodeRange"
@@ -30,11 +36,11 @@ def start_session(network_model, font_loader, a_subset_sizer=None):
   return UnicodeRangePfeSession(font_loader, a_subset_sizer)
 
 
-def slicing_strategy_for_font(font_id, font_bytes):
-  """Returns the slicing strategy that should be used to segment font_bytes."""
+def slicing_strategy_for_font(font_id, font_info):
+  """Returns the slicing strategy that should be used to segment a font."""
   if font_id not in FONT_SLICING_STRATEGY_CACHE:
-    strategy_name = slicing_strategy_loader.slicing_strategy_for_font(
-        font_bytes)
+    strategy_name = slicing_strategy_loader.slicing_strategy_for_font_info(
+        font_info)
     FONT_SLICING_STRATEGY_CACHE[font_id] = strategy_name
 
   strategy_name = FONT_SLICING_STRATEGY_CACHE[font_id]
@@ -42,6 +48,33 @@ def slicing_strategy_for_font(font_id, font_bytes):
           slicing_strategy_loader.load_slicing_strategy(strategy_name))
 
 
+def load_subset_size_table(path):
+  """Loads a table of subset sizes written by precompute_unicode_range_sizes.
+
+  Sizes in the table are used instead of cutting the subsets during the
+  simulation.
+  """
+  table = subset_size_table_pb2.SubsetSizeTable()
+  with open(path, "rb") as table_file:
+    table.ParseFromString(table_file.read())
+
+  for font in table.fonts:
+    SUBSET_SIZE_TABLE[font.font_fingerprint] = (font.slicing_strategy,
+                                                tuple(font.subset_sizes))
+
+
+def precomputed_subset_sizes(strategy_name, strategy, font_bytes):
+  """Returns the table's subset sizes for a font, or None if it has none."""
+  if not SUBSET_SIZE_TABLE:
+    return None
+
+  entry = SUBSET_SIZE_TABLE.get(subset_sizer.font_fingerprint(font_bytes))
+  if (entry is None or entry[0] != strategy_name or
+      len(entry[1]) != len(strategy)):
+    return None
+  return entry[1]
+
+
 class UnicodeRangePfeSession:
   """Unicode range PFE session."""
 
@@ -68,27 +101,28 @@ class UnicodeRangePfeSession:
     """
     font_bytes = self.font_loader.load_font(font_id)
 
-    strategy_name, strategy = slicing_strategy_for_font(font_id, font_bytes)
+    strategy_name, strategy = slicing_strategy_for_font(
+        font_id, self.font_loader.load_font_info(font_id))
 
-    subset_sizes = {
-        "%s:%s:%s" % (font_id, strategy_name, index):
-        self.subset_sizer.subset_size(
-            "%s:%s:%s" % (font_id, strategy_name, index), subset, font_bytes)
-        for index, subset in enumerate(strategy)
-        if subset.intersection(codepoints)
-    }
+    subset_indices = slicing_strategy_loader.subsets_for_codepoints(
+        strategy_name, codepoints)
+    new_subsets = {(font_id, strategy_name, index) for index in subset_indices}
+    new_subsets -= self.already_loaded_subsets
+    precomputed_sizes = precomputed_subset_sizes(strategy_name, strategy,
+                                                 font_bytes)
 
     # Unicode range requests can happen in parallel, so there's
     # no deps between individual requests.
     requests = {
         request_graph.Request(
             network_models.ESTIMATED_HTTP_REQUEST_HEADER_SIZE,
-            network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE + size)
-        for key, size in subset_sizes.items()
-        if key not in self.already_loaded_subsets
+            network_models.ESTIMATED_HTTP_RESPONSE_HEADER_SIZE +
+            (precomputed_sizes[index] if precomputed_sizes else
+             self.subset_sizer.subset_size(strategy[index], font_bytes)))
+        for _, _, index in new_subsets
     }
 
-    self.already_loaded_subsets.update(subset_sizes.keys())
+    self.already_loaded_subsets.update(new_subsets)
     return requests
 
   def get_request_graphs(self):
@@ -1,9 +1,14 @@
 """Unit tests for the unicode_range_pfe_method module."""
 
+import os
+import tempfile
 import unittest
 from collections import namedtuple
+from unittest import mock
 
+from analysis.pfe_methods import subset_sizer
 from analysis.pfe_methods import unicode_range_pfe_method
+from analysis.pfe_methods.unicode_range_data import subset_size_table_pb2
 from analysis import font_loader
 from analysis import request_graph
 
@@ -15,7 +20,7 @@ def u(codepoints):  # pylint: disable=invalid-name
 
 class MockSubsetSizer:
 
-  def subset_size(self, cache_key, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
+  def subset_size(self, subset, font_bytes):  # pylint: disable=unused-argument,no-self-use
     return 1000
 
 
@@ -78,6 +83,55 @@ class UnicodeRangePfeMethodTest(unittest.TestCase):
             (35, 1035),
         ]))
 
+  def test_only_sizes_new_subsets(self):
+    sizer = MockSubsetSizer()
+    sizer.subset_size = mock.MagicMock(return_value=1000)
+    session = unicode_range_pfe_method.start_session(
+        None, font_loader.FontLoader("./patch_subset/testdata/"), sizer)
+    session.page_view({"Roboto-Regular.ttf": u([0x61, 0x0474])})
+    session.page_view({"Roboto-Regular.ttf": u([0x62, 0x0475])})
+
+    self.assertEqual(sizer.subset_size.call_count, 2)
+
+  def test_subset_size_table(self):
+    loader = font_loader.FontLoader("./patch_subset/testdata/")
+    strategy_name, strategy = unicode_range_pfe_method.slicing_strategy_for_font(
+        "Roboto-Regular.ttf", loader.load_font_info("Roboto-Regular.ttf"))
+    table = subset_size_table_pb2.SubsetSizeTable()
+    font = table.fonts.add()
+    font.font_fingerprint = subset_sizer.font_fingerprint(
+        loader.load_font("Roboto-Regular.ttf"))
+    font.slicing_strategy = strategy_name
+    font.subset_sizes.extend([2000] * len(strategy))
+
+    with tempfile.TemporaryDirectory() as the_dir:
+      path = os.path.join(the_dir, "sizes.pb")
+      with open(path, "wb") as out:
+        out.write(table.SerializeToString())
+      unicode_range_pfe_method.load_subset_size_table(path)
+
+    try:
+      sizer = MockSubsetSizer()
+      sizer.subset_size = mock.MagicMock(return_value=1000)
+      session = unicode_range_pfe_method.start_session(None, loader, sizer)
+      session.page_view({"Roboto-Regular.ttf": u([0x61, 0x0474])})
+      session.page_view({"Roboto-Regular.abcd.ttf": u([0x61])})
+    finally:
+      unicode_range_pfe_method.SUBSET_SIZE_TABLE.clear()
+
+    # Only the font which isn't in the table is cut.
+    self.assertEqual(sizer.subset_size.call_count, 1)
+    graphs = session.get_request_graphs()
+    self.assertTrue(
+        request_graph.graph_has_independent_requests(graphs[0], [
+            (35, 2035),
+            (35, 2035),
+        ]))
+    self.assertTrue(
+        request_graph.graph_has_independent_requests(graphs[1], [
+            (35, 1035),
+        ]))
+
   def test_multiple_fonts(self):
     self.session.page_view({
         "Roboto-Regular.ttf": u([0x61, 0x62]),
@@ -1,5 +1,7 @@
 """A representation of a graph of requests."""
 
+import collections
+
 
 def graph_has_independent_requests(graph, request_response_size_pairs):
   """Checks if a graph only has independent requests.
@@ -50,6 +52,7 @@ class RequestGraph:
 
   def __init__(self, requests):
     self.requests = frozenset(requests)
+    self._levels, self._has_cycles = compute_levels(self.requests)
 
   def length(self):
     """Returns the number of requests in this graph."""
@@ -63,6 +66,23 @@ class RequestGraph:
     """Return the total number of response bytes in this graph."""
     return sum(request.response_size for request in self.requests)
 
+  def has_cycles(self):
+    """Return true if some requests in this graph can never be run.
+
+    This happens when the dependencies of a request form a cycle, or depend
+    on a request that isn't part of this graph.
+    """
+    return self._has_cycles
+
+  def levels(self):
+    """Returns the order in which the requests in this graph are executed.
+
+    A list of frozensets, each set is all of the requests which can run in
+    parallel once the requests in all previous sets have completed. If the
+    graph has cycles, then only the requests which can run are included.
+    """
+    return self._levels
+
   def all_requests_completed(self, completed_requests):
     """Return true if all requests in this graph are in the completed_requests set."""
     return all(r in completed_requests for r in self.requests)
@@ -72,3 +92,34 @@ class RequestGraph:
     return frozenset(
         r for r in self.requests
         if r.can_run(completed_requests) and r not in completed_requests)
+
+
+def compute_levels(requests):
+  """Splits requests into levels which can be executed in parallel.
+
+  Uses Kahn's algorithm so that each request and dependency is only visited
+  once. Returns a tuple of the list of levels and whether or not any requests
+  were left that could never be run.
+  """
+  waiting_on = {r: len(r.happens_after) for r in requests}
+  dependents = collections.defaultdict(list)
+  for request in requests:
+    for dependency in request.happens_after:
+      dependents[dependency].append(request)
+
+  levels = []
+  num_scheduled = 0
+  level = [r for r, count in waiting_on.items() if not count]
+  while level:
+    levels.append(frozenset(level))
+    num_scheduled += len(level)
+
+    next_level = []
+    for request in level:
+      for dependent in dependents.get(request, []):
+        waiting_on[dependent] -= 1
+        if not waiting_on[dependent]:
+          next_level.append(dependent)
+    level = next_level
+
+  return levels, num_scheduled != len(waiting_on)
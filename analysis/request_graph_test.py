@@ -74,6 +74,39 @@ class RequestGraphTest(unittest.TestCase):
     self.assertEqual(graph.requests_that_can_run({r_1}), {r_2, r_3})
     self.assertEqual(graph.requests_that_can_run({r_1, r_2, r_3}), {r_4})
 
+  def test_levels(self):
+    r_1 = request_graph.Request(1, 2)
+    r_2 = request_graph.Request(2, 3, {r_1})
+    r_3 = request_graph.Request(4, 5, {r_1})
+    r_4 = request_graph.Request(6, 7, {r_1, r_2})
+    r_5 = request_graph.Request(8, 9)
+    graph = request_graph.RequestGraph({r_1, r_2, r_3, r_4, r_5})
+
+    self.assertFalse(graph.has_cycles())
+    self.assertEqual(graph.levels(), [{r_1, r_5}, {r_2, r_3}, {r_4}])
+
+    graph = request_graph.RequestGraph(set())
+    self.assertFalse(graph.has_cycles())
+    self.assertEqual(graph.levels(), [])
+
+  def test_levels_with_cycles(self):
+    r_1 = request_graph.Request(1, 2)
+    r_2 = request_graph.Request(2, 3, {r_1})
+    r_3 = request_graph.Request(4, 5)
+    r_1.happens_after = frozenset({r_2})
+    graph = request_graph.RequestGraph({r_1, r_2, r_3})
+
+    self.assertTrue(graph.has_cycles())
+    self.assertEqual(graph.levels(), [{r_3}])
+
+  def test_levels_with_missing_dependency(self):
+    r_1 = request_graph.Request(1, 2)
+    r_2 = request_graph.Request(2, 3, {r_1})
+    graph = request_graph.RequestGraph({r_2})
+
+    self.assertTrue(graph.has_cycles())
+    self.assertEqual(graph.levels(), [])
+
   def test_all_requests_completed(self):
     r_1 = request_graph.Request(1, 2)
     r_2 = request_graph.Request(2, 3, {r_1})
@@ -0,0 +1,201 @@
+"""Converts the results of the simulation into result protos."""
+
+import collections
+
+from analysis import distribution
+from analysis import network_models
+from analysis import result_pb2
+from analysis import simulation
+
+
+def to_protos(simulation_results, cost_function):
+  """Converts results from the simulation (a dict from key to totals array) into proto.
+
+  Converts to a list of method result protos."""
+  results = []
+  for key, network_totals in sorted(simulation_results.items()):
+    results.append(to_method_result_proto(key, network_totals, cost_function))
+
+  return results
+
+
+def to_method_result_proto(method_name, network_totals, cost_function):
+  """Converts a set of totals for a method into the corresponding proto."""
+  method_result_proto = result_pb2.MethodResultProto()
+  method_result_proto.method_name = method_name
+
+  # TODO(garretrieger): produce aggregate network results
+
+  for category_proto in to_network_category_protos(network_totals,
+                                                   cost_function):
+    method_result_proto.results_by_network_category.append(category_proto)
+
+  for key, totals in sorted(network_totals.items()):
+    method_result_proto.results_by_network.append(
+        to_network_result_proto(key, totals, cost_function))
+  return method_result_proto
+
+
+def to_network_category_protos(network_totals, cost_function):  # pylint: disable=too-many-locals
+  """Convert network totals to per category totals.
+
+  For each network category combine the totals using a weighted average
+  to produce a total cost and total bytes transferred per sequence.
+  """
+  categories = collections.defaultdict(list)
+  num_totals = 0
+  for network_name, totals in network_totals.items():
+    net_model = network_models.get_network_model(network_name)
+    categories[net_model.category].append((net_model.weight, totals))
+    num_totals = max(num_totals, len(totals))
+
+  result = []
+  for category in sorted(categories):
+    category_costs = [0.0] * num_totals
+    category_bytes = [0.0] * num_totals
+    category_sequence_ids = [
+        seq_total.sequence_id for seq_total in categories[category][0][1]
+    ]
+    for category_totals in categories[category]:
+      weight = category_totals[0]
+      for i in range(len(category_totals[1])):
+        seq_total = category_totals[1][i]
+        for graph_total in seq_total.totals:
+          category_costs[i] += weight * (cost_function(graph_total.total_time))
+          category_bytes[i] += weight * (graph_total.request_bytes +
+                                         graph_total.response_bytes)
+
+    category_proto = result_pb2.NetworkCategoryResultProto()
+    category_proto.network_category = category
+    category_proto.cost_per_sequence.extend(category_costs)
+    category_proto.bytes_per_sequence.extend(category_bytes)
+    category_proto.sequence_ids.extend(category_sequence_ids)
+    result.append(category_proto)
+
+  return result
+
+
+def to_network_result_proto(network_model_name, totals, cost_function):  # pylint: disable=too-many-locals
+  """Convert totals from the simulation into a NetworkResultProto."""
+  network_result_proto = result_pb2.NetworkResultProto()
+  network_result_proto.network_model_name = network_model_name
+
+  request_bytes_per_page_view = distribution.Distribution(
+      distribution.LinearBucketer(5))
+  response_bytes_per_page_view = distribution.Distribution(
+      distribution.LinearBucketer(5))
+  latency_distribution = distribution.Distribution(
+      distribution.LinearBucketer(5))
+  cost_per_page_view = distribution.Distribution(distribution.LinearBucketer(5))
+
+  total_request_count = 0
+  total_request_bytes = 0
+  total_response_bytes = 0
+  total_wait_time_ms = 0
+  total_cost = 0
+  for seq_totals in totals:
+    for total in seq_totals.totals:
+      the_cost = cost_function(total.total_time)
+      request_bytes_per_page_view.add_value(total.request_bytes)
+      response_bytes_per_page_view.add_value(total.response_bytes)
+      latency_distribution.add_value(total.total_time)
+      cost_per_page_view.add_value(the_cost)
+      total_request_count += total.num_requests
+      total_request_bytes += total.request_bytes
+      total_response_bytes += total.response_bytes
+      total_wait_time_ms += total.total_time
+      total_cost += the_cost
+
+  network_result_proto.request_bytes_per_page_view.CopyFrom(
+      request_bytes_per_page_view.to_proto())
+  network_result_proto.response_bytes_per_page_view.CopyFrom(
+      response_bytes_per_page_view.to_proto())
+  network_result_proto.wait_per_page_view_ms.CopyFrom(
+      latency_distribution.to_proto())
+  network_result_proto.cost_per_page_view.CopyFrom(
+      cost_per_page_view.to_proto())
+  network_result_proto.total_cost = total_cost
+  network_result_proto.total_wait_time_ms = total_wait_time_ms
+  network_result_proto.total_request_bytes = total_request_bytes
+  network_result_proto.total_response_bytes = total_response_bytes
+  network_result_proto.total_request_count = total_request_count
+
+  return network_result_proto
+
+
+def to_shard_proto(simulation_results, global_indices, shard_index, num_shards):
+  """Converts the results of simulating one shard into a ShardResultProto.
+
+  global_indices maps the index of each simulated sequence to its index
+  within the full input data.
+  """
+  failed = set(simulation_results.failed_indices)
+  succeeded = [
+      global_indices[i] for i in range(len(global_indices)) if i not in failed
+  ]
+
+  shard_proto = result_pb2.ShardResultProto()
+  shard_proto.shard_index = shard_index
+  shard_proto.num_shards = num_shards
+  shard_proto.failed_indices.extend(
+      global_indices[i] for i in simulation_results.failed_indices)
+  for method, network_totals in simulation_results.totals_by_method.items():
+    to_method_totals_proto(method, network_totals, succeeded,
+                           shard_proto.totals_by_method.add())
+
+  return shard_proto
+
+
+def to_method_totals_proto(method_name, network_totals, indices, method_proto):
+  """Fills in method_proto from the per sequence totals of a method.
+
+  indices is the index of each sequence in the totals.
+  """
+  method_proto.method_name = method_name
+  for network_model_name, totals in network_totals.items():
+    network_proto = method_proto.totals_by_network.add()
+    network_proto.network_model_name = network_model_name
+    for index, seq_totals in zip(indices, totals):
+      to_sequence_totals_proto(index, seq_totals,
+                               network_proto.sequence_totals.add())
+
+
+def to_sequence_totals_proto(index, seq_totals, seq_proto):
+  """Fills in seq_proto from the totals for the sequence at index."""
+  seq_proto.index = index
+  seq_proto.sequence_id = seq_totals.sequence_id
+  for total in seq_totals.totals:
+    seq_proto.graph_totals.add(total_time=total.total_time,
+                               request_bytes=total.request_bytes,
+                               response_bytes=total.response_bytes,
+                               num_requests=total.num_requests)
+
+
+def from_shard_protos(shard_protos):
+  """Combines the results of a set of shards into a single SimulationResults.
+
+  Per sequence totals and failed indices are ordered by the index of the
+  sequence within the full input data, which matches the order produced by
+  simulating all of the input data at once.
+  """
+  failed_indices = []
+  ordered_totals = []
+  for shard_proto in shard_protos:
+    failed_indices.extend(shard_proto.failed_indices)
+    for method_proto in shard_proto.totals_by_method:
+      for network_proto in method_proto.totals_by_network:
+        ordered_totals.extend((seq_proto.index, method_proto.method_name,
+                               network_proto.network_model_name, seq_proto)
+                              for seq_proto in network_proto.sequence_totals)
+
+  merged = collections.defaultdict(lambda: collections.defaultdict(list))
+  for _, method, network, seq_proto in sorted(ordered_totals,
+                                              key=lambda entry: entry[0]):
+    merged[method][network].append(
+        simulation.SequenceTotals([
+            simulation.GraphTotal(total.total_time, total.request_bytes,
+                                  total.response_bytes, total.num_requests)
+            for total in seq_proto.graph_totals
+        ], seq_proto.sequence_id))
+
+  return simulation.SimulationResults(merged, sorted(failed_indices))
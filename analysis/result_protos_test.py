@@ -0,0 +1,195 @@
+"""Unit tests for the result_protos module."""
+
+import unittest
+from analysis import result_pb2
+from analysis import result_protos
+from analysis import simulation
+
+
+def mock_cost(total_time_ms):
+  return total_time_ms / 10
+
+
+def s(values):  # pylint: disable=invalid-name
+  return simulation.SequenceTotals(values, 42)
+
+
+def g(time, request, response):  # pylint: disable=invalid-name
+  return simulation.GraphTotal(time, request, response, 0)
+
+
+class ResultProtosTest(unittest.TestCase):
+
+  def test_to_network_category_protos(self):
+    cost_function = lambda cost: cost * 2
+    network_totals = {
+        "desktop_slowest": [
+            s([
+                g(100, 200, 300),
+                g(200, 300, 400),
+                g(300, 400, 500),
+            ]),
+            s([
+                g(200, 300, 400),
+                g(300, 400, 500),
+            ]),
+        ],
+        "desktop_median": [
+            s([
+                g(10, 20, 30),
+                g(20, 30, 40),
+            ]),
+            s([
+                g(30, 40, 50),
+            ]),
+        ],
+        "mobile_wifi_slowest": [
+            s([g(1, 2, 3)]),
+            s([g(4, 5, 6)]),
+        ]
+    }
+
+    result = result_protos.to_network_category_protos(network_totals,
+                                                      cost_function)
+
+    self.assertEqual(len(result), 2)
+    self.assertEqual(result[0].network_category, "desktop")
+    self.assertEqual(len(result[0].cost_per_sequence), 2)
+    self.assertEqual(len(result[0].bytes_per_sequence), 2)
+
+    self.assertEqual(result[1].network_category, "wifi")
+    self.assertEqual(len(result[1].cost_per_sequence), 2)
+    self.assertEqual(len(result[1].bytes_per_sequence), 2)
+
+    # s0:
+    #  cost =   0.05 * 2 * (100 + 200 + 300)
+    #         + 0.50 * 2 * (10 + 20)
+    #  bytes =  0.05 * (200 + 300 + 300 + 400 + 400 + 500)
+    #         + 0.50 * (20 + 30 + 30 + 40)
+    self.assertEqual(result[0].cost_per_sequence[0], 90)
+    self.assertEqual(result[0].bytes_per_sequence[0], 165)
+
+    # s1:
+    #  cost =   0.05 * 2 * (200 + 300)
+    #         + 0.50 * 2 * (30)
+    #  bytes =  0.05 * (300 + 400 + 400 + 500)
+    #         + 0.50 * (40 + 50)
+    self.assertEqual(result[0].cost_per_sequence[1], 80)
+    self.assertEqual(result[0].bytes_per_sequence[1], 125)
+
+  def test_result_to_protos(self):
+    self.maxDiff = None  # pylint: disable=invalid-name
+    method_proto = result_pb2.MethodResultProto()
+    method_proto.method_name = "Fake_PFE"
+
+    network_category_proto = result_pb2.NetworkCategoryResultProto()
+    network_category_proto.network_category = "2G"
+    network_category_proto.cost_per_sequence.extend([210.0, 0.0])
+    network_category_proto.bytes_per_sequence.extend([3000.0, 0.0])
+    network_category_proto.sequence_ids.append(42)
+    method_proto.results_by_network_category.append(network_category_proto)
+
+    network_category_proto = result_pb2.NetworkCategoryResultProto()
+    network_category_proto.network_category = "desktop"
+    network_category_proto.cost_per_sequence.extend([10.0, 10.0])
+    network_category_proto.bytes_per_sequence.extend([1500.0, 1500.0])
+    network_category_proto.sequence_ids.extend([42, 43])
+    method_proto.results_by_network_category.append(network_category_proto)
+
+    network_proto = result_pb2.NetworkResultProto()
+    network_proto.network_model_name = "desktop_median"
+    network_proto.total_cost = 40
+    network_proto.total_wait_time_ms = 400
+    network_proto.wait_per_page_view_ms.buckets.add(end=200)
+    network_proto.wait_per_page_view_ms.buckets.add(end=205, count=2)
+    network_proto.cost_per_page_view.buckets.add(end=20)
+    network_proto.cost_per_page_view.buckets.add(end=25, count=2)
+    network_proto.request_bytes_per_page_view.buckets.add(end=1000)
+    network_proto.request_bytes_per_page_view.buckets.add(end=1005, count=2)
+    network_proto.response_bytes_per_page_view.buckets.add(end=2000)
+    network_proto.response_bytes_per_page_view.buckets.add(end=2005, count=2)
+    network_proto.total_request_bytes = 2000
+    network_proto.total_response_bytes = 4000
+    network_proto.total_request_count = 12
+    method_proto.results_by_network.append(network_proto)
+
+    network_proto = result_pb2.NetworkResultProto()
+    network_proto.network_model_name = "mobile_2g_median"
+    network_proto.total_cost = 420
+    network_proto.total_wait_time_ms = 4200
+    network_proto.wait_per_page_view_ms.buckets.add(end=2100)
+    network_proto.wait_per_page_view_ms.buckets.add(end=2105, count=2)
+    network_proto.cost_per_page_view.buckets.add(end=210)
+    network_proto.cost_per_page_view.buckets.add(end=215, count=2)
+    network_proto.request_bytes_per_page_view.buckets.add(end=1000)
+    network_proto.request_bytes_per_page_view.buckets.add(end=1005, count=2)
+    network_proto.response_bytes_per_page_view.buckets.add(end=2000)
+    network_proto.response_bytes_per_page_view.buckets.add(end=2005, count=2)
+    network_proto.total_request_bytes = 2000
+    network_proto.total_response_bytes = 4000
+    network_proto.total_request_count = 12
+    method_proto.results_by_network.append(network_proto)
+
+    self.assertEqual(
+        result_protos.to_protos(
+            {
+                "Fake_PFE": {
+                    "mobile_2g_median": [
+                        simulation.SequenceTotals([
+                            simulation.GraphTotal(2100, 1000, 2000, 5),
+                            simulation.GraphTotal(2100, 1000, 2000, 7)
+                        ], 42),
+                    ],
+                    "desktop_median": [
+                        simulation.SequenceTotals([
+                            simulation.GraphTotal(200, 1000, 2000, 5),
+                        ], 42),
+                        simulation.SequenceTotals(
+                            [simulation.GraphTotal(200, 1000, 2000, 7)], 43),
+                    ]
+                }
+            }, mock_cost), [method_proto])
+
+  def test_shard_protos(self):
+    shard_1 = result_protos.to_shard_proto(
+        simulation.SimulationResults(
+            {
+                "abc": {
+                    "jkl": [s([g(1, 2, 3)]), s([g(4, 5, 6)])],
+                    "mno": [s([g(7, 8, 9)]), s([])],
+                },
+            }, [1]), [0, 3, 5], 0, 2)
+    shard_2 = result_protos.to_shard_proto(
+        simulation.SimulationResults(
+            {
+                "abc": {
+                    "jkl": [s([g(10.5, 11, 12), g(13, 14, 15)])],
+                    "mno": [s([g(16, 17, 18)])],
+                },
+            }, []), [4], 1, 2)
+
+    self.assertEqual(shard_1.failed_indices, [3])
+    self.assertEqual([
+        seq.index for seq in
+        shard_1.totals_by_method[0].totals_by_network[0].sequence_totals
+    ], [0, 5])
+
+    self.assertEqual(
+        result_protos.from_shard_protos([shard_2, shard_1]),
+        simulation.SimulationResults(
+            {
+                "abc": {
+                    "jkl": [
+                        s([g(1, 2, 3)]),
+                        s([g(10.5, 11, 12), g(13, 14, 15)]),
+                        s([g(4, 5, 6)]),
+                    ],
+                    "mno": [s([g(7, 8, 9)]),
+                            s([g(16, 17, 18)]),
+                            s([])],
+                },
+            }, [3]))
+
+
+if __name__ == '__main__':
+  unittest.main()
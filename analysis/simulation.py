@@ -1,5 +1,6 @@
 """Functions for simulating various PFE methods across a data set."""
 
+import array
 import collections
 from collections import namedtuple
 import logging
@@ -23,6 +24,10 @@ NetworkModel = collections.namedtuple(
 SimulationResults = collections.namedtuple(
     "SimulationResults", ["totals_by_method", "failed_indices"])
 
+# The combined size of a set of requests that are executed in parallel.
+RequestLevel = collections.namedtuple("RequestLevel",
+                                      ["request_bytes", "response_bytes"])
+
 
 class GraphHasCyclesError(Exception):
   """Encountered a graph that can't be completed because
@@ -31,11 +36,19 @@ class GraphHasCyclesError(Exception):
 
 def network_time_for(requests, network_model):
   """Returns the time needed to execute a set of requests in parallel."""
-  request_bytes = sum(request.request_size for request in requests)
-  response_bytes = sum(response.response_size for response in requests)
-  time = (network_model.rtt + request_bytes / network_model.bandwidth_up +
-          response_bytes / network_model.bandwidth_down)
-  return time
+  return network_time_for_level(level_for(requests), network_model)
+
+
+def level_for(requests):
+  """Returns the RequestLevel for a set of requests executed in parallel."""
+  return RequestLevel(sum(request.request_size for request in requests),
+                      sum(request.response_size for request in requests))
+
+
+def network_time_for_level(level, network_model):
+  """Returns the time needed to execute a level of parallel requests."""
+  return (network_model.rtt + level.request_bytes / network_model.bandwidth_up +
+          level.response_bytes / network_model.bandwidth_down)
 
 
 def simulate_all(sequences,
@@ -62,20 +75,8 @@ def simulate_all(sequences,
 
     try:
       for method in pfe_methods:
-
-        if not is_network_sensitive(method):
-          graphs = simulate_sequence(sequence.page_views, method, None,
-                                     a_font_loader)
-
-        network_results = sequence_results[method.name()]
-        for network_model in network_models:
-          if is_network_sensitive(method):
-            graphs = simulate_sequence(sequence.page_views, method,
-                                       network_model, a_font_loader)
-
-          network_results[network_model.name].append(
-              SequenceTotals(totals_for_network(graphs, network_model),
-                             sequence.id))
+        simulate_method(sequence, method, network_models, a_font_loader,
+                        sequence_results[method.name()])
 
       merge_results_by_method(sequence_results, results_by_method)
 
@@ -88,6 +89,34 @@ def simulate_all(sequences,
   return SimulationResults(dict(results_by_method), failed_indices)
 
 
+def simulate_method(sequence, method, network_models, a_font_loader,
+                    network_results):
+  """Simulate a single sequence with method across all network_models.
+
+  Appends the totals for each network model to network_results.
+  """
+  if not is_network_sensitive(method):
+    # The graphs are the same for every network model, so they only
+    # need to be walked once.
+    graphs = simulate_sequence(sequence.page_views, method, None, a_font_loader)
+    for network_name, totals in totals_for_networks(graphs,
+                                                    network_models).items():
+      network_results[network_name].append(SequenceTotals(totals, sequence.id))
+    return
+
+  # Sessions are only simulated once for each group of network models which
+  # produce the same request graphs.
+  totals_by_network = {}
+  for group in network_model_groups(method, network_models):
+    graphs = simulate_sequence(sequence.page_views, method, group[0],
+                               a_font_loader)
+    totals_by_network.update(totals_for_networks(graphs, group))
+
+  for network_model in network_models:
+    network_results[network_model.name].append(
+        SequenceTotals(totals_by_network[network_model.name], sequence.id))
+
+
 def merge_results_by_method(source, dest):
   for method, network_results in source.items():
     dest_network_results = dest[method]
@@ -100,13 +129,99 @@ def is_network_sensitive(method):
       method.network_sensitive) and method.network_sensitive()
 
 
+def network_model_groups(method, network_models):
+  """Groups the network models which produce the same request graphs.
+
+  Network sensitive methods can implement config_for_network(network_model)
+  which returns a hashable description of the configuration the method uses
+  for that network model. Network models with equal configurations are
+  grouped together, otherwise each network model is in a group of its own.
+  Returns a list of the groups, each a list of network models.
+  """
+  if not (hasattr(method, "config_for_network") and
+          callable(method.config_for_network)):
+    return [[network_model] for network_model in network_models]
+
+  groups = collections.defaultdict(list)
+  for network_model in network_models:
+    groups[method.config_for_network(network_model)].append(network_model)
+  return list(groups.values())
+
+
 def totals_for_network(graphs, network_model):
   """For a set of graphs computes the network time required for each network model."""
-  return [
-      GraphTotal(total_time_for_request_graph(graph, network_model),
-                 graph.total_request_bytes(), graph.total_response_bytes(),
-                 graph.length()) for graph in graphs
-  ]
+  return GraphSummaries(graphs).totals_for_network(network_model)
+
+
+def totals_for_networks(graphs, network_models):
+  """For a set of graphs computes the totals for every network model at once.
+
+  The graphs are summarized only once, after which evaluating a network
+  model is a pass over the summary. Returns a map from network model name to
+  the list of totals (one per graph).
+  """
+  summaries = GraphSummaries(graphs)
+  return {
+      network_model.name: summaries.totals_for_network(network_model)
+      for network_model in network_models
+  }
+
+
+class GraphSummaries:
+  """The network independent parts of the totals for a list of request graphs.
+
+  Stored as parallel arrays with one entry per graph: the total request and
+  response bytes, the number of requests and the offset of the graph's first
+  level. The levels of all graphs (see request_graph_levels()) are
+  concatenated into a second pair of arrays, graph i owns the levels in
+  [level_offsets[i], level_offsets[i + 1]).
+  """
+
+  def __init__(self, graphs):
+    """Summarizes graphs, an iterable of request graphs.
+
+    Sizes are stored in unsigned arrays, so every request and response size
+    in graphs must be a non-negative integer.
+    """
+    self.request_bytes = array.array("Q")
+    self.response_bytes = array.array("Q")
+    self.num_requests = array.array("Q")
+    self.level_offsets = array.array("Q", [0])
+    self.level_request_bytes = array.array("Q")
+    self.level_response_bytes = array.array("Q")
+
+    for graph in graphs:
+      for level in request_graph_levels(graph):
+        self.level_request_bytes.append(level.request_bytes)
+        self.level_response_bytes.append(level.response_bytes)
+      self.level_offsets.append(len(self.level_request_bytes))
+      self.request_bytes.append(graph.total_request_bytes())
+      self.response_bytes.append(graph.total_response_bytes())
+      self.num_requests.append(graph.length())
+
+  def __len__(self):
+    return len(self.request_bytes)
+
+  def totals_for_network(self, network_model):
+    """Returns the GraphTotal of each graph for network_model."""
+    rtt = network_model.rtt
+    bandwidth_up = network_model.bandwidth_up
+    bandwidth_down = network_model.bandwidth_down
+    level_request_bytes = self.level_request_bytes
+    level_response_bytes = self.level_response_bytes
+
+    totals = []
+    for index in range(len(self)):
+      total_time = 0
+      for level in range(self.level_offsets[index],
+                         self.level_offsets[index + 1]):
+        # Same order of operations as network_time_for_level().
+        total_time += (rtt + level_request_bytes[level] / bandwidth_up +
+                       level_response_bytes[level] / bandwidth_down)
+      totals.append(
+          GraphTotal(total_time, self.request_bytes[index],
+                     self.response_bytes[index], self.num_requests[index]))
+    return totals
 
 
 def simulate_sequence(sequence, pfe_method, network_model, a_font_loader):
@@ -117,10 +232,14 @@ def simulate_sequence(sequence, pfe_method, network_model, a_font_loader):
   session = pfe_method.start_session(network_model, a_font_loader)
   dont_convert_proto = (hasattr(session, "page_view_proto") and
                         callable(session.page_view_proto))
-  for page_view in sequence:
-    if dont_convert_proto:
+  if dont_convert_proto:
+    for page_view in sequence:
       session.page_view_proto(page_view)
-    else:
+  elif hasattr(session, "page_views") and callable(session.page_views):
+    # The session can process the whole sequence at once.
+    session.page_views([usage_by_font(page_view) for page_view in sequence])
+  else:
+    for page_view in sequence:
       session.page_view(usage_by_font(page_view))
 
   return session.get_request_graphs()
@@ -128,17 +247,27 @@ def simulate_sequence(sequence, pfe_method, network_model, a_font_loader):
 
 def total_time_for_request_graph(graph, network_model):
   """Calculate the total time and number of bytes need to execute a given request graph."""
-  total_time = 0
-  completed_requests = set()
-  while not graph.all_requests_completed(completed_requests):
-    next_requests = graph.requests_that_can_run(completed_requests)
-    if not next_requests:
-      raise GraphHasCyclesError("Cannot execute graph, it contains cycles.")
+  return total_time_for_levels(request_graph_levels(graph), network_model)
+
 
-    total_time += network_time_for(next_requests, network_model)
+def request_graph_levels(graph):
+  """Splits a request graph into the levels it will be executed in.
 
-    completed_requests = completed_requests.union(next_requests)
+  Each level is the set of requests which can run in parallel once all
+  previous levels have completed. Returns a list of RequestLevel's. This
+  does not depend on the network model so can be shared between them.
+  """
+  if graph.has_cycles():
+    raise GraphHasCyclesError("Cannot execute graph, it contains cycles.")
+
+  return [level_for(level) for level in graph.levels()]
 
+
+def total_time_for_levels(levels, network_model):
+  """Calculate the total time needed to execute a list of request levels."""
+  total_time = 0
+  for level in levels:
+    total_time += network_time_for_level(level, network_model)
   return total_time
 
 
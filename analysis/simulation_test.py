@@ -16,6 +16,15 @@ class MockPfeMethod:  # pylint: disable=missing-class-docstring
     pass
 
 
+class MockNetworkSensitivePfeMethod(MockPfeMethod):  # pylint: disable=missing-class-docstring
+
+  def network_sensitive(self):  # pylint: disable=no-self-use
+    return True
+
+  def config_for_network(self, network_model):  # pylint: disable=no-self-use
+    return network_model.category
+
+
 class MockPfeSession:  # pylint: disable=missing-class-docstring
 
   def page_view(self, usage_by_font):
@@ -25,6 +34,15 @@ class MockPfeSession:  # pylint: disable=missing-class-docstring
     pass
 
 
+class MockBatchPfeSession:  # pylint: disable=missing-class-docstring
+
+  def page_views(self, usages_by_font):
+    pass
+
+  def get_request_graphs(self):
+    pass
+
+
 class MockLoggedPfeSession:  # pylint: disable=missing-class-docstring
 
   def page_view_proto(self, proto):
@@ -132,6 +150,63 @@ class SimulationTest(unittest.TestCase):
     self.assertEqual(
         simulation.total_time_for_request_graph(graph, self.net_model), 175)
 
+  def test_request_graph_levels(self):
+    r_1 = request_graph.Request(100, 200)
+    r_2 = request_graph.Request(200, 300)
+    r_3 = request_graph.Request(300, 400, {r_2})
+    r_4 = request_graph.Request(400, 500, {r_1, r_2})
+    r_5 = request_graph.Request(500, 600, {r_3, r_4})
+    graph = request_graph.RequestGraph({r_1, r_2, r_3, r_4, r_5})
+
+    self.assertEqual(simulation.request_graph_levels(graph), [
+        simulation.RequestLevel(300, 500),
+        simulation.RequestLevel(700, 900),
+        simulation.RequestLevel(500, 600),
+    ])
+    self.assertEqual(
+        simulation.request_graph_levels(request_graph.RequestGraph(set())), [])
+
+  def test_totals_for_networks(self):
+    r_1 = request_graph.Request(100, 200)
+    r_2 = request_graph.Request(200, 300, {r_1})
+    graphs = [
+        request_graph.RequestGraph({r_1, r_2}),
+        request_graph.RequestGraph(set()),
+    ]
+    slow = simulation.NetworkModel("slow", 10, 10, 10, "slow", 1)
+
+    self.assertEqual(
+        simulation.totals_for_networks(graphs, [self.net_model, slow]), {
+            "NetModel":
+                simulation.totals_for_network(graphs, self.net_model),
+            "slow": [
+                simulation.GraphTotal(100, 300, 500, 2),
+                simulation.GraphTotal(0, 0, 0, 0),
+            ],
+        })
+
+  def test_graph_summaries(self):
+    r_1 = request_graph.Request(100, 200)
+    r_2 = request_graph.Request(200, 300, {r_1})
+    r_3 = request_graph.Request(50, 60)
+    graphs = [
+        request_graph.RequestGraph({r_1, r_2, r_3}),
+        request_graph.RequestGraph(set()),
+        request_graph.RequestGraph({r_3}),
+    ]
+    summaries = simulation.GraphSummaries(graphs)
+
+    self.assertEqual(len(summaries), 3)
+    self.assertEqual(list(summaries.level_offsets), [0, 2, 2, 3])
+    self.assertEqual(list(summaries.level_request_bytes), [150, 200, 50])
+    self.assertEqual(list(summaries.level_response_bytes), [260, 300, 60])
+    self.assertEqual(summaries.totals_for_network(self.net_model), [
+        simulation.GraphTotal(
+            simulation.total_time_for_request_graph(graph, self.net_model),
+            graph.total_request_bytes(), graph.total_response_bytes(),
+            graph.length()) for graph in graphs
+    ])
+
   def test_detects_cylces(self):
     r_1 = request_graph.Request(100, 200)
     r_2 = request_graph.Request(200, 300, {r_1})
@@ -162,6 +237,34 @@ class SimulationTest(unittest.TestCase):
     ])
     self.mock_pfe_session.get_request_graphs.assert_called_once_with()
 
+  def test_simulate_batch(self):
+    a_font_loader = font_loader.FontLoader("fonts/are/here")
+    batch_method = MockPfeMethod()
+    batch_session = MockBatchPfeSession()
+    batch_method.start_session = mock.MagicMock(return_value=batch_session)
+    batch_session.page_views = mock.MagicMock()
+    batch_session.get_request_graphs = mock.MagicMock(
+        return_value=[self.graph_1])
+
+    self.assertEqual(
+        simulation.simulate_sequence(
+            self.page_view_sequence, batch_method,
+            simulation.NetworkModel("slow", 0, 10, 10, "slow", 1),
+            a_font_loader), [self.graph_1])
+    usage = namedtuple("Usage", ["codepoints", "glyph_ids"])
+    batch_session.page_views.assert_called_once_with([
+        {
+            "roboto": usage({1, 2, 3}, set()),
+            "open_sans": usage({4, 5, 6}, set()),
+        },
+        {
+            "roboto": usage({7, 8, 9}, set()),
+        },
+        {
+            "open_sans": usage({10, 11, 12}, set())
+        },
+    ])
+
   def test_simulate_logged(self):
     a_font_loader = font_loader.FontLoader("fonts/are/here")
     self.assertEqual(
@@ -215,6 +318,42 @@ class SimulationTest(unittest.TestCase):
                 },
             }, []))
 
+  def test_simulate_all_groups_network_models(self):
+    method = MockNetworkSensitivePfeMethod()
+    method.name = mock.MagicMock(return_value="Mock_PFE")
+    method.start_session = mock.MagicMock(return_value=self.mock_pfe_session)
+
+    slow = simulation.NetworkModel("slow", 0, 10, 10, "mobile", 1)
+    fast = simulation.NetworkModel("fast", 0, 20, 20, "mobile", 1)
+    desktop = simulation.NetworkModel("desktop", 0, 40, 40, "desktop", 1)
+    results = simulation.simulate_all(
+        [pv_sequence(sequence([{
+            "roboto": [1]
+        }]))],
+        [method],
+        [slow, fast, desktop],
+        "fonts/are/here",
+    )
+
+    self.assertEqual(method.start_session.call_count, 2)
+    self.assertEqual(method.start_session.call_args_list[0][0][0], slow)
+    self.assertEqual(method.start_session.call_args_list[1][0][0], desktop)
+    self.assertEqual(
+        results.totals_by_method["Mock_PFE"], {
+            "slow": [
+                simulation.SequenceTotals(
+                    [simulation.GraphTotal(200.0, 1000, 1000, 1)], 42)
+            ],
+            "fast": [
+                simulation.SequenceTotals(
+                    [simulation.GraphTotal(100.0, 1000, 1000, 1)], 42)
+            ],
+            "desktop": [
+                simulation.SequenceTotals(
+                    [simulation.GraphTotal(50.0, 1000, 1000, 1)], 42)
+            ],
+        })
+
   def test_simulate_all_with_error(self):
     self.maxDiff = None  # pylint: disable=invalid-name
     graph = simulation.GraphTotal(100.0, 1000, 1000, 1)
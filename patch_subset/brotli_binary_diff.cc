@@ -27,12 +27,13 @@ DictionaryPointer CreateDictionary(const FontData& font) {
 }
 
 EncoderStatePointer CreateEncoder(
-    const FontData& font, const BrotliEncoderPreparedDictionary& dictionary) {
+    const FontData& font, const BrotliEncoderPreparedDictionary& dictionary,
+    int quality) {
   EncoderStatePointer state = EncoderStatePointer(
       BrotliEncoderCreateInstance(nullptr, nullptr, nullptr),
       &BrotliEncoderDestroyInstance);
 
-  if (!BrotliEncoderSetParameter(state.get(), BROTLI_PARAM_QUALITY, 9)) {
+  if (!BrotliEncoderSetParameter(state.get(), BROTLI_PARAM_QUALITY, quality)) {
     LOG(WARNING) << "Failed to set brotli quality.";
     return EncoderStatePointer(nullptr, nullptr);
   }
@@ -93,7 +94,8 @@ StatusCode BrotliBinaryDiff::Diff(const FontData& font_base,
     return StatusCode::kInternal;
   }
 
-  EncoderStatePointer state = CreateEncoder(font_derived, *dictionary);
+  EncoderStatePointer state =
+      CreateEncoder(font_derived, *dictionary, quality_);
   if (!state) {
     return StatusCode::kInternal;
   }
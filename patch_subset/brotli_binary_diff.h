@@ -11,8 +11,17 @@ namespace patch_subset {
 // with a shared dictionary.
 class BrotliBinaryDiff : public BinaryDiff {
  public:
+  static constexpr int kDefaultQuality = 9;
+
+  BrotliBinaryDiff() : quality_(kDefaultQuality) {}
+  // quality is the brotli compression quality (0 to 11).
+  explicit BrotliBinaryDiff(int quality) : quality_(quality) {}
+
   StatusCode Diff(const FontData& font_base, const FontData& font_derived,
                   FontData* patch /* OUT */) const override;
+
+ private:
+  const int quality_;
 };
 
 }  // namespace patch_subset
@@ -11,24 +11,31 @@ namespace patch_subset {
 
 StatusCode BrotliRequestLogger::LogRequest(const std::string& request_data,
                                            const std::string& response_data) {
-  std::string compressed_request_data;
-  StatusCode result = CompressIfSmaller(request_data, &compressed_request_data);
+  uint32_t request_size;
+  StatusCode result = CompressedSize(request_data, &request_size);
   if (result != StatusCode::kOk) {
     return result;
   }
 
-  std::string compressed_response_data;
-  CompressIfSmaller(response_data, &compressed_response_data);
+  uint32_t response_size;
+  result = CompressedSize(response_data, &response_size);
   if (result != StatusCode::kOk) {
     return result;
   }
 
-  return memory_request_logger_->LogRequest(compressed_request_data,
-                                            compressed_response_data);
+  return memory_request_logger_->LogRequestSizes(request_size, response_size);
 }
 
-StatusCode BrotliRequestLogger::CompressIfSmaller(const std::string& data,
-                                                  std::string* output_data) {
+StatusCode BrotliRequestLogger::CompressedSize(const std::string& data,
+                                               uint32_t* size /* OUT */) {
+  uint64_t checksum = 0;
+  if (size_cache_) {
+    checksum = hasher_.Checksum(data);
+    if (size_cache_->Get(checksum, data.size(), size)) {
+      return StatusCode::kOk;
+    }
+  }
+
   FontData empty;
   FontData compressed;
   FontData font_data(data);
@@ -38,10 +45,9 @@ StatusCode BrotliRequestLogger::CompressIfSmaller(const std::string& data,
     return result;
   }
 
-  if (compressed.size() < data.size()) {
-    output_data->assign(compressed.data(), compressed.size());
-  } else {
-    *output_data = data;
+  *size = compressed.size() < data.size() ? compressed.size() : data.size();
+  if (size_cache_) {
+    size_cache_->Put(checksum, data.size(), *size);
   }
 
   return StatusCode::kOk;
@@ -7,30 +7,58 @@
 
 #include "common/status.h"
 #include "patch_subset/brotli_binary_diff.h"
+#include "patch_subset/compressed_size_cache.h"
+#include "patch_subset/farm_hasher.h"
 #include "patch_subset/memory_request_logger.h"
 #include "patch_subset/request_logger.h"
 
 namespace patch_subset {
 
+// How BrotliRequestLogger measures the compressed size of requests and
+// responses.
+enum class RequestCompression {
+  // Compress with the same brotli quality as BrotliBinaryDiff's default.
+  kExact = 0,
+  // Compress with a low brotli quality. Much faster, but the logged sizes are
+  // only approximate.
+  kFast = 1,
+};
+
 // Implementation of RequestLogger that saves applies a pass
 // of brotli compression to the request/response data if
 // it results in a smaller size, then logs the compressed
 // size to an inmemory buffer.
+//
+// If a size_cache is provided the compressed sizes of payloads are
+// looked up in and added to it. The cache must only be shared with loggers
+// using the same RequestCompression.
 class BrotliRequestLogger : public RequestLogger {
  public:
-  BrotliRequestLogger(MemoryRequestLogger* memory_request_logger)
+  static constexpr int kFastQuality = 5;
+
+  BrotliRequestLogger(
+      MemoryRequestLogger* memory_request_logger,
+      RequestCompression compression = RequestCompression::kExact,
+      CompressedSizeCache* size_cache = nullptr)
       : memory_request_logger_(memory_request_logger),
-        brotli_diff_(new BrotliBinaryDiff()) {}
+        brotli_diff_(
+            new BrotliBinaryDiff(compression == RequestCompression::kFast
+                                     ? kFastQuality
+                                     : BrotliBinaryDiff::kDefaultQuality)),
+        size_cache_(size_cache) {}
 
   StatusCode LogRequest(const std::string& request_data,
                         const std::string& response_data) override;
 
  private:
-  StatusCode CompressIfSmaller(const std::string& data,
-                               std::string* output_data);
+  // Size of data after compression, or the size of data if compression
+  // doesn't make it smaller.
+  StatusCode CompressedSize(const std::string& data, uint32_t* size /* OUT */);
 
   MemoryRequestLogger* memory_request_logger_;
   std::unique_ptr<BrotliBinaryDiff> brotli_diff_;
+  CompressedSizeCache* size_cache_;
+  FarmHasher hasher_;
 };
 
 }  // namespace patch_subset
@@ -55,4 +55,47 @@ TEST_F(BrotliRequestLoggerTest, DoesntCompress) {
   EXPECT_EQ(record.response_size, response_data.size());
 }
 
+TEST_F(BrotliRequestLoggerTest, FastCompression) {
+  std::string data(1000, 'a');
+  BrotliRequestLogger fast_logger(memory_request_logger_.get(),
+                                  RequestCompression::kFast);
+
+  EXPECT_EQ(fast_logger.LogRequest(data, data), StatusCode::kOk);
+
+  EXPECT_EQ(memory_request_logger_->Records().size(), 1);
+  const MemoryRequestLogger::Record& record =
+      memory_request_logger_->Records()[0];
+  EXPECT_LT(record.request_size, data.size());
+  EXPECT_GT(record.request_size, 0);
+  EXPECT_EQ(record.response_size, record.request_size);
+}
+
+TEST_F(BrotliRequestLoggerTest, CachesSizes) {
+  std::string request_data(100, 'a');
+  std::string response_data(300, 'b');
+  CompressedSizeCache cache(10);
+  BrotliRequestLogger cached_logger(memory_request_logger_.get(),
+                                    RequestCompression::kExact, &cache);
+
+  EXPECT_EQ(request_logger_->LogRequest(request_data, response_data),
+            StatusCode::kOk);
+  EXPECT_EQ(cached_logger.LogRequest(request_data, response_data),
+            StatusCode::kOk);
+  EXPECT_EQ(cache.hits(), 0);
+  EXPECT_EQ(cache.misses(), 2);
+
+  EXPECT_EQ(cached_logger.LogRequest(response_data, request_data),
+            StatusCode::kOk);
+  EXPECT_EQ(cache.hits(), 2);
+  EXPECT_EQ(cache.misses(), 2);
+
+  const std::vector<MemoryRequestLogger::Record>& records =
+      memory_request_logger_->Records();
+  EXPECT_EQ(records.size(), 3);
+  EXPECT_EQ(records[1].request_size, records[0].request_size);
+  EXPECT_EQ(records[1].response_size, records[0].response_size);
+  EXPECT_EQ(records[2].request_size, records[0].response_size);
+  EXPECT_EQ(records[2].response_size, records[0].request_size);
+}
+
 }  // namespace patch_subset
@@ -0,0 +1,31 @@
+#include "patch_subset/caching_font_provider.h"
+
+#include <string>
+#include <utility>
+
+#include "common/status.h"
+#include "patch_subset/font_data.h"
+
+namespace patch_subset {
+
+StatusCode CachingFontProvider::GetFont(const std::string& id,
+                                        FontData* out) const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto it = fonts_.find(id);
+  if (it == fonts_.end()) {
+    FontData font_data;
+    StatusCode result = font_provider_->GetFont(id, &font_data);
+    if (result != StatusCode::kOk) {
+      return result;
+    }
+    it = fonts_.emplace(id, std::move(font_data)).first;
+  }
+
+  // Shares the cached blob instead of copying the font.
+  hb_blob_t* blob = it->second.reference_blob();
+  out->set(blob);
+  hb_blob_destroy(blob);
+  return StatusCode::kOk;
+}
+
+}  // namespace patch_subset
@@ -0,0 +1,32 @@
+#ifndef PATCH_SUBSET_CACHING_FONT_PROVIDER_H_
+#define PATCH_SUBSET_CACHING_FONT_PROVIDER_H_
+
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+
+#include "patch_subset/font_provider.h"
+
+namespace patch_subset {
+
+// Wraps another FontProvider and keeps every font it loads in memory, so
+// each font is only loaded once. Fonts which fail to load are not cached.
+// Safe to use from multiple threads.
+class CachingFontProvider : public FontProvider {
+ public:
+  // Takes ownership of font_provider.
+  explicit CachingFontProvider(std::unique_ptr<FontProvider> font_provider)
+      : font_provider_(std::move(font_provider)) {}
+
+  StatusCode GetFont(const std::string& id, FontData* out) const override;
+
+ private:
+  std::unique_ptr<FontProvider> font_provider_;
+  mutable std::mutex mutex_;
+  mutable std::map<std::string, FontData> fonts_;
+};
+
+}  // namespace patch_subset
+
+#endif  // PATCH_SUBSET_CACHING_FONT_PROVIDER_H_
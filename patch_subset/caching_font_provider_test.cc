@@ -0,0 +1,53 @@
+#include "patch_subset/caching_font_provider.h"
+
+#include <string>
+
+#include "gmock/gmock.h"
+#include "gtest/gtest.h"
+#include "patch_subset/mock_font_provider.h"
+
+using ::testing::_;
+using ::testing::Invoke;
+using ::testing::Return;
+
+namespace patch_subset {
+
+class CachingFontProviderTest : public ::testing::Test {
+ protected:
+  CachingFontProviderTest()
+      : mock_font_provider_(new MockFontProvider()),
+        font_provider_(std::unique_ptr<FontProvider>(mock_font_provider_)) {}
+
+  MockFontProvider* mock_font_provider_;
+  CachingFontProvider font_provider_;
+};
+
+TEST_F(CachingFontProviderTest, LoadsFontOnce) {
+  EXPECT_CALL(*mock_font_provider_, GetFont("roboto", _))
+      .Times(1)
+      .WillOnce(Invoke([](const std::string& id, FontData* out) {
+        out->copy("a font");
+        return StatusCode::kOk;
+      }));
+
+  FontData first;
+  FontData second;
+  EXPECT_EQ(font_provider_.GetFont("roboto", &first), StatusCode::kOk);
+  EXPECT_EQ(font_provider_.GetFont("roboto", &second), StatusCode::kOk);
+  EXPECT_EQ(first.str(), "a font");
+  EXPECT_EQ(second.str(), "a font");
+}
+
+TEST_F(CachingFontProviderTest, FailuresAreNotCached) {
+  EXPECT_CALL(*mock_font_provider_, GetFont("nothere", _))
+      .Times(2)
+      .WillRepeatedly(Return(StatusCode::kNotFound));
+
+  FontData font_data;
+  EXPECT_EQ(font_provider_.GetFont("nothere", &font_data),
+            StatusCode::kNotFound);
+  EXPECT_EQ(font_provider_.GetFont("nothere", &font_data),
+            StatusCode::kNotFound);
+}
+
+}  // namespace patch_subset
@@ -0,0 +1,43 @@
+#include "patch_subset/compressed_size_cache.h"
+
+#include <mutex>
+
+namespace patch_subset {
+
+bool CompressedSizeCache::Get(uint64_t checksum, size_t size,
+                              uint32_t* compressed_size /* OUT */) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto it = entries_.find(checksum);
+  if (it == entries_.end() || it->second.size != size) {
+    misses_++;
+    return false;
+  }
+
+  hits_++;
+  *compressed_size = it->second.compressed_size;
+  return true;
+}
+
+void CompressedSizeCache::Put(uint64_t checksum, size_t size,
+                              uint32_t compressed_size) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (entries_.size() >= max_entries_) {
+    entries_.clear();
+  }
+  if (!max_entries_) {
+    return;
+  }
+  entries_[checksum] = Entry{size, compressed_size};
+}
+
+uint64_t CompressedSizeCache::hits() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return hits_;
+}
+
+uint64_t CompressedSizeCache::misses() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return misses_;
+}
+
+}  // namespace patch_subset
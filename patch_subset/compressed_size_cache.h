@@ -0,0 +1,44 @@
+#ifndef PATCH_SUBSET_COMPRESSED_SIZE_CACHE_H_
+#define PATCH_SUBSET_COMPRESSED_SIZE_CACHE_H_
+
+#include <mutex>
+#include <unordered_map>
+
+namespace patch_subset {
+
+// Caches the compressed size of payloads keyed by a fingerprint (checksum
+// and size) of the uncompressed payload. A cache must only be used with a
+// single compression setting. Once max_entries sizes are cached the cache is
+// cleared. Safe to use from multiple threads.
+class CompressedSizeCache {
+ public:
+  explicit CompressedSizeCache(size_t max_entries)
+      : max_entries_(max_entries), hits_(0), misses_(0) {}
+
+  CompressedSizeCache(const CompressedSizeCache&) = delete;
+  CompressedSizeCache& operator=(const CompressedSizeCache&) = delete;
+
+  // If the payload is in the cache sets compressed_size and returns true.
+  bool Get(uint64_t checksum, size_t size, uint32_t* compressed_size /* OUT */);
+
+  void Put(uint64_t checksum, size_t size, uint32_t compressed_size);
+
+  uint64_t hits() const;
+  uint64_t misses() const;
+
+ private:
+  struct Entry {
+    size_t size;
+    uint32_t compressed_size;
+  };
+
+  const size_t max_entries_;
+  uint64_t hits_;
+  uint64_t misses_;
+  std::unordered_map<uint64_t, Entry> entries_;
+  mutable std::mutex mutex_;
+};
+
+}  // namespace patch_subset
+
+#endif  // PATCH_SUBSET_COMPRESSED_SIZE_CACHE_H_
@@ -0,0 +1,47 @@
+#include "patch_subset/compressed_size_cache.h"
+
+#include "gtest/gtest.h"
+
+namespace patch_subset {
+
+class CompressedSizeCacheTest : public ::testing::Test {};
+
+TEST_F(CompressedSizeCacheTest, GetAndPut) {
+  CompressedSizeCache cache(10);
+  uint32_t size = 0;
+  EXPECT_FALSE(cache.Get(1234, 100, &size));
+
+  cache.Put(1234, 100, 42);
+  EXPECT_TRUE(cache.Get(1234, 100, &size));
+  EXPECT_EQ(size, 42);
+
+  // Same checksum but a different payload size.
+  EXPECT_FALSE(cache.Get(1234, 101, &size));
+
+  EXPECT_EQ(cache.hits(), 1);
+  EXPECT_EQ(cache.misses(), 2);
+}
+
+TEST_F(CompressedSizeCacheTest, ClearedWhenFull) {
+  CompressedSizeCache cache(2);
+  uint32_t size = 0;
+  cache.Put(1, 10, 1);
+  cache.Put(2, 10, 2);
+  EXPECT_TRUE(cache.Get(1, 10, &size));
+  EXPECT_TRUE(cache.Get(2, 10, &size));
+
+  cache.Put(3, 10, 3);
+  EXPECT_FALSE(cache.Get(1, 10, &size));
+  EXPECT_FALSE(cache.Get(2, 10, &size));
+  EXPECT_TRUE(cache.Get(3, 10, &size));
+  EXPECT_EQ(size, 3);
+}
+
+TEST_F(CompressedSizeCacheTest, ZeroEntries) {
+  CompressedSizeCache cache(0);
+  uint32_t size = 0;
+  cache.Put(1, 10, 1);
+  EXPECT_FALSE(cache.Get(1, 10, &size));
+}
+
+}  // namespace patch_subset
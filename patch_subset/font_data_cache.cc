@@ -0,0 +1,79 @@
+#include "patch_subset/font_data_cache.h"
+
+#include <string>
+
+#include "patch_subset/font_data.h"
+
+namespace patch_subset {
+
+bool FontDataCache::Get(const std::string& key, FontData* out) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto it = index_.find(key);
+  if (it == index_.end()) {
+    misses_++;
+    return false;
+  }
+
+  hits_++;
+  entries_.splice(entries_.begin(), entries_, it->second);
+  const std::string& data = it->second->second;
+  out->copy(data.data(), data.size());
+  return true;
+}
+
+void FontDataCache::Put(const std::string& key, const FontData& data) {
+  size_t entry_size = key.size() + data.size();
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (entry_size > budget_bytes_) {
+    return;
+  }
+
+  auto it = index_.find(key);
+  if (it != index_.end()) {
+    size_bytes_ -= it->second->first.size() + it->second->second.size();
+    entries_.erase(it->second);
+    index_.erase(it);
+  }
+
+  entries_.emplace_front(key, std::string(data.data(), data.size()));
+  index_[key] = entries_.begin();
+  size_bytes_ += entry_size;
+  Evict();
+}
+
+void FontDataCache::Evict() {
+  while (size_bytes_ > budget_bytes_) {
+    const Entry& entry = entries_.back();
+    size_bytes_ -= entry.first.size() + entry.second.size();
+    index_.erase(entry.first);
+    entries_.pop_back();
+  }
+}
+
+void FontDataCache::SetBudget(size_t budget_bytes) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  budget_bytes_ = budget_bytes;
+  Evict();
+}
+
+size_t FontDataCache::budget_bytes() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return budget_bytes_;
+}
+
+uint64_t FontDataCache::hits() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return hits_;
+}
+
+uint64_t FontDataCache::misses() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return misses_;
+}
+
+size_t FontDataCache::size_bytes() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return size_bytes_;
+}
+
+}  // namespace patch_subset
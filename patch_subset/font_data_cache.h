@@ -0,0 +1,58 @@
+#ifndef PATCH_SUBSET_FONT_DATA_CACHE_H_
+#define PATCH_SUBSET_FONT_DATA_CACHE_H_
+
+#include <list>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <utility>
+
+#include "patch_subset/font_data.h"
+
+namespace patch_subset {
+
+// A least recently used cache of FontData's (for example font subsets or
+// patches) keyed by strings. The total size of the cached keys and data is
+// kept below a budget given in bytes. Safe to use from multiple threads.
+class FontDataCache {
+ public:
+  explicit FontDataCache(size_t budget_bytes)
+      : budget_bytes_(budget_bytes), size_bytes_(0), hits_(0), misses_(0) {}
+
+  FontDataCache(const FontDataCache&) = delete;
+  FontDataCache& operator=(const FontDataCache&) = delete;
+
+  // If key is in the cache copies its data into out and returns true.
+  bool Get(const std::string& key, FontData* out /* OUT */);
+
+  // Adds data to the cache under key, evicting the least recently used
+  // entries if needed. Data larger than the whole budget is not cached.
+  void Put(const std::string& key, const FontData& data);
+
+  // Changes the budget, evicting the least recently used entries if the
+  // cache no longer fits. A budget of 0 empties the cache and keeps it empty.
+  void SetBudget(size_t budget_bytes);
+
+  size_t budget_bytes() const;
+  uint64_t hits() const;
+  uint64_t misses() const;
+  size_t size_bytes() const;
+
+ private:
+  typedef std::pair<std::string, std::string> Entry;
+
+  void Evict();
+
+  size_t budget_bytes_;
+  size_t size_bytes_;
+  uint64_t hits_;
+  uint64_t misses_;
+  // Most recently used entries are at the front.
+  std::list<Entry> entries_;
+  std::unordered_map<std::string, std::list<Entry>::iterator> index_;
+  mutable std::mutex mutex_;
+};
+
+}  // namespace patch_subset
+
+#endif  // PATCH_SUBSET_FONT_DATA_CACHE_H_
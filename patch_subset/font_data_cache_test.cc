@@ -0,0 +1,83 @@
+#include "patch_subset/font_data_cache.h"
+
+#include "gtest/gtest.h"
+#include "patch_subset/font_data.h"
+
+namespace patch_subset {
+
+class FontDataCacheTest : public ::testing::Test {
+ protected:
+  FontDataCacheTest() : cache_(20) {}
+
+  FontDataCache cache_;
+};
+
+TEST_F(FontDataCacheTest, GetMissing) {
+  FontData out;
+  EXPECT_FALSE(cache_.Get("abc", &out));
+  EXPECT_TRUE(out.empty());
+  EXPECT_EQ(cache_.hits(), 0);
+  EXPECT_EQ(cache_.misses(), 1);
+}
+
+TEST_F(FontDataCacheTest, PutAndGet) {
+  cache_.Put("abc", FontData("12345"));
+
+  FontData out;
+  EXPECT_TRUE(cache_.Get("abc", &out));
+  EXPECT_EQ(out.str(), "12345");
+  EXPECT_EQ(cache_.hits(), 1);
+  EXPECT_EQ(cache_.misses(), 0);
+  EXPECT_EQ(cache_.size_bytes(), 8);
+}
+
+TEST_F(FontDataCacheTest, Replace) {
+  cache_.Put("abc", FontData("12345"));
+  cache_.Put("abc", FontData("6"));
+
+  FontData out;
+  EXPECT_TRUE(cache_.Get("abc", &out));
+  EXPECT_EQ(out.str(), "6");
+  EXPECT_EQ(cache_.size_bytes(), 4);
+}
+
+TEST_F(FontDataCacheTest, EvictsLeastRecentlyUsed) {
+  cache_.Put("a", FontData("123456"));
+  cache_.Put("b", FontData("123456"));
+
+  FontData out;
+  EXPECT_TRUE(cache_.Get("a", &out));
+
+  // Over budget, b is the least recently used.
+  cache_.Put("c", FontData("123456"));
+  EXPECT_EQ(cache_.size_bytes(), 14);
+  EXPECT_TRUE(cache_.Get("a", &out));
+  EXPECT_FALSE(cache_.Get("b", &out));
+  EXPECT_TRUE(cache_.Get("c", &out));
+}
+
+TEST_F(FontDataCacheTest, TooLargeForBudget) {
+  cache_.Put("a", FontData("123456789012345678901234567890"));
+
+  FontData out;
+  EXPECT_FALSE(cache_.Get("a", &out));
+  EXPECT_EQ(cache_.size_bytes(), 0);
+}
+
+TEST_F(FontDataCacheTest, SetBudget) {
+  cache_.Put("a", FontData("123456"));
+  cache_.Put("b", FontData("123456"));
+
+  cache_.SetBudget(10);
+  EXPECT_EQ(cache_.budget_bytes(), 10);
+  EXPECT_EQ(cache_.size_bytes(), 7);
+  FontData out;
+  EXPECT_FALSE(cache_.Get("a", &out));
+  EXPECT_TRUE(cache_.Get("b", &out));
+
+  cache_.SetBudget(0);
+  cache_.Put("c", FontData("1"));
+  EXPECT_EQ(cache_.size_bytes(), 0);
+}
+
+}  // namespace patch_subset
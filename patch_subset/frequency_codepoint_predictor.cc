@@ -5,6 +5,7 @@
 #include <filesystem>
 #include <fstream>
 #include <iterator>
+#include <utility>
 #include <vector>
 
 #include "absl/container/btree_map.h"
@@ -28,6 +29,12 @@ namespace patch_subset {
 static const char* kSlicingStrategyDataDirectory =
     "analysis/pfe_methods/unicode_range_data/";
 
+// Strategies are written as textprotos and may also be precompiled into
+// binary protos (see //tools:compile_slicing_strategies), which are much
+// faster to parse.
+static const char* kTextStrategyExtension = ".textproto";
+static const char* kBinaryStrategyExtension = ".pb";
+
 struct CodepointFreqCompare {
   bool operator()(const Codepoint* lhs, const Codepoint* rhs) const {
     if (lhs->count() == rhs->count()) {
@@ -45,7 +52,7 @@ StatusCode LoadStrategy(const std::string& path, SlicingStrategy* out) {
     return StatusCode::kOk;
   }
 
-  std::ifstream input(path);
+  std::ifstream input(path, std::ios::binary);
   std::string data;
 
   if (!input.is_open()) {
@@ -59,7 +66,11 @@ StatusCode LoadStrategy(const std::string& path, SlicingStrategy* out) {
   data.assign((std::istreambuf_iterator<char>(input)),
               std::istreambuf_iterator<char>());
 
-  if (!TextFormat::ParseFromString(data, out)) {
+  bool parsed =
+      std::filesystem::path(path).extension() == kBinaryStrategyExtension
+          ? out->ParseFromString(data)
+          : TextFormat::ParseFromString(data, out);
+  if (!parsed) {
     LOG(WARNING) << "Unable to parse strategy file: " << path;
     return StatusCode::kInternal;
   }
@@ -69,16 +80,44 @@ StatusCode LoadStrategy(const std::string& path, SlicingStrategy* out) {
   return StatusCode::kOk;
 }
 
+// Returns the file to load a strategy from given its text and binary files
+// (either may be empty). The binary file is used unless it is older than the
+// text file, in which case the text file was edited after it was compiled.
+static std::string StrategyPath(const std::filesystem::path& text_path,
+                                const std::filesystem::path& binary_path) {
+  if (binary_path.empty()) {
+    return text_path.string();
+  }
+  if (!text_path.empty() && std::filesystem::last_write_time(binary_path) <
+                                std::filesystem::last_write_time(text_path)) {
+    LOG(WARNING) << binary_path.string() << " is older than "
+                 << text_path.string() << ", using the textproto.";
+    return text_path.string();
+  }
+  return binary_path.string();
+}
+
 StatusCode LoadAllStrategies(const std::string& directory,
                              std::vector<SlicingStrategy>* strategies) {
+  // Strategy name to its text and binary files.
+  btree_map<std::string,
+            std::pair<std::filesystem::path, std::filesystem::path>>
+      files;
   for (const auto& entry : std::filesystem::directory_iterator(directory)) {
-    if (entry.path().extension() != std::filesystem::path(".textproto")) {
-      continue;
+    const auto& path = entry.path();
+    if (path.extension() == kTextStrategyExtension) {
+      files[path.stem().string()].first = path;
+    } else if (path.extension() == kBinaryStrategyExtension) {
+      files[path.stem().string()].second = path;
     }
+  }
 
+  for (const auto& name_and_files : files) {
     SlicingStrategy strategy;
     StatusCode result;
-    if ((result = LoadStrategy(entry.path(), &strategy)) != StatusCode::kOk) {
+    if ((result = LoadStrategy(StrategyPath(name_and_files.second.first,
+                                            name_and_files.second.second),
+                               &strategy)) != StatusCode::kOk) {
       return result;
     }
     strategies->push_back(strategy);
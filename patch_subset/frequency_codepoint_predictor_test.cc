@@ -1,5 +1,11 @@
 #include "patch_subset/frequency_codepoint_predictor.h"
 
+#include <google/protobuf/text_format.h>
+
+#include <chrono>
+#include <filesystem>
+#include <fstream>
+#include <iterator>
 #include <memory>
 
 #include "analysis/pfe_methods/unicode_range_data/slicing_strategy.pb.h"
@@ -10,6 +16,7 @@
 using analysis::pfe_methods::unicode_range_data::Codepoint;
 using analysis::pfe_methods::unicode_range_data::SlicingStrategy;
 using analysis::pfe_methods::unicode_range_data::Subset;
+using google::protobuf::TextFormat;
 
 namespace patch_subset {
 
@@ -94,4 +101,74 @@ TEST_F(FrequencyCodepointPredictorTest, PredictUseHighestCoverageStrategy) {
   EXPECT_TRUE(hb_set_is_equal(result.get(), expected.get()));
 }
 
+// Compiles the test strategies into binary protos in a new directory next to
+// copies of their textprotos. If stale_binary the binary protos are empty and
+// older than the textprotos, otherwise the textprotos are replaced with
+// invalid ones which are older than the binary protos.
+static std::filesystem::path WriteBinaryStrategies(const std::string& name,
+                                                   bool stale_binary) {
+  std::filesystem::path directory =
+      std::filesystem::path(::testing::TempDir()) / name;
+  std::filesystem::create_directories(directory);
+  for (const auto& entry : std::filesystem::directory_iterator(
+           "patch_subset/testdata/strategies/")) {
+    std::ifstream input(entry.path());
+    std::string text((std::istreambuf_iterator<char>(input)),
+                     std::istreambuf_iterator<char>());
+    SlicingStrategy strategy;
+    EXPECT_TRUE(TextFormat::ParseFromString(text, &strategy));
+
+    std::string stem = entry.path().stem().string();
+    std::filesystem::path binary_path = directory / (stem + ".pb");
+    std::filesystem::path text_path = directory / (stem + ".textproto");
+    {
+      std::ofstream binary(binary_path, std::ios::binary);
+      if (!stale_binary) {
+        EXPECT_TRUE(strategy.SerializeToOstream(&binary));
+      }
+      std::ofstream text_out(text_path);
+      text_out << (stale_binary ? text : "not a strategy");
+    }
+
+    auto now = std::filesystem::last_write_time(text_path);
+    auto older = now - std::chrono::hours(1);
+    std::filesystem::last_write_time(stale_binary ? binary_path : text_path,
+                                     older);
+  }
+  return directory;
+}
+
+static void ExpectPredictsFromTestStrategies(
+    const std::filesystem::path& directory) {
+  std::unique_ptr<CodepointPredictor> predictor(
+      FrequencyCodepointPredictor::Create(0.0f, directory.string()));
+  ASSERT_TRUE(predictor);
+
+  hb_set_unique_ptr font_codepoints =
+      make_hb_set_from_ranges(2, 65, 65, 85, 89);
+  hb_set_unique_ptr have_codepoints = make_hb_set();
+  hb_set_unique_ptr requested_codepoints = make_hb_set(2, 85, 86);
+  hb_set_unique_ptr result = make_hb_set();
+
+  predictor->Predict(font_codepoints.get(), have_codepoints.get(),
+                     requested_codepoints.get(), 2, result.get());
+
+  hb_set_unique_ptr expected = make_hb_set(2, 88, 89);
+  EXPECT_TRUE(hb_set_is_equal(result.get(), expected.get()));
+}
+
+TEST_F(FrequencyCodepointPredictorTest, BinaryStrategies) {
+  // The (invalid) textprotos are older than the binary protos, so they are
+  // ignored.
+  ExpectPredictsFromTestStrategies(
+      WriteBinaryStrategies("binary_strategies", false));
+}
+
+TEST_F(FrequencyCodepointPredictorTest, StaleBinaryStrategies) {
+  // The (empty) binary protos are older than the textprotos, so they are
+  // ignored.
+  ExpectPredictsFromTestStrategies(
+      WriteBinaryStrategies("stale_binary_strategies", true));
+}
+
 }  // namespace patch_subset
@@ -9,9 +9,14 @@ namespace patch_subset {
 
 StatusCode MemoryRequestLogger::LogRequest(const std::string& request_data,
                                            const std::string& response_data) {
+  return LogRequestSizes(request_data.size(), response_data.size());
+}
+
+StatusCode MemoryRequestLogger::LogRequestSizes(uint32_t request_size,
+                                                uint32_t response_size) {
   MemoryRequestLogger::Record record;
-  record.request_size = request_data.size();
-  record.response_size = response_data.size();
+  record.request_size = request_size;
+  record.response_size = response_size;
   records_.push_back(record);
   return StatusCode::kOk;
 }
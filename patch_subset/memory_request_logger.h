@@ -21,6 +21,9 @@ class MemoryRequestLogger : public RequestLogger {
   StatusCode LogRequest(const std::string& request_data,
                         const std::string& response_data) override;
 
+  // Logs a request whose data has already been reduced to its size.
+  StatusCode LogRequestSizes(uint32_t request_size, uint32_t response_size);
+
   const std::vector<Record>& Records() const;
 
  private:
@@ -2,6 +2,8 @@
 
 #include <stdio.h>
 
+#include <string>
+
 #include "absl/strings/string_view.h"
 #include "common/logging.h"
 #include "hb-subset.h"
@@ -78,8 +80,7 @@ StatusCode PatchSubsetServerImpl::Handle(const std::string& font_id,
 
   ValidatePatchBase(request.base_fingerprint(), &state);
 
-  if (!Check(result = binary_diff_->Diff(
-                 state.client_subset, state.client_target_subset, &state.patch),
+  if (!Check(result = ComputePatch(font_id, &state),
              "Diff computation failed (font_id = " + font_id + ").")) {
     return result;
   }
@@ -173,10 +174,85 @@ void PatchSubsetServerImpl::AddPredictedCodepoints(RequestState* state) const {
   hb_set_union(state->codepoints_needed.get(), additional_codepoints.get());
 }
 
+// Key for the subset of font_id to codepoints in the subset cache. Subsets
+// are fully determined by the font and the set of codepoints.
+static std::string SubsetKey(const std::string& font_id,
+                             const hb_set_t& codepoints) {
+  CompressedSetProto codepoints_proto;
+  CompressedSet::Encode(codepoints, &codepoints_proto);
+  return font_id + '\0' + codepoints_proto.SerializeAsString();
+}
+
+// Caches with a budget of 0 are skipped entirely so that disabled caches
+// don't cost a key computation or count misses.
+static bool CacheEnabled(const std::shared_ptr<FontDataCache>& cache) {
+  return cache && cache->budget_bytes() > 0;
+}
+
+StatusCode PatchSubsetServerImpl::Subset(const std::string& font_id,
+                                         const FontData& font_data,
+                                         const hb_set_t& codepoints,
+                                         FontData* subset) const {
+  std::string key;
+  bool use_cache = CacheEnabled(subset_cache_);
+  if (use_cache) {
+    key = SubsetKey(font_id, codepoints);
+    if (subset_cache_->Get(key, subset)) {
+      return StatusCode::kOk;
+    }
+  }
+
+  StatusCode result = subsetter_->Subset(font_data, codepoints, subset);
+  if (result == StatusCode::kOk && use_cache) {
+    subset_cache_->Put(key, *subset);
+  }
+  return result;
+}
+
+StatusCode PatchSubsetServerImpl::ComputePatch(const std::string& font_id,
+                                               RequestState* state) const {
+  std::string key;
+  bool use_cache = CacheEnabled(patch_cache_);
+  if (use_cache) {
+    // The base is either the subset for codepoints_have or, if the client's
+    // base didn't match, empty.
+    std::string base_key = state->client_subset.empty()
+                               ? std::string()
+                               : SubsetKey(font_id, *state->codepoints_have);
+    key = std::to_string(base_key.size()) + ':' + base_key +
+          SubsetKey(font_id, *state->codepoints_needed);
+    if (patch_cache_->Get(key, &state->patch)) {
+      return StatusCode::kOk;
+    }
+  }
+
+  StatusCode result = binary_diff_->Diff(
+      state->client_subset, state->client_target_subset, &state->patch);
+  if (result == StatusCode::kOk && use_cache) {
+    patch_cache_->Put(key, state->patch);
+  }
+  return result;
+}
+
+CacheStats PatchSubsetServerImpl::GetCacheStats() const {
+  CacheStats stats = {};
+  if (subset_cache_) {
+    stats.subset_hits = subset_cache_->hits();
+    stats.subset_misses = subset_cache_->misses();
+    stats.size_bytes += subset_cache_->size_bytes();
+  }
+  if (patch_cache_) {
+    stats.patch_hits = patch_cache_->hits();
+    stats.patch_misses = patch_cache_->misses();
+    stats.size_bytes += patch_cache_->size_bytes();
+  }
+  return stats;
+}
+
 StatusCode PatchSubsetServerImpl::ComputeSubsets(const std::string& font_id,
                                                  RequestState* state) const {
-  StatusCode result = subsetter_->Subset(
-      state->font_data, *state->codepoints_have, &state->client_subset);
+  StatusCode result = Subset(font_id, state->font_data, *state->codepoints_have,
+                             &state->client_subset);
   if (result != StatusCode::kOk) {
     LOG(WARNING) << "Subsetting for client_subset "
                  << "(font_id = " << font_id << ")"
@@ -184,8 +260,8 @@ StatusCode PatchSubsetServerImpl::ComputeSubsets(const std::string& font_id,
     return result;
   }
 
-  result = subsetter_->Subset(state->font_data, *state->codepoints_needed,
-                              &state->client_target_subset);
+  result = Subset(font_id, state->font_data, *state->codepoints_needed,
+                  &state->client_target_subset);
   if (result != StatusCode::kOk) {
     LOG(WARNING) << "Subsetting for client_target_subset "
                  << "(font_id = " << font_id << ")"
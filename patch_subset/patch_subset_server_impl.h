@@ -1,6 +1,7 @@
 #ifndef PATCH_SUBSET_PATCH_SUBSET_SERVER_IMPL_H_
 #define PATCH_SUBSET_PATCH_SUBSET_SERVER_IMPL_H_
 
+#include <memory>
 #include <string>
 
 #include "common/logging.h"
@@ -8,12 +9,14 @@
 #include "hb.h"
 #include "patch_subset/binary_diff.h"
 #include "patch_subset/brotli_binary_diff.h"
+#include "patch_subset/caching_font_provider.h"
 #include "patch_subset/codepoint_mapper.h"
 #include "patch_subset/codepoint_mapping_checksum.h"
 #include "patch_subset/codepoint_mapping_checksum_impl.h"
 #include "patch_subset/codepoint_predictor.h"
 #include "patch_subset/farm_hasher.h"
 #include "patch_subset/file_font_provider.h"
+#include "patch_subset/font_data_cache.h"
 #include "patch_subset/font_provider.h"
 #include "patch_subset/frequency_codepoint_predictor.h"
 #include "patch_subset/harfbuzz_subsetter.h"
@@ -28,6 +31,15 @@ namespace patch_subset {
 
 struct RequestState;
 
+// Counters for the subset and patch caches of a server.
+struct CacheStats {
+  uint64_t subset_hits = 0;
+  uint64_t subset_misses = 0;
+  uint64_t patch_hits = 0;
+  uint64_t patch_misses = 0;
+  uint64_t size_bytes = 0;
+};
+
 class ServerConfig {
  public:
   ServerConfig() {}
@@ -47,6 +59,12 @@ class ServerConfig {
   // remap codepoints
   bool remap_codepoints = false;
 
+  // Optional caches of computed subsets and patches. Entries are keyed by
+  // font id, so a cache may only be shared by servers which use the same
+  // font_directory. Caches with a budget of 0 are ignored.
+  std::shared_ptr<FontDataCache> subset_cache;
+  std::shared_ptr<FontDataCache> patch_cache;
+
   CodepointMapper* CreateCodepointMapper() const {
     if (remap_codepoints) {
       return new SimpleCodepointMapper();
@@ -95,25 +113,30 @@ class PatchSubsetServerImpl : public PatchSubsetServer {
     return std::unique_ptr<PatchSubsetServer>(new PatchSubsetServerImpl(
         config.max_predicted_codepoints,
         std::unique_ptr<FontProvider>(
-            new FileFontProvider(config.font_directory)),
+            new CachingFontProvider(std::unique_ptr<FontProvider>(
+                new FileFontProvider(config.font_directory)))),
         std::unique_ptr<Subsetter>(new HarfbuzzSubsetter()),
         std::unique_ptr<BinaryDiff>(new BrotliBinaryDiff()),
         std::unique_ptr<Hasher>(hasher),
         std::unique_ptr<CodepointMapper>(config.CreateCodepointMapper()),
         std::unique_ptr<CodepointMappingChecksum>(
             config.CreateMappingChecksum(hasher)),
-        std::unique_ptr<CodepointPredictor>(
-            config.CreateCodepointPredictor())));
+        std::unique_ptr<CodepointPredictor>(config.CreateCodepointPredictor()),
+        config.subset_cache, config.patch_cache));
   }
 
   // Takes ownership of font_provider, subsetter, and binary_diff.
+  // If subset_cache or patch_cache are set and have a non zero budget,
+  // computed subsets or patches are cached in them (see ServerConfig).
   PatchSubsetServerImpl(
       int max_predicted_codepoints, std::unique_ptr<FontProvider> font_provider,
       std::unique_ptr<Subsetter> subsetter,
       std::unique_ptr<BinaryDiff> binary_diff, std::unique_ptr<Hasher> hasher,
       std::unique_ptr<CodepointMapper> codepoint_mapper,
       std::unique_ptr<CodepointMappingChecksum> codepoint_mapping_checksum,
-      std::unique_ptr<CodepointPredictor> codepoint_predictor)
+      std::unique_ptr<CodepointPredictor> codepoint_predictor,
+      std::shared_ptr<FontDataCache> subset_cache = nullptr,
+      std::shared_ptr<FontDataCache> patch_cache = nullptr)
       : max_predicted_codepoints_(max_predicted_codepoints),
         font_provider_(std::move(font_provider)),
         subsetter_(std::move(subsetter)),
@@ -121,7 +144,9 @@ class PatchSubsetServerImpl : public PatchSubsetServer {
         hasher_(std::move(hasher)),
         codepoint_mapper_(std::move(codepoint_mapper)),
         codepoint_mapping_checksum_(std::move(codepoint_mapping_checksum)),
-        codepoint_predictor_(std::move(codepoint_predictor)) {}
+        codepoint_predictor_(std::move(codepoint_predictor)),
+        subset_cache_(std::move(subset_cache)),
+        patch_cache_(std::move(patch_cache)) {}
 
   // Handle a patch request from a client. Writes the resulting response
   // into response.
@@ -129,6 +154,9 @@ class PatchSubsetServerImpl : public PatchSubsetServer {
                     const PatchRequestProto& request,
                     PatchResponseProto* response /* OUT */) override;
 
+  // Returns the hit and miss counts of the subset and patch caches.
+  CacheStats GetCacheStats() const;
+
  private:
   void LoadInputCodepoints(const PatchRequestProto& request,
                            RequestState* state) const;
@@ -146,6 +174,13 @@ class PatchSubsetServerImpl : public PatchSubsetServer {
   StatusCode ComputeSubsets(const std::string& font_id,
                             RequestState* state) const;
 
+  StatusCode Subset(const std::string& font_id, const FontData& font_data,
+                    const hb_set_t& codepoints,
+                    FontData* subset /* OUT */) const;
+
+  StatusCode ComputePatch(const std::string& font_id,
+                          RequestState* state) const;
+
   void ValidatePatchBase(uint64_t base_fingerprint, RequestState* state) const;
 
   void ConstructResponse(const RequestState& state,
@@ -171,6 +206,8 @@ class PatchSubsetServerImpl : public PatchSubsetServer {
   std::unique_ptr<CodepointMapper> codepoint_mapper_;
   std::unique_ptr<CodepointMappingChecksum> codepoint_mapping_checksum_;
   std::unique_ptr<CodepointPredictor> codepoint_predictor_;
+  std::shared_ptr<FontDataCache> subset_cache_;
+  std::shared_ptr<FontDataCache> patch_cache_;
 };
 
 }  // namespace patch_subset
@@ -147,6 +147,26 @@ class PatchSubsetServerImplWithCodepointRemappingTest
   hb_set_unique_ptr set_ab_encoded_;
 };
 
+class PatchSubsetServerImplWithCacheTest
+    : public PatchSubsetServerImplTestBase {
+ protected:
+  PatchSubsetServerImplWithCacheTest()
+      : subset_cache_(std::make_shared<FontDataCache>(1024 * 1024)),
+        patch_cache_(std::make_shared<FontDataCache>(1024 * 1024)),
+        server_(50, std::unique_ptr<FontProvider>(font_provider_),
+                std::unique_ptr<Subsetter>(new FakeSubsetter()),
+                std::unique_ptr<BinaryDiff>(binary_diff_),
+                std::unique_ptr<Hasher>(hasher_),
+                std::unique_ptr<CodepointMapper>(nullptr),
+                std::unique_ptr<CodepointMappingChecksum>(nullptr),
+                std::unique_ptr<CodepointPredictor>(codepoint_predictor_),
+                subset_cache_, patch_cache_) {}
+
+  std::shared_ptr<FontDataCache> subset_cache_;
+  std::shared_ptr<FontDataCache> patch_cache_;
+  PatchSubsetServerImpl server_;
+};
+
 // TODO(garretrieger): subsetter failure test.
 
 TEST_F(PatchSubsetServerImplTest, NewRequest) {
@@ -376,4 +396,80 @@ TEST_F(PatchSubsetServerImplTest, NotFound) {
             StatusCode::kNotFound);
 }
 
+TEST_F(PatchSubsetServerImplWithCacheTest, CachesSubsetsAndPatches) {
+  EXPECT_CALL(*font_provider_, GetFont("Roboto-Regular.ttf", _))
+      .Times(2)
+      .WillRepeatedly(Invoke(returnFontId));
+  // The second request reuses the first request's patch.
+  ExpectDiff();
+  ExpectChecksum("Roboto-Regular.ttf", 42);
+  ExpectChecksum("Roboto-Regular.ttf:ab", 43);
+  ExpectChecksum("Roboto-Regular.ttf:abcd", 44);
+
+  PatchRequestProto request;
+  CompressedSet::Encode(*set_ab_, request.mutable_codepoints_have());
+  CompressedSet::Encode(*set_abcd_, request.mutable_codepoints_needed());
+  request.set_original_font_fingerprint(42);
+  request.set_base_fingerprint(43);
+
+  for (int i = 0; i < 2; i++) {
+    PatchResponseProto response;
+    EXPECT_EQ(server_.Handle("Roboto-Regular.ttf", request, &response),
+              StatusCode::kOk);
+    EXPECT_EQ(response.type(), ResponseType::PATCH);
+    EXPECT_EQ(response.patch().patch(),
+              "Roboto-Regular.ttf:abcd - Roboto-Regular.ttf:ab");
+    EXPECT_EQ(response.patch().patched_fingerprint(), 44);
+  }
+
+  CacheStats stats = server_.GetCacheStats();
+  EXPECT_EQ(stats.subset_hits, 2);
+  EXPECT_EQ(stats.subset_misses, 2);
+  EXPECT_EQ(stats.patch_hits, 1);
+  EXPECT_EQ(stats.patch_misses, 1);
+  EXPECT_GT(stats.size_bytes, 0);
+}
+
+TEST_F(PatchSubsetServerImplWithCacheTest, SkipsCachesWithoutBudget) {
+  subset_cache_->SetBudget(0);
+  patch_cache_->SetBudget(0);
+  EXPECT_CALL(*font_provider_, GetFont("Roboto-Regular.ttf", _))
+      .Times(2)
+      .WillRepeatedly(Invoke(returnFontId));
+  EXPECT_CALL(*binary_diff_, Diff(_, _, _))
+      .Times(2)
+      .WillRepeatedly(Invoke(diff));
+  ExpectChecksum("Roboto-Regular.ttf", 42);
+  ExpectChecksum("Roboto-Regular.ttf:ab", 43);
+  ExpectChecksum("Roboto-Regular.ttf:abcd", 44);
+
+  PatchRequestProto request;
+  CompressedSet::Encode(*set_ab_, request.mutable_codepoints_have());
+  CompressedSet::Encode(*set_abcd_, request.mutable_codepoints_needed());
+  request.set_original_font_fingerprint(42);
+  request.set_base_fingerprint(43);
+
+  for (int i = 0; i < 2; i++) {
+    PatchResponseProto response;
+    EXPECT_EQ(server_.Handle("Roboto-Regular.ttf", request, &response),
+              StatusCode::kOk);
+    EXPECT_EQ(response.patch().patch(),
+              "Roboto-Regular.ttf:abcd - Roboto-Regular.ttf:ab");
+  }
+
+  CacheStats stats = server_.GetCacheStats();
+  EXPECT_EQ(stats.subset_hits, 0);
+  EXPECT_EQ(stats.subset_misses, 0);
+  EXPECT_EQ(stats.patch_hits, 0);
+  EXPECT_EQ(stats.patch_misses, 0);
+  EXPECT_EQ(stats.size_bytes, 0);
+}
+
+TEST_F(PatchSubsetServerImplTest, NoCacheStatsWithoutCache) {
+  CacheStats stats = server_.GetCacheStats();
+  EXPECT_EQ(stats.subset_hits, 0);
+  EXPECT_EQ(stats.subset_misses, 0);
+  EXPECT_EQ(stats.size_bytes, 0);
+}
+
 }  // namespace patch_subset
@@ -7,6 +7,7 @@ the client applies to their copy of the font.
 This is a python wrapper around a C++ implementation. Uses python ctypes to
 interface with the C++ code.
 """
+import array
 import collections
 from ctypes import byref
 from ctypes import c_bool
@@ -14,10 +15,13 @@ from ctypes import c_char_p
 from ctypes import c_int32
 from ctypes import c_float
 from ctypes import c_uint32
+from ctypes import c_uint64
 from ctypes import c_ubyte
 from ctypes import c_void_p
 from ctypes import cdll
 from ctypes import POINTER
+from ctypes import sizeof
+from ctypes import string_at
 from ctypes import Structure
 
 from analysis import network_models
@@ -31,22 +35,72 @@ class RECORD(Structure):
   _fields_ = [("request_size", c_uint32), ("response_size", c_uint32)]
 
 
+class CACHE_STATS(Structure):  # pylint: disable=invalid-name
+  _fields_ = [("subset_hits", c_uint64), ("subset_misses", c_uint64),
+              ("patch_hits", c_uint64), ("patch_misses", c_uint64),
+              ("size_bytes", c_uint64)]
+
+
 new_session = patch_subset.PatchSubsetSession_new  # pylint: disable=invalid-name
 new_session.restype = c_void_p
 extend = patch_subset.PatchSubsetSession_extend  # pylint: disable=invalid-name
 extend.restype = c_bool
+extend_batch = patch_subset.PatchSubsetSession_extend_batch  # pylint: disable=invalid-name
+extend_batch.restype = c_bool
 get_font_bytes = patch_subset.PatchSubsetSession_get_font  # pylint: disable=invalid-name
 get_font_bytes.restype = POINTER(c_ubyte)
-get_requests = patch_subset.PatchSubsetSession_get_requests  # pylint: disable=invalid-name
-get_requests.restype = POINTER(RECORD)
+get_requests_since = patch_subset.PatchSubsetSession_get_requests_since  # pylint: disable=invalid-name
+get_requests_since.restype = POINTER(RECORD)
+set_request_compression_c = patch_subset.PatchSubsetSession_set_request_compression  # pylint: disable=invalid-name
+set_request_compression_c.restype = None
+set_cache_budget_c = patch_subset.PatchSubsetSession_set_cache_budget  # pylint: disable=invalid-name
+set_cache_budget_c.restype = None
+get_cache_stats = patch_subset.PatchSubsetSession_get_cache_stats  # pylint: disable=invalid-name
+get_cache_stats.restype = None
+
+# How request and response sizes are measured, see set_request_compression().
+REQUEST_COMPRESSION_EXACT = 0
+REQUEST_COMPRESSION_FAST = 1
 
 Record = collections.namedtuple("Record", ["request_size", "response_size"])
+CacheStats = collections.namedtuple("CacheStats", [
+    "subset_hits", "subset_misses", "patch_hits", "patch_misses", "size_bytes"
+])
 Config = collections.namedtuple("Config", [
     "remap_codepoints", "max_predicted_codepoints",
     "prediction_frequency_threshold"
 ])
 
 
+def set_request_compression(mode):
+  """Sets how sessions started after this call measure request sizes.
+
+  With REQUEST_COMPRESSION_EXACT (the default) requests and responses are
+  compressed at the same brotli quality as patches. REQUEST_COMPRESSION_FAST
+  uses a much lower quality, which is faster but only approximates the sizes.
+  """
+  set_request_compression_c(c_int32(mode))
+
+
+def set_cache_budget(num_bytes):
+  """Sets the memory budget of the server side subset and patch caches.
+
+  The caches are shared by all sessions for a font directory and each of them
+  is limited to num_bytes, including caches which already exist. 0 disables
+  caching.
+  """
+  set_cache_budget_c(c_uint64(num_bytes))
+
+
+def cache_stats():
+  """Returns the combined CacheStats of all subset and patch caches."""
+  stats_c = CACHE_STATS()
+  get_cache_stats(byref(stats_c))
+  return CacheStats(stats_c.subset_hits, stats_c.subset_misses,
+                    stats_c.patch_hits, stats_c.patch_misses,
+                    stats_c.size_bytes)
+
+
 def create_with_codepoint_remapping():
   return PatchSubsetMethod(Config(True, 0, 0.0))
 
@@ -111,7 +165,7 @@ class FontSession:
                     c_float(config.prediction_frequency_threshold)))
     self.delete_session = patch_subset.PatchSubsetSession_delete
     self.records_by_view = [[]] * page_view_count
-    self.last_record_index = None
+    self.record_count = 0
     self.page_view_count = page_view_count
 
   def __del__(self):
@@ -132,34 +186,76 @@ class FontSession:
     codepoints is a list of integer unicode codepoints. Records any
     resulting requests needed to make the extension.
     """
-    codepoint_array_c = (c_uint32 * len(codepoints))()
-    for idx, codepoint in enumerate(codepoints):
-      codepoint_array_c[idx] = codepoint
+    codepoint_array_c = (c_uint32 * len(codepoints))(*codepoints)
 
     if not extend(self.session, codepoint_array_c, c_uint32(len(codepoints))):
       raise PatchSubsetError("Patch subset extend call failed.")
 
     self.records_by_view[self.page_view_count - 1] = self.get_new_records()
-    self.last_record_index = len(self.get_records()) - 1
+
+  def extend_batch(self, view_indices, codepoints_by_view):
+    """Extends the tracked font once for each of several page views.
+
+    codepoints_by_view[i] is the list of codepoints needed by page view
+    view_indices[i]. All of the extensions are made with a single call into
+    the C++ code. Records the resulting requests for each page view.
+    """
+    codepoints = []
+    offsets = [0]
+    for view_codepoints in codepoints_by_view:
+      codepoints.extend(view_codepoints)
+      offsets.append(len(codepoints))
+
+    codepoints_c = (c_uint32 * len(codepoints))(*codepoints)
+    offsets_c = (c_uint32 * len(offsets))(*offsets)
+    record_counts_c = (c_uint32 * len(view_indices))()
+    if not extend_batch(self.session, codepoints_c, offsets_c,
+                        c_uint32(len(view_indices)), record_counts_c):
+      raise PatchSubsetError("Patch subset extend call failed.")
+
+    new_records = self.get_new_records()
+    start = 0
+    for view_index, record_count in zip(view_indices, record_counts_c):
+      self.records_by_view[view_index] = new_records[start:start + record_count]
+      start += record_count
 
   def get_font_bytes(self):
+    """Returns a copy of the current client font."""
     size_c = c_uint32()
     bytes_c = get_font_bytes(self.session, byref(size_c))
-    return bytes(bytes_c[i] for i in range(size_c.value))
+    # The C++ buffer is replaced by each extend so it's copied (a single
+    # memcpy) rather than exposed directly.
+    return string_at(bytes_c, size_c.value)
 
   def get_new_records(self):
-    if self.last_record_index is None:
-      return self.get_records()
-
-    return self.get_records()[self.last_record_index + 1:]
+    """Returns the records added since the last call to this method."""
+    records = self.get_records_since(self.record_count)
+    self.record_count += len(records)
+    return records
 
   def get_records(self):
+    return self.get_records_since(0)
+
+  def get_records_since(self, start_index):
+    """Returns the records after the first start_index records.
+
+    Only the requested records are copied out of the C++ session.
+    """
     size_c = c_uint32()
-    record_array_c = get_requests(self.session, byref(size_c))
-    return [
-        Record(record_array_c[i].request_size, record_array_c[i].response_size)
-        for i in range(size_c.value)
-    ]
+    record_array_c = get_requests_since(self.session, c_uint32(start_index),
+                                        byref(size_c))
+    return to_records(record_array_c, size_c.value)
+
+
+def to_records(record_array_c, count):
+  """Converts a C array of count RECORD's into a list of Record's."""
+  if not count:
+    return []
+
+  # RECORD is two uint32's, copy them all at once.
+  sizes = array.array("I")
+  sizes.frombytes(string_at(record_array_c, count * sizeof(RECORD)))
+  return list(map(Record, sizes[0::2], sizes[1::2]))
 
 
 def to_request_graph(records):
@@ -207,6 +303,34 @@ class PatchSubsetPfeSession:
 
       self.sessions_by_font[font_id].extend(usage.codepoints)
 
+  def page_views(self, usages_by_font):
+    """Processes a sequence of page views.
+
+    Equivalent to calling page_view() with each element of usages_by_font,
+    but each font is extended for all of the page views with a single call
+    into the C++ code. Fonts are extended independently of each other so
+    this produces the same requests.
+    """
+    views_by_font = collections.defaultdict(list)
+    for usage_by_font in usages_by_font:
+      self.page_view_count += 1
+      for session in self.sessions_by_font.values():
+        session.page_viewed()
+
+      for font_id, usage in usage_by_font.items():
+        views_by_font[font_id].append(
+            (self.page_view_count - 1, usage.codepoints))
+
+    for font_id, views in views_by_font.items():
+      if font_id not in self.sessions_by_font:
+        self.sessions_by_font[font_id] = FontSession(self.font_loader, font_id,
+                                                     self.page_view_count,
+                                                     self.config)
+
+      view_indices, codepoints_by_view = zip(*views)
+      self.sessions_by_font[font_id].extend_batch(view_indices,
+                                                  codepoints_by_view)
+
   def get_request_graphs(self):
     """Returns a graph of requests that would have resulted from the page views.
 
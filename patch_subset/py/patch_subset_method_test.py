@@ -117,6 +117,78 @@ class PatchSubsetMethodTest(unittest.TestCase):
       self.assertEqual(self.session.get_font_bytes("Roboto-Regular.ttf"),
                        roboto_subset_bytes)
 
+  def test_get_records_since(self):
+    self.session.page_view({"Roboto-Regular.ttf": u([0x61, 0x62])})
+    self.session.page_view({"Roboto-Regular.ttf": u([0x61, 0x62, 0x63, 0x64])})
+    font_session = self.session.sessions_by_font["Roboto-Regular.ttf"]
+
+    records = font_session.get_records()
+    self.assertEqual(len(records), 2)
+    self.assertGreater(records[1].response_size, 0)
+    self.assertEqual(font_session.get_records_since(1), records[1:])
+    self.assertEqual(font_session.get_records_since(2), [])
+    self.assertEqual(font_session.get_records_since(5), [])
+    self.assertEqual(font_session.get_new_records(), [])
+
+  def test_page_views(self):
+    batch_session = patch_subset_method.create_without_codepoint_remapping(
+    ).start_session(None, font_loader.FontLoader("./patch_subset/testdata/"))
+    usages = [
+        {
+            "Roboto-Regular.ttf": u([0x61, 0x62])
+        },
+        {
+            "Roboto-Regular.Awesome.ttf": u([0x41])
+        },
+        {
+            "Roboto-Regular.ttf": u([0x61, 0x62, 0x63, 0x64]),
+            "Roboto-Regular.Awesome.ttf": u([0x42])
+        },
+    ]
+    for usage in usages:
+      self.session.page_view(usage)
+    batch_session.page_views(usages)
+
+    graphs = self.session.get_request_graphs()
+    batch_graphs = batch_session.get_request_graphs()
+    self.assertEqual(len(batch_graphs), 3)
+    self.assertEqual([graph.length() for graph in batch_graphs], [1, 1, 2])
+    for graph, batch_graph in zip(graphs, batch_graphs):
+      self.assertEqual(batch_graph.total_request_bytes(),
+                       graph.total_request_bytes())
+      self.assertEqual(batch_graph.total_response_bytes(),
+                       graph.total_response_bytes())
+    self.assertEqual(batch_session.get_font_bytes("Roboto-Regular.ttf"),
+                     self.session.get_font_bytes("Roboto-Regular.ttf"))
+
+  def test_page_views_font_not_found(self):
+    with self.assertRaises(patch_subset_method.PatchSubsetError):
+      self.session.page_views([{"Roboto-Bold.ttf": u([0x61, 0x62])}])
+
+  def test_cache(self):
+    # Servers are only created on the first page view, so keep the budget
+    # set until after the page views.
+    patch_subset_method.set_cache_budget(1024 * 1024)
+    try:
+      sessions = [
+          patch_subset_method.create_without_codepoint_remapping().
+          start_session(None, font_loader.FontLoader("patch_subset/testdata"))
+          for _ in range(2)
+      ]
+      before = patch_subset_method.cache_stats()
+      for session in sessions:
+        session.page_view({"Roboto-Regular.ttf": u([0x61, 0x62])})
+        session.page_view({"Roboto-Regular.ttf": u([0x61, 0x62, 0x63, 0x64])})
+      after = patch_subset_method.cache_stats()
+    finally:
+      patch_subset_method.set_cache_budget(0)
+
+    self.assertEqual(sessions[0].get_font_bytes("Roboto-Regular.ttf"),
+                     sessions[1].get_font_bytes("Roboto-Regular.ttf"))
+    self.assertGreater(after.subset_hits, before.subset_hits)
+    self.assertGreater(after.patch_hits, before.patch_hits)
+    self.assertGreater(after.size_bytes, 0)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -3,14 +3,21 @@
  * Needed in order to have python create and interact with
  * patch subset clients.
  */
+#include <map>
+#include <memory>
+#include <mutex>
 #include <string>
+#include <tuple>
+#include <utility>
 
 #include "common/status.h"
 #include "hb.h"
 #include "patch_subset/brotli_binary_patch.h"
 #include "patch_subset/brotli_request_logger.h"
+#include "patch_subset/compressed_size_cache.h"
 #include "patch_subset/farm_hasher.h"
 #include "patch_subset/file_font_provider.h"
+#include "patch_subset/font_data_cache.h"
 #include "patch_subset/font_provider.h"
 #include "patch_subset/memory_request_logger.h"
 #include "patch_subset/patch_subset.pb.h"
@@ -21,28 +28,122 @@
 using ::patch_subset::BinaryPatch;
 using ::patch_subset::BrotliBinaryPatch;
 using ::patch_subset::BrotliRequestLogger;
+using ::patch_subset::CacheStats;
 using ::patch_subset::ClientState;
 using ::patch_subset::CodepointMapper;
 using ::patch_subset::CodepointMappingChecksum;
+using ::patch_subset::CompressedSizeCache;
 using ::patch_subset::FarmHasher;
 using ::patch_subset::FileFontProvider;
+using ::patch_subset::FontDataCache;
 using ::patch_subset::FontProvider;
 using ::patch_subset::Hasher;
 using ::patch_subset::MemoryRequestLogger;
 using ::patch_subset::PatchSubsetClient;
 using ::patch_subset::PatchSubsetServer;
 using ::patch_subset::PatchSubsetServerImpl;
+using ::patch_subset::RequestCompression;
 using ::patch_subset::ServerConfig;
 using ::patch_subset::StatusCode;
 using ::patch_subset::Subsetter;
 
+// Servers don't keep any per client state, so a single server (and the fonts
+// and codepoint predictor data it loads) is shared by every session with the
+// same config. Servers live until the process exits.
+//
+// Subsets and patches only depend on the font and the requested codepoints,
+// so all servers for a font directory share one subset cache and one patch
+// cache.
+class ServerPool {
+ public:
+  static ServerPool* Instance() {
+    static ServerPool* pool = new ServerPool();
+    return pool;
+  }
+
+  PatchSubsetServer* ServerFor(ServerConfig config) {
+    Key key(config.font_directory, config.unicode_data_directory,
+            config.max_predicted_codepoints,
+            config.prediction_frequency_threshold, config.remap_codepoints);
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = servers_.find(key);
+    if (it != servers_.end()) {
+      return it->second.get();
+    }
+
+    Caches& caches = caches_[config.font_directory];
+    if (!caches.first) {
+      caches.first = std::make_shared<FontDataCache>(cache_budget_bytes_);
+      caches.second = std::make_shared<FontDataCache>(cache_budget_bytes_);
+    }
+    config.subset_cache = caches.first;
+    config.patch_cache = caches.second;
+    return servers_.emplace(key, PatchSubsetServerImpl::CreateServer(config))
+        .first->second.get();
+  }
+
+  // Sets the budget of every subset and patch cache, including ones which
+  // already exist. 0 disables caching.
+  void SetCacheBudget(size_t budget_bytes) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    cache_budget_bytes_ = budget_bytes;
+    for (const auto& entry : caches_) {
+      entry.second.first->SetBudget(budget_bytes);
+      entry.second.second->SetBudget(budget_bytes);
+    }
+  }
+
+  CacheStats GetCacheStats() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    CacheStats stats;
+    for (const auto& entry : caches_) {
+      const Caches& caches = entry.second;
+      stats.subset_hits += caches.first->hits();
+      stats.subset_misses += caches.first->misses();
+      stats.patch_hits += caches.second->hits();
+      stats.patch_misses += caches.second->misses();
+      stats.size_bytes +=
+          caches.first->size_bytes() + caches.second->size_bytes();
+    }
+    return stats;
+  }
+
+ private:
+  typedef std::tuple<std::string, std::string, int, float, bool> Key;
+  // Subset cache and patch cache.
+  typedef std::pair<std::shared_ptr<FontDataCache>,
+                    std::shared_ptr<FontDataCache>>
+      Caches;
+
+  std::mutex mutex_;
+  std::map<Key, std::unique_ptr<PatchSubsetServer>> servers_;
+  std::map<std::string, Caches> caches_;
+  size_t cache_budget_bytes_ = 0;
+};
+
+// How sessions created from now on measure request and response sizes.
+static RequestCompression request_compression = RequestCompression::kExact;
+
+// The compressed sizes of requests and responses are shared by all sessions
+// which measure them the same way.
+static CompressedSizeCache* SizeCacheFor(RequestCompression compression) {
+  static const size_t kMaxCachedSizes = 1 << 20;
+  static CompressedSizeCache* exact_cache =
+      new CompressedSizeCache(kMaxCachedSizes);
+  static CompressedSizeCache* fast_cache =
+      new CompressedSizeCache(kMaxCachedSizes);
+  return compression == RequestCompression::kFast ? fast_cache : exact_cache;
+}
+
 class PatchSubsetSession {
  public:
-  PatchSubsetSession(const ServerConfig& config, const std::string& font_id)
+  PatchSubsetSession(const ServerConfig& config, const std::string& font_id,
+                     RequestCompression compression)
       : binary_patch_(new BrotliBinaryPatch()),
-        brotli_request_logger_(&request_logger_),
-        server_(std::move(PatchSubsetServerImpl::CreateServer(config))),
-        client_(server_.get(), &brotli_request_logger_,
+        brotli_request_logger_(&request_logger_, compression,
+                               SizeCacheFor(compression)),
+        client_(ServerPool::Instance()->ServerFor(config),
+                &brotli_request_logger_,
                 std::unique_ptr<BinaryPatch>(binary_patch_),
                 std::unique_ptr<Hasher>(new FarmHasher())) {
     client_state_.set_font_id(font_id);
@@ -52,6 +153,16 @@ class PatchSubsetSession {
     return client_.Extend(codepoints, &client_state_);
   }
 
+  StatusCode Extend(const uint32_t* codepoints, uint32_t codepoints_count) {
+    hb_set_t* codepoints_set = hb_set_create();
+    for (uint32_t i = 0; i < codepoints_count; i++) {
+      hb_set_add(codepoints_set, codepoints[i]);
+    }
+    StatusCode result = Extend(*codepoints_set);
+    hb_set_destroy(codepoints_set);
+    return result;
+  }
+
   const std::string& ClientFontData() const {
     return client_state_.font_data();
   }
@@ -63,7 +174,6 @@ class PatchSubsetSession {
   BinaryPatch* binary_patch_;
   MemoryRequestLogger request_logger_;
   BrotliRequestLogger brotli_request_logger_;
-  std::unique_ptr<PatchSubsetServer> server_;
   PatchSubsetClient client_;
   ClientState client_state_;
 };
@@ -83,7 +193,7 @@ PatchSubsetSession* PatchSubsetSession_new(
   config.max_predicted_codepoints = max_predicted_codepoints;
   config.prediction_frequency_threshold = prediction_frequency_threshold;
 
-  return new PatchSubsetSession(config, font_id);
+  return new PatchSubsetSession(config, font_id, request_compression);
 }
 
 void PatchSubsetSession_delete(PatchSubsetSession* session) { delete session; }
@@ -91,13 +201,23 @@ void PatchSubsetSession_delete(PatchSubsetSession* session) { delete session; }
 bool PatchSubsetSession_extend(PatchSubsetSession* session,
                                uint32_t* codepoints,
                                uint32_t codepoints_count) {
-  hb_set_t* codepoints_set = hb_set_create();
-  for (uint32_t i = 0; i < codepoints_count; i++) {
-    hb_set_add(codepoints_set, codepoints[i]);
+  return session->Extend(codepoints, codepoints_count) == StatusCode::kOk;
+}
+
+bool PatchSubsetSession_extend_batch(PatchSubsetSession* session,
+                                     uint32_t* codepoints, uint32_t* offsets,
+                                     uint32_t extend_count,
+                                     uint32_t* record_counts) {
+  for (uint32_t i = 0; i < extend_count; i++) {
+    uint32_t records_before = session->GetRecords().size();
+    StatusCode result =
+        session->Extend(codepoints + offsets[i], offsets[i + 1] - offsets[i]);
+    if (result != StatusCode::kOk) {
+      return false;
+    }
+    record_counts[i] = session->GetRecords().size() - records_before;
   }
-  StatusCode result = session->Extend(*codepoints_set);
-  hb_set_destroy(codepoints_set);
-  return result == StatusCode::kOk;
+  return true;
 }
 
 const char* PatchSubsetSession_get_font(PatchSubsetSession* session,
@@ -111,4 +231,36 @@ const MemoryRequestLogger::Record* PatchSubsetSession_get_requests(
   *size = session->GetRecords().size();
   return session->GetRecords().data();
 }
+
+// Returns the records logged after the first start_index records. size is
+// set to the number of records returned.
+const MemoryRequestLogger::Record* PatchSubsetSession_get_requests_since(
+    PatchSubsetSession* session, uint32_t start_index, uint32_t* size) {
+  const std::vector<MemoryRequestLogger::Record>& records =
+      session->GetRecords();
+  if (start_index >= records.size()) {
+    *size = 0;
+    return nullptr;
+  }
+  *size = records.size() - start_index;
+  return records.data() + start_index;
+}
+
+// Sets the memory budget in bytes of each subset and patch cache, including
+// caches which already exist. Caches are created per font directory when the
+// first session for it is created. 0 (the default) disables caching.
+void PatchSubsetSession_set_cache_budget(uint64_t budget_bytes) {
+  ServerPool::Instance()->SetCacheBudget(budget_bytes);
+}
+
+// Writes the combined counters of all subset and patch caches to stats.
+void PatchSubsetSession_get_cache_stats(CacheStats* stats) {
+  *stats = ServerPool::Instance()->GetCacheStats();
+}
+
+// Sets how sessions created after this call measure the size of requests
+// and responses. mode is a RequestCompression value (0 exact, 1 fast).
+void PatchSubsetSession_set_request_compression(int32_t mode) {
+  request_compression = static_cast<RequestCompression>(mode);
+}
 }
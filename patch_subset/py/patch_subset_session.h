@@ -15,6 +15,15 @@ PatchSubsetSession* PatchSubsetSession_new(
 bool PatchSubsetSession_extend(PatchSubsetSession* session,
                                uint32_t* codepoints, uint32_t codepoints_count);
 
+// Runs extend_count extends in order. The codepoints for extend i are
+// codepoints[offsets[i]] to codepoints[offsets[i + 1] - 1], so offsets must
+// have extend_count + 1 entries. The number of requests made by extend i is
+// written to record_counts[i]. Returns false if any of the extends fails.
+bool PatchSubsetSession_extend_batch(PatchSubsetSession* session,
+                                     uint32_t* codepoints, uint32_t* offsets,
+                                     uint32_t extend_count,
+                                     uint32_t* record_counts);
+
 void PatchSubsetSession_delete(PatchSubsetSession* session);
 
 const char* PatchSubsetSession_get_font(PatchSubsetSession* session,
@@ -1,5 +1,7 @@
 #include "patch_subset/py/patch_subset_session.h"
 
+#include <string>
+
 #include "gtest/gtest.h"
 
 class PatchSubsetSessionTest : public ::testing::Test {
@@ -22,3 +24,78 @@ TEST_F(PatchSubsetSessionTest, SessionWithRemap) {
 
   PatchSubsetSession_delete(session);
 }
+
+TEST_F(PatchSubsetSessionTest, ExtendBatch) {
+  PatchSubsetSession* session = PatchSubsetSession_new(
+      "./patch_subset/testdata/", "Roboto-Regular.ttf", true, 0, 0.0f);
+  PatchSubsetSession* batch_session = PatchSubsetSession_new(
+      "./patch_subset/testdata/", "Roboto-Regular.ttf", true, 0, 0.0f);
+
+  uint32_t codepoints_1[2] = {0x61, 0x62};
+  EXPECT_TRUE(PatchSubsetSession_extend(session, codepoints_1, 2));
+  uint32_t codepoints_2[4] = {0x61, 0x62, 0x63, 0x64};
+  EXPECT_TRUE(PatchSubsetSession_extend(session, codepoints_2, 4));
+  uint32_t codepoints_3[1] = {0xAFFF};
+  EXPECT_TRUE(PatchSubsetSession_extend(session, codepoints_3, 1));
+
+  uint32_t codepoints[7] = {0x61, 0x62, 0x61, 0x62, 0x63, 0x64, 0xAFFF};
+  uint32_t offsets[4] = {0, 2, 6, 7};
+  uint32_t record_counts[3];
+  EXPECT_TRUE(PatchSubsetSession_extend_batch(batch_session, codepoints,
+                                              offsets, 3, record_counts));
+  EXPECT_EQ(record_counts[0], 1);
+  EXPECT_EQ(record_counts[1], 1);
+  EXPECT_EQ(record_counts[2], 0);
+
+  uint32_t size;
+  const char* font_data = PatchSubsetSession_get_font(session, &size);
+  std::string font(font_data, size);
+  uint32_t batch_size;
+  const char* batch_font_data =
+      PatchSubsetSession_get_font(batch_session, &batch_size);
+  std::string batch_font(batch_font_data, batch_size);
+  EXPECT_EQ(font, batch_font);
+
+  PatchSubsetSession_delete(session);
+  PatchSubsetSession_delete(batch_session);
+}
+
+TEST_F(PatchSubsetSessionTest, ExtendBatchFontNotFound) {
+  PatchSubsetSession* session = PatchSubsetSession_new(
+      "./patch_subset/testdata/", "Roboto-Bold.ttf", true, 0, 0.0f);
+
+  uint32_t codepoints[2] = {0x61, 0x62};
+  uint32_t offsets[2] = {0, 2};
+  uint32_t record_counts[1];
+  EXPECT_FALSE(PatchSubsetSession_extend_batch(session, codepoints, offsets, 1,
+                                               record_counts));
+
+  PatchSubsetSession_delete(session);
+}
+
+TEST_F(PatchSubsetSessionTest, SessionsShareServerButNotClientState) {
+  PatchSubsetSession* session_1 = PatchSubsetSession_new(
+      "./patch_subset/testdata/", "Roboto-Regular.ttf", true, 0, 0.0f);
+  PatchSubsetSession* session_2 = PatchSubsetSession_new(
+      "./patch_subset/testdata/", "Roboto-Regular.ttf", true, 0, 0.0f);
+
+  uint32_t codepoints_1[4] = {0x61, 0x62, 0x63, 0x64};
+  EXPECT_TRUE(PatchSubsetSession_extend(session_1, codepoints_1, 4));
+  uint32_t codepoints_2[2] = {0x61, 0x62};
+  EXPECT_TRUE(PatchSubsetSession_extend(session_2, codepoints_2, 2));
+
+  uint32_t size_1;
+  uint32_t size_2;
+  PatchSubsetSession_get_font(session_1, &size_1);
+  PatchSubsetSession_get_font(session_2, &size_2);
+  EXPECT_GT(size_1, size_2);
+
+  PatchSubsetSession_delete(session_1);
+
+  // Deleting a session leaves the shared server usable by the others.
+  EXPECT_TRUE(PatchSubsetSession_extend(session_2, codepoints_1, 4));
+  PatchSubsetSession_get_font(session_2, &size_2);
+  EXPECT_EQ(size_1, size_2);
+
+  PatchSubsetSession_delete(session_2);
+}
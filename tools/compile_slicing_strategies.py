@@ -0,0 +1,44 @@
+"""Compiles slicing strategy textprotos into binary protos.
+
+Binary protos are much faster to parse than the text format, which matters
+for the large CJK strategies. The python and C++ slicing strategy loaders
+use a compiled strategy in place of its textproto when one is present.
+
+Usage:
+  compile_slicing_strategies --output_directory=<dir> <strategy.textproto>...
+"""
+
+import os
+
+from google.protobuf import text_format
+from absl import app
+from absl import flags
+from analysis.pfe_methods.unicode_range_data import slicing_strategy_pb2
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("output_directory", None,
+                    "Directory to write the compiled strategies to.")
+
+
+def compile_strategy(textproto_path, output_directory):
+  """Compiles a single strategy. Returns the path of the binary proto."""
+  strategy = slicing_strategy_pb2.SlicingStrategy()
+  with open(textproto_path, "r", encoding="utf8") as strategy_file:
+    text_format.Merge(strategy_file.read(), strategy)
+
+  name = os.path.splitext(os.path.basename(textproto_path))[0]
+  output_path = os.path.join(output_directory, "%s.pb" % name)
+  with open(output_path, "wb") as output_file:
+    output_file.write(strategy.SerializeToString())
+  return output_path
+
+
+def main(argv):
+  for textproto_path in argv[1:]:
+    compile_strategy(textproto_path, FLAGS.output_directory)
+
+
+if __name__ == '__main__':
+  flags.mark_flag_as_required("output_directory")
+  app.run(main)
@@ -0,0 +1,63 @@
+"""Unit tests for the compile_slicing_strategies tool."""
+
+import os
+import shutil
+from unittest import mock
+
+from absl.testing import absltest
+from analysis.pfe_methods.unicode_range_data import slicing_strategy_loader
+from tools import compile_slicing_strategies
+
+STRATEGY_DIR = "patch_subset/testdata/strategies"
+
+
+class CompileSlicingStrategiesTest(absltest.TestCase):
+
+  def test_compile_strategy(self):
+    output_directory = self.create_tempdir().full_path
+    textproto_path = os.path.join(STRATEGY_DIR, "a.textproto")
+    output_path = compile_slicing_strategies.compile_strategy(
+        textproto_path, output_directory)
+
+    self.assertEqual(output_path, os.path.join(output_directory, "a.pb"))
+    self.assertEqual(slicing_strategy_loader.read_strategy_file(output_path),
+                     slicing_strategy_loader.read_strategy_file(textproto_path))
+
+  def compile_with_times(self, output_directory, text_mtime, binary_mtime):
+    """Compiles a.textproto into output_directory and sets the file mtimes."""
+    text_path = os.path.join(output_directory, "a.textproto")
+    shutil.copy(os.path.join(STRATEGY_DIR, "a.textproto"), text_path)
+    binary_path = compile_slicing_strategies.compile_strategy(
+        text_path, output_directory)
+    os.utime(text_path, (text_mtime, text_mtime))
+    os.utime(binary_path, (binary_mtime, binary_mtime))
+    return text_path, binary_path
+
+  def test_loader_prefers_compiled_strategy(self):
+    output_directory = self.create_tempdir().full_path
+    _, binary_path = self.compile_with_times(output_directory, 1000, 2000)
+
+    with mock.patch.object(slicing_strategy_loader, "SLICING_STRATEGY_DIR",
+                           output_directory):
+      self.assertEqual(slicing_strategy_loader.strategy_path("a"), binary_path)
+
+  def test_loader_ignores_stale_compiled_strategy(self):
+    output_directory = self.create_tempdir().full_path
+    text_path, _ = self.compile_with_times(output_directory, 2000, 1000)
+    # The textproto was edited after it was compiled.
+    shutil.copy(os.path.join(STRATEGY_DIR, "b.textproto"), text_path)
+    os.utime(text_path, (2000, 2000))
+
+    with mock.patch.object(slicing_strategy_loader, "SLICING_STRATEGY_DIR",
+                           output_directory):
+      with self.assertLogs("analyzer", level="WARNING"):
+        path = slicing_strategy_loader.strategy_path("a")
+      self.assertEqual(path, text_path)
+      self.assertEqual(
+          slicing_strategy_loader.read_strategy_file(path),
+          slicing_strategy_loader.read_strategy_file(
+              os.path.join(STRATEGY_DIR, "b.textproto")))
+
+
+if __name__ == '__main__':
+  absltest.main()
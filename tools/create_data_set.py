@@ -1,9 +1,20 @@
 """Converts a set of text files into a data set proto."""
 
+import sys
+
 from google.protobuf import text_format
 from absl import app
+from absl import flags
+from analysis import delimited_io
 from analysis import page_view_sequence_pb2
 
+FLAGS = flags.FLAGS
+
+flags.DEFINE_bool(
+    "output_delimited", False,
+    "If true outputs the sequence in the length delimited format read by "
+    "analyzer --input_form=delimited instead of as a text DataSetProto.")
+
 
 def create_page_view(file_path):
   """Collects all of the codepoints in file_path and converts
@@ -31,6 +42,10 @@ def main(argv):
     sequence.page_views.append(create_page_view(file_path))
   data_set.sequences.append(sequence)
 
+  if FLAGS.output_delimited:
+    delimited_io.write_messages(sys.stdout.buffer, data_set.sequences)
+    return
+
   print(text_format.MessageToString(data_set))
 
 
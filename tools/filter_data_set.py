@@ -8,6 +8,9 @@ Usage:
 bazel run tools:filter_data_set -- --input_data=<input path> \
    --sample_denom=10 \
    --filter_languages=en > <output path>
+
+Add --output_delimited to write the sequences in the streaming format
+accepted by analyzer --input_form=delimited.
 """
 
 import random
@@ -15,6 +18,7 @@ import sys
 
 from absl import app
 from absl import flags
+from analysis import delimited_io
 from analysis import languages
 from analysis import page_view_sequence_pb2
 
@@ -28,6 +32,11 @@ flags.DEFINE_integer(
     "Randomly keep 1 out of 'sampling_denom' sequences. Sampling is "
     "applied after language filter.")
 
+flags.DEFINE_bool(
+    "output_delimited", False,
+    "If true outputs the sequences in the length delimited format read by "
+    "analyzer --input_form=delimited instead of as a binary DataSetProto.")
+
 
 def read_binary_input(input_data_path):
   with open(input_data_path, 'rb') as input_data_file:
@@ -59,6 +68,10 @@ def main(argv):
 
     sequence_list.append(seq)
 
+  if FLAGS.output_delimited:
+    delimited_io.write_messages(sys.stdout.buffer, sequence_list)
+    return
+
   del data_set.sequences[:]
   data_set.sequences.extend(sequence_list)
 
@@ -1,11 +1,17 @@
-"""Merge two DataSetProto's into a single one."""
+"""Merge two DataSetProto's into a single one.
+
+Also combines the results of each shard of an analysis run with
+--num_shards into the result of a single analysis of all of the input data.
+"""
 
 import functools
 
 from absl import app
 from absl import flags
 from google.protobuf import text_format
+from analysis import cost
 from analysis import result_pb2
+from analysis import result_protos
 
 FLAGS = flags.FLAGS
 flags.DEFINE_bool("binary", True,
@@ -81,7 +87,22 @@ def merge(paths):
       text_format.Parse(contents, proto)
     protos[path] = proto
 
+  modes = {proto.request_compression_mode for proto in protos.values()}
+  if len(modes) > 1:
+    raise ValueError(
+        "Can't merge results with different request compression modes.")
+  estimated = {proto.estimated_range_request_sizes for proto in protos.values()}
+  if len(estimated) > 1:
+    raise ValueError(
+        "Can't merge results with both estimated and exact range request "
+        "sizes.")
+
+  if any(proto.HasField("shard") for proto in protos.values()):
+    return merge_shards(list(protos.values()))
+
   merged = result_pb2.AnalysisResultProto()
+  merged.request_compression_mode = modes.pop()
+  merged.estimated_range_request_sizes = estimated.pop()
   method = None
   for path, proto in protos.items():
     print("Merging %s ..." % path)
@@ -95,5 +116,28 @@ def merge(paths):
   return merged
 
 
+def merge_shards(protos):
+  """Merge the results of every shard of an analysis into a single result.
+
+  The per sequence totals from each shard are put back in input order and
+  then summarized exactly as the analyzer does for an unsharded run.
+  """
+  num_shards = {proto.shard.num_shards for proto in protos}
+  shard_indices = sorted(proto.shard.shard_index for proto in protos)
+  if (len(num_shards) != 1 or
+      not all(proto.HasField("shard") for proto in protos) or
+      shard_indices != list(range(num_shards.pop()))):
+    raise ValueError("Expected exactly one result for each shard.")
+
+  results = result_protos.from_shard_protos(proto.shard for proto in protos)
+  merged = result_pb2.AnalysisResultProto()
+  merged.request_compression_mode = protos[0].request_compression_mode
+  merged.estimated_range_request_sizes = (
+      protos[0].estimated_range_request_sizes)
+  merged.results.extend(
+      result_protos.to_protos(results.totals_by_method, cost.cost))
+  return merged
+
+
 if __name__ == "__main__":
   app.run(main)
@@ -1,12 +1,22 @@
 """Unit tests for the merge_results tool."""
 
+import os
+
 from absl.testing import absltest
 from absl.testing import flagsaver
 from google.protobuf import text_format
+from analysis import cost
 from analysis import result_pb2
+from analysis import result_protos
+from analysis import simulation
 from tools import merge_results
 
 
+def sequence_totals(time):
+  return simulation.SequenceTotals(
+      [simulation.GraphTotal(time, time * 2, time * 3, 1)], 42)
+
+
 class MergeResultsTest(absltest.TestCase):
 
   @flagsaver.flagsaver(binary=True)
@@ -35,6 +45,79 @@ class MergeResultsTest(absltest.TestCase):
 
     self.assertEqual(expected_proto, actual_proto)
 
+  @flagsaver.flagsaver(binary=True)
+  def test_merge_shards(self):
+    totals = {
+        "abc": {
+            "desktop_median": [sequence_totals(t) for t in [10, 20, 30]],
+            "mobile_2g_slow": [sequence_totals(t) for t in [40, 50, 60]],
+        }
+    }
+    # Sequence 3 failed in shard 0, so only has totals for 0 and 2.
+    paths = []
+    for shard_index, indices in enumerate([[0, 2, 3], [1]]):
+      shard_totals = {
+          "abc": {
+              network: [network_totals[i] for i in indices if i != 3]
+              for network, network_totals in totals["abc"].items()
+          }
+      }
+      result = result_pb2.AnalysisResultProto()
+      result.shard.CopyFrom(
+          result_protos.to_shard_proto(
+              simulation.SimulationResults(shard_totals,
+                                           [2] if shard_index == 0 else []),
+              indices, shard_index, 2))
+      paths.append(
+          os.path.join(absltest.get_default_test_tmpdir(),
+                       "shard_%s.pb" % shard_index))
+      with open(paths[-1], "wb") as out:
+        out.write(result.SerializeToString())
+
+    expected_proto = result_pb2.AnalysisResultProto()
+    expected_proto.results.extend(result_protos.to_protos(totals, cost.cost))
+    self.assertEqual(expected_proto, merge_results.merge(paths))
+
+    with self.assertRaises(ValueError):
+      merge_results.merge(paths[:1])
+
+  @flagsaver.flagsaver(binary=True)
+  def test_merge_different_request_compression(self):
+    paths = []
+    for mode in [
+        result_pb2.REQUEST_COMPRESSION_EXACT,
+        result_pb2.REQUEST_COMPRESSION_FAST
+    ]:
+      result = result_pb2.AnalysisResultProto()
+      result.request_compression_mode = mode
+      paths.append(
+          os.path.join(absltest.get_default_test_tmpdir(),
+                       "compression_%s.pb" % mode))
+      with open(paths[-1], "wb") as out:
+        out.write(result.SerializeToString())
+
+    self.assertEqual(
+        merge_results.merge(paths[1:]).request_compression_mode,
+        result_pb2.REQUEST_COMPRESSION_FAST)
+    with self.assertRaises(ValueError):
+      merge_results.merge(paths)
+
+  def test_merge_different_range_request_estimates(self):
+    paths = []
+    for estimated in [False, True]:
+      result = result_pb2.AnalysisResultProto()
+      result.estimated_range_request_sizes = estimated
+      paths.append(
+          os.path.join(absltest.get_default_test_tmpdir(),
+                       "estimated_%s.pb" % estimated))
+      with open(paths[-1], "wb") as out:
+        out.write(result.SerializeToString())
+
+    self.assertTrue(
+        merge_results.merge(paths[1:]).estimated_range_request_sizes)
+    with self.assertRaises(ValueError):
+      merge_results.merge(paths)
+
 
 if __name__ == '__main__':
   absltest.main()
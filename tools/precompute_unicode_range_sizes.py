@@ -0,0 +1,109 @@
+"""Precomputes the unicode range subset sizes of every font in a directory.
+
+Cutting and woff2 encoding subsets is most of the cost of simulating the
+unicode range method. This computes the size of every subset of every font
+in parallel and writes them to a SubsetSizeTable proto, which the analyzer
+loads with --unicode_range_size_table.
+"""
+
+import functools
+import logging
+from multiprocessing import Pool
+import os
+
+from absl import app
+from absl import flags
+from analysis import font_loader
+from analysis.pfe_methods import subset_sizer
+from analysis.pfe_methods import unicode_range_pfe_method
+from analysis.pfe_methods.unicode_range_data import slicing_strategy_loader
+from analysis.pfe_methods.unicode_range_data import subset_size_table_pb2
+
+LOG = logging.getLogger("precompute_unicode_range_sizes")
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("font_directory", None,
+                    "Directory containing the fonts to compute sizes for.")
+flags.DEFINE_string("output", None,
+                    "Path to write the binary SubsetSizeTable proto to.")
+flags.DEFINE_integer("parallelism", os.cpu_count(),
+                     "Number of processes to use.")
+
+FONT_EXTENSIONS = (".ttf", ".otf")
+
+
+def font_ids(font_directory):
+  """Returns the file names of the fonts in font_directory."""
+  return sorted(file_name for file_name in os.listdir(font_directory)
+                if file_name.lower().endswith(FONT_EXTENSIONS) and
+                os.path.isfile(os.path.join(font_directory, file_name)))
+
+
+@functools.lru_cache(maxsize=None)
+def loader_for(font_directory):
+  return font_loader.FontLoader(font_directory)
+
+
+def subset_size(task):
+  """Computes the size of a single subset.
+
+  task is a tuple of the font directory, font id, slicing strategy name and
+  subset index.
+  """
+  font_directory, font_id, strategy_name, index = task
+  font_bytes = loader_for(font_directory).load_font(font_id)
+  strategy = slicing_strategy_loader.load_slicing_strategy(strategy_name)
+  return subset_sizer.SubsetSizer().subset_size(strategy[index], font_bytes)
+
+
+def compute_size_table(font_directory, map_function=map):
+  """Computes the size table for all fonts in font_directory.
+
+  Subset sizes are computed with map_function, which must preserve the order
+  of its inputs (for example a Pool's imap).
+  """
+  loader = loader_for(font_directory)
+  fonts = []
+  tasks = []
+  for font_id in font_ids(font_directory):
+    try:
+      strategy_name, strategy = unicode_range_pfe_method.slicing_strategy_for_font(
+          font_id, loader.load_font_info(font_id))
+    except Exception:  # pylint: disable=broad-except
+      LOG.exception("Failed to load %s, skipping it.", font_id)
+      continue
+
+    fonts.append((font_id, strategy_name, len(strategy)))
+    tasks.extend((font_directory, font_id, strategy_name, index)
+                 for index in range(len(strategy)))
+
+  sizes = iter(map_function(subset_size, tasks))
+  table = subset_size_table_pb2.SubsetSizeTable()
+  for font_id, strategy_name, num_subsets in fonts:
+    font = table.fonts.add()
+    font.font_id = font_id
+    font.font_fingerprint = subset_sizer.font_fingerprint(
+        loader.load_font(font_id))
+    font.slicing_strategy = strategy_name
+    font.subset_sizes.extend(next(sizes) for _ in range(num_subsets))
+    LOG.info("Computed %s subset sizes for %s.", num_subsets, font_id)
+
+  return table
+
+
+def main(argv):
+  """Computes the size table and writes it to --output."""
+  del argv  # Unused.
+  logging.basicConfig(level=logging.INFO)
+  with Pool(FLAGS.parallelism) as pool:
+    table = compute_size_table(FLAGS.font_directory,
+                               functools.partial(pool.imap, chunksize=4))
+
+  with open(FLAGS.output, "wb") as out:
+    out.write(table.SerializeToString())
+
+
+if __name__ == '__main__':
+  flags.mark_flags_as_required(["font_directory", "output"])
+  app.run(main)
@@ -0,0 +1,52 @@
+"""Unit tests for the precompute_unicode_range_sizes tool."""
+
+import os
+import shutil
+
+from absl.testing import absltest
+from analysis.pfe_methods import subset_sizer
+from analysis.pfe_methods.unicode_range_data import slicing_strategy_loader
+from tools import precompute_unicode_range_sizes
+
+
+class PrecomputeUnicodeRangeSizesTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.font_directory = self.create_tempdir().full_path
+    shutil.copy("patch_subset/testdata/Roboto-Regular.abcd.ttf",
+                self.font_directory)
+    with open(os.path.join(self.font_directory, "notes.txt"), "w") as notes:
+      notes.write("Not a font.")
+    with open(os.path.join(self.font_directory, "Broken.ttf"), "wb") as font:
+      font.write(b"Not a font either.")
+
+  def test_font_ids(self):
+    self.assertEqual(
+        precompute_unicode_range_sizes.font_ids(self.font_directory),
+        ["Broken.ttf", "Roboto-Regular.abcd.ttf"])
+
+  def test_compute_size_table(self):
+    table = precompute_unicode_range_sizes.compute_size_table(
+        self.font_directory)
+
+    self.assertEqual(len(table.fonts), 1)
+    font = table.fonts[0]
+    with open("patch_subset/testdata/Roboto-Regular.abcd.ttf",
+              "rb") as font_file:
+      font_bytes = font_file.read()
+    self.assertEqual(font.font_id, "Roboto-Regular.abcd.ttf")
+    self.assertEqual(font.font_fingerprint,
+                     subset_sizer.font_fingerprint(font_bytes))
+
+    strategy = slicing_strategy_loader.load_slicing_strategy(
+        font.slicing_strategy)
+    self.assertEqual(len(font.subset_sizes), len(strategy))
+    for index in [0, len(strategy) - 1]:
+      self.assertEqual(
+          font.subset_sizes[index],
+          subset_sizer.SubsetSizer({}).subset_size(strategy[index], font_bytes))
+
+
+if __name__ == '__main__':
+  absltest.main()